@@ -8,28 +8,69 @@ import cv2
 import mediapipe as mp
 import paho.mqtt.client as mqtt
 import numpy as np
-import json
+import argparse
+import atexit
+from functools import partial
+from types import SimpleNamespace
 from threading import Lock
 import time
+import os
+import sys
+from camera_service import CameraService
+from detectors import create_detector, RoiTracker, POSE_CONNECTIONS, pool_worker
+from tracker import PersonTracker
+from overlay import StaticOverlay, draw_follower_grid
+
+# Shared NAVIS helpers live at the repo root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from navis_common.scheduler import AdaptiveScheduler
+from navis_common.inference_pool import InferencePool
+from navis_common.broadcaster import FrameBroadcaster
+from navis_common.status_stream import StatusChannel
+from navis_common.mqtt_publisher import CommandPublisher
+from navis_common.landmarks import to_array, follow_inputs, NOSE, X, Y, VISIBILITY
+from navis_common.session_recorder import SessionRecorder, INFERENCE, ESTIMATE
+from navis_common.metrics import StageMetrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
 
 app = Flask(__name__)
 
+# Per-stage latency windows + rolling FPS (GET /metrics, 'stages' in /status)
+metrics = StageMetrics('follower')
+
 # --- Configuration ---
-FRAME_WIDTH = 320              # Reduced for faster processing
-FRAME_HEIGHT = 240             # Reduced for faster processing
+FRAME_WIDTH = 320              # Capture + display size (what the browser sees)
+FRAME_HEIGHT = 240
+INFERENCE_WIDTH = 320          # MediaPipe gets a copy scaled to this size (can be smaller
+INFERENCE_HEIGHT = 240         # than the display, e.g. 640x480 view + 320x240 inference)
 FPS = 30
-FRAME_SKIP = 2                 # Process every 2nd frame
+CAMERA_SOURCE = os.environ.get('NAVIS_SOURCE', 0)  # Camera index, video file, image dir or 'synthetic'
+TARGET_INFERENCE_RATE = 15     # Wanted control updates per second (adaptive frame skip)
+CPU_BUDGET = 0.7               # Max share of one core spent in pose inference
+MAX_FRAME_SKIP = 4             # Never run inference less often than every 4th frame
 JPEG_QUALITY = 50              # Lower quality = faster compression
+STREAM_MODE = os.environ.get('NAVIS_STREAM_MODE', 'annotated')  # 'passthrough': camera MJPEG as-is, HUD drawn by the browser
+MIRROR = True                  # Selfie view (passthrough: the browser flips the video)
+STATUS_MAX_RATE = 10           # Max status pushes per second to each page (/events)
 
 # --- MQTT Setup ---
 MQTT_BROKER = "localhost"
 MQTT_TOPIC = "robot/control"
+MQTT_QOS = 0                   # 1 = broker-acknowledged (ack latency shows up in /status)
+COMMAND_MIN_INTERVAL = 0.1     # Seconds between two commands to the ESP32
+COMMAND_HOLD_TIME = 0.2        # A new command must persist this long before it is sent (stop is immediate)
 client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
 
 # --- Position Detection Parameters ---
 CENTER_TOLERANCE = 0.15  # 15% tolerance for center detection
 DEPTH_THRESHOLD_NEAR = 0.3    # Person closer than 30% frame height
 DEPTH_THRESHOLD_FAR = 0.7     # Person farther than 70% frame height
+TRACK_MAX_COAST = 0.5         # Seconds to keep predicting without a new detection
+TRACK_MAX_MISSES = 2          # Consecutive empty inferences before the track is dropped
+
+# --- Session Recording (always on; read back with navis_common/session_recorder.py) ---
+RECORD_SESSIONS = os.environ.get('NAVIS_RECORD', '1') != '0'
+RECORD_DIR = os.environ.get('NAVIS_RECORD_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sessions'))
+RECORD_MAX_MB = 1024          # Oldest chunks are deleted beyond this (~10 h at 30 FPS)
 
 # --- State Management ---
 state_lock = Lock()
@@ -42,65 +83,68 @@ current_state = {
     'command': 'S',        # Current MQTT command
     'speed': CURRENT_SPEED,
     'fps': 0,
+    'inference_fps': 0,
     'frame_count': 0,
     'person_x': 0,
-    'person_y': 0
+    'person_y': 0,
+    'velocity_x': 0        # Tracker estimate, frame widths per second
 }
 
 # --- MediaPipe Setup ---
-mp_holistic = mp.solutions.holistic
+DETECTOR_BACKEND = 'pose'      # 'pose' (body only, fastest) or 'holistic' (adds face + hands)
+ROI_TRACKING = True            # Crop inference around the last known person position
+ROI_EXPAND = 2.5               # Crop side = nose/shoulder extent x this factor
+ROI_INPUT_SIZE = 160           # Crops are downscaled to this size before inference
+INFERENCE_WORKERS = int(os.environ.get('NAVIS_INFERENCE_WORKERS', 0))  # >0: pose detection in this many processes
 mp_drawing = mp.solutions.drawing_utils
-holistic = mp_holistic.Holistic(
-    static_image_mode=False,
+detector_options = dict(
     model_complexity=0,              # Lighter model for speed
-    smooth_landmarks=True,
     min_detection_confidence=0.4,    # Lower threshold for speed
     min_tracking_confidence=0.4
 )
+if INFERENCE_WORKERS > 0:
+    # Fork the workers now, before this process creates MediaPipe graphs or threads;
+    # each worker builds its own detector and frames reach it through shared memory
+    inference_pool = InferencePool(
+        partial(pool_worker, DETECTOR_BACKEND, ROI_TRACKING,
+                dict(expand=ROI_EXPAND, roi_size=ROI_INPUT_SIZE), **detector_options),
+        max_frame_shape=(INFERENCE_HEIGHT, INFERENCE_WIDTH, 3), workers=INFERENCE_WORKERS)
+    inference_pool.start()
+    atexit.register(inference_pool.close)
+    detector = None
+elif ROI_TRACKING:
+    inference_pool = None
+    detector = RoiTracker(DETECTOR_BACKEND, expand=ROI_EXPAND, roi_size=ROI_INPUT_SIZE,
+                          **detector_options)
+else:
+    inference_pool = None
+    detector = create_detector(DETECTOR_BACKEND, **detector_options)
+
+def on_command_sent(cmd, speed):
+    """Publisher callback: reflect what the ESP32 was actually sent"""
+    with state_lock:
+        current_state['command'] = cmd
+        current_state['speed'] = speed
+
+publisher = CommandPublisher(client, MQTT_TOPIC, qos=MQTT_QOS,
+                             min_interval=COMMAND_MIN_INTERVAL,
+                             hold_time=COMMAND_HOLD_TIME, on_sent=on_command_sent,
+                             metrics=metrics)
+publisher.start()  # Idle until the first command; queues even before MQTT connects
 
 def send_mqtt_command(cmd, speed=None):
-    """Send command to MQTT broker"""
-    global CURRENT_SPEED
-    try:
-        if speed is None:
-            speed = CURRENT_SPEED
-        payload = json.dumps({"cmd": cmd, "speed": int(speed)})
-        client.publish(MQTT_TOPIC, payload)
-        with state_lock:
-            current_state['command'] = cmd
-            current_state['speed'] = int(speed)
-        return True
-    except Exception as e:
-        print(f"MQTT Error: {e}")
-        return False
+    """Queue a command for the MQTT publisher (coalesced, rate-limited, debounced)"""
+    if speed is None:
+        speed = CURRENT_SPEED
+    return publisher.submit(cmd, speed)
 
-def analyze_pose(frame, results):
+def classify_position(nose_x_norm, shoulder_width_norm):
     """
-    Analyze person position and depth from pose landmarks
-    Returns: (position, depth_percent, person_x, person_y)
+    Map normalized nose x and shoulder width to zones
+    Returns: (position, depth, depth_percent)
     """
-    h, w, c = frame.shape
-    
-    if not results.pose_landmarks:
-        return None, None, None, None
-    
-    # Get key landmarks for position analysis
-    landmarks = results.pose_landmarks.landmark
-    
-    # Use nose (landmark 0) and shoulders for position/depth detection
-    nose = landmarks[0]
-    left_shoulder = landmarks[11]
-    right_shoulder = landmarks[12]
-    
-    # Check confidence
-    if nose.visibility < 0.5:
-        return None, None, None, None
-    
     # --- Calculate Horizontal Position (Left/Center/Right) ---
-    # Normalize nose x position to frame width
-    nose_x_norm = nose.x  # 0 = left, 1 = right
-    
-    # Determine position based on normalized x coordinate
+    # Determine position based on normalized x coordinate (0 = left, 1 = right)
     if nose_x_norm < (0.5 - CENTER_TOLERANCE):
         position = 'left'
     elif nose_x_norm > (0.5 + CENTER_TOLERANCE):
@@ -109,15 +153,6 @@ def analyze_pose(frame, results):
         position = 'center'
     
     # --- Calculate Depth (Near/Medium/Far) ---
-    # Use shoulder width as proxy for distance
-    # Closer person = larger shoulder width in frame
-    if left_shoulder.visibility > 0.5 and right_shoulder.visibility > 0.5:
-        shoulder_width = abs(right_shoulder.x - left_shoulder.x)
-        # Normalize shoulder width relative to frame width
-        shoulder_width_norm = shoulder_width
-    else:
-        shoulder_width_norm = 0.3  # Default estimation
-    
     # Reverse: larger width = closer (smaller z)
     # Map to 0-1 range where 0 = very close, 1 = very far
     depth_percent = 1.0 - np.clip(shoulder_width_norm, 0, 1)
@@ -129,176 +164,323 @@ def analyze_pose(frame, results):
     else:
         depth = 'medium'
     
+    return position, depth, depth_percent
+
+def analyze_pose(frame, landmarks):
+    """
+    Analyze person position and depth from a pose landmark array (navis_common.landmarks)
+    landmarks: (33, 4) array of to_array(), None if nobody was found
+    Returns: (position, depth, depth_percent, (person_x, person_y))
+    """
+    h, w, c = frame.shape
+    
+    if landmarks is None:
+        return None, None, None, None
+    
+    # Nose position + shoulder width as proxy for distance (closer person = wider
+    # shoulders), normalized to the frame; NaN when the nose is not confident
+    nose_x, nose_y, shoulder_width_norm = follow_inputs(landmarks).tolist()
+    if np.isnan(nose_x):
+        return None, None, None, None
+    
+    position, depth, depth_percent = classify_position(nose_x, shoulder_width_norm)
+    
     # --- Calculate Person Center Position in Pixels ---
-    person_x = int(nose.x * w)
-    person_y = int(nose.y * h)
+    person_x = int(nose_x * w)
+    person_y = int(nose_y * h)
     
     return position, depth, depth_percent, (person_x, person_y)
 
-def generate_frames():
-    """Generate video frames with pose detection"""
-    cap = cv2.VideoCapture(0)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
-    cap.set(cv2.CAP_PROP_FPS, FPS)
-    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Reduce buffer for lower latency
-    
-    last_command = None
-    frame_count = 0
-    frame_skip_count = 0
-    start_time = time.time()
-    last_position = 'center'
-    last_depth = 'medium'
-    last_depth_percent = 0.5
-    
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        
-        frame_count += 1
-        frame_skip_count += 1
-        
-        # Flip for webcam (mirror effect)
-        frame = cv2.flip(frame, 1)
-        h, w, c = frame.shape
-        
-        # Process detection every N frames
-        if frame_skip_count >= FRAME_SKIP:
-            frame_skip_count = 0
-            
-            # Convert to RGB for MediaPipe
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # Run pose detection
-            results = holistic.process(frame_rgb)
-            
-            # Analyze pose
-            position, depth, depth_percent, person_pos = analyze_pose(frame, results)
-            
-            # Update state if detection successful
-            if position is not None:
-                last_position = position
-                last_depth = depth
-                last_depth_percent = depth_percent
-        else:
-            # Use previous results for skipped frames
-            position = last_position
-            depth = last_depth
-            depth_percent = last_depth_percent
-            person_pos = None
-            results = None
-        
-        # --- Decision Logic for MQTT Commands ---
-        if position is not None:
-            # Person detected
+# --- Control Loop State ---
+loop_state = {
+    'last_command': None,
+    'nose_x': None,            # Latest filtered decision inputs (None = no person)
+    'position': None,
+    'depth': None,
+    'depth_percent': None
+}
+control_lock = Lock()
+
+# Predicts the person between inferences so every camera frame gets a decision
+tracker = PersonTracker(max_coast=TRACK_MAX_COAST, max_misses=TRACK_MAX_MISSES)
+
+# Flight recorder: one record per control step; started in __main__ so imports
+# (replay.py, benchmarks) never write sessions
+recorder = SessionRecorder(RECORD_DIR, 'follower', max_bytes=RECORD_MAX_MB << 20) if RECORD_SESSIONS else None
+
+def decide_command(position, depth):
+    """Map position/depth to an MQTT command"""
+    if depth == 'far':
+        return 'F'
+    elif depth == 'near':
+        return 'B'
+    elif position == 'left':
+        return 'L'
+    elif position == 'right':
+        return 'R'
+    return 'S'
+
+def control(timestamp, landmarks=None, inferred=False):
+    """
+    Control step: decide the MQTT command from the tracker's filtered estimate
+    Runs on every camera frame, whether or not inference ran on it
+    inferred=True right after a detection (landmarks = its (33, 4) array, None if nobody was found)
+    """
+    with metrics.time('control'), control_lock:
+        estimate = tracker.estimate(timestamp)
+        if estimate is not None:
+            nose_x, shoulder_width, velocity_x = estimate
+            position, depth, depth_percent = classify_position(nose_x, shoulder_width)
+            command = decide_command(position, depth)
             with state_lock:
                 current_state['person_detected'] = True
                 current_state['position'] = position
                 current_state['depth'] = depth
                 current_state['distance_percent'] = depth_percent
-                if person_pos:
-                    current_state['person_x'] = person_pos[0]
-                    current_state['person_y'] = person_pos[1]
-            
-            # Send appropriate command based on position and depth
-            if depth == 'far':
-                command = 'F'
-            elif depth == 'near':
-                command = 'B'
-            else:
-                if position == 'left':
-                    command = 'L'
-                elif position == 'right':
-                    command = 'R'
-                else:
-                    command = 'S'
-            
-            # Send command if it changed
-            if command != last_command:
-                send_mqtt_command(command)
-                last_command = command
+                current_state['person_x'] = int(nose_x * FRAME_WIDTH)
+                current_state['velocity_x'] = velocity_x
         else:
-            # No person detected
+            position = depth = depth_percent = None
+            command = 'S'
             with state_lock:
                 current_state['person_detected'] = False
-            
-            if last_command != 'S':
-                send_mqtt_command('S')
-                last_command = 'S'
+                current_state['velocity_x'] = 0
         
-        # --- Draw Visualization (only for display) ---
-        # Draw pose landmarks only if we processed this frame
-        if results and results.pose_landmarks:
-            mp_drawing.draw_landmarks(
-                frame,
-                results.pose_landmarks,
-                mp_holistic.POSE_CONNECTIONS,
-                mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=1, circle_radius=1),
-                mp_drawing.DrawingSpec(color=(255, 0, 0), thickness=1)
-            )
+        loop_state['nose_x'] = estimate[0] if estimate is not None else None
+        loop_state['position'] = position
+        loop_state['depth'] = depth
+        loop_state['depth_percent'] = depth_percent
         
-        # --- Draw Status Information (minimal) ---
-        status_text = []
+        # The publisher drops repeats and debounces flapping, so submit every frame
+        send_mqtt_command(command)
+        loop_state['last_command'] = command
+    
+    if recorder is not None:
+        with metrics.time('record'):
+            recorder.append(timestamp, INFERENCE if inferred else ESTIMATE, landmarks,
+                            estimate is not None, position, depth, depth_percent,
+                            loop_state['nose_x'], command=command, sent=publisher.last_sent)
+    
+    # Wake /events clients (they diff + rate-limit themselves)
+    status_channel.notify()
+
+def infer(frame, timestamp):
+    """
+    Inference stage: pose detection on the newest frame, fused into the tracker
+    Runs at inference rate, with or without a browser attached
+    """
+    # Convert to RGB for MediaPipe
+    with metrics.time('convert'):
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    
+    # Run pose detection
+    with metrics.time('inference'):
+        results = detector.process(frame_rgb)
+    
+    return fuse_detection(frame, timestamp, results, getattr(detector, 'last_roi', None))
+
+def on_pool_detection(frame, timestamp, detection):
+    """Pool path: a worker's (pose_landmarks, roi) for this frame, delivered in frame order"""
+    pose_landmarks, roi = detection
+    return fuse_detection(frame, timestamp, SimpleNamespace(pose_landmarks=pose_landmarks), roi)
+
+def fuse_detection(frame, timestamp, results, roi):
+    """Feed one detection into the tracker and decide; returns the result for annotate()"""
+    with metrics.time('analysis'):
+        # Analyze pose (landmarks converted to one array, once per frame)
+        landmarks = to_array(results.pose_landmarks)
+        position, depth, depth_percent, person_pos = analyze_pose(frame, landmarks)
+        
+        # Measurement is stamped with the capture time of the inferred frame
         if position is not None:
-            status_text.append(f"Pos: {position.upper()}")
-            status_text.append(f"Depth: {depth.upper()}")
-            status_text.append(f"Dist: {depth_percent*100:.0f}%")
-            status_text.append(f"Cmd: {last_command}")
+            tracker.update(timestamp, float(landmarks[NOSE, X]), 1.0 - depth_percent)
+            with state_lock:
+                # Display coordinates, like person_x (person_pos is in inference pixels)
+                current_state['person_y'] = int(landmarks[NOSE, Y] * FRAME_HEIGHT)
         else:
-            status_text.append("NO PERSON")
-        
-        # Draw text on frame (smaller font)
-        y_offset = 20
-        for i, text in enumerate(status_text):
-            cv2.putText(frame, text, (5, y_offset + i*15), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 0), 1)
-        
-        # Draw frame info
-        fps = frame_count / (time.time() - start_time) if time.time() - start_time > 0 else 0
-        cv2.putText(frame, f"FPS: {fps:.1f}", (w-100, 20),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 255), 1)
-        
-        # Draw center point and detection zones
-        cv2.circle(frame, (w//2, h//2), 3, (0, 255, 255), -1)
-        
-        # Draw left/center/right zones (thinner lines)
-        zone_w = w // 3
-        cv2.rectangle(frame, (0, 0), (zone_w, h), (80, 80, 80), 1)
-        cv2.rectangle(frame, (zone_w, 0), (2*zone_w, h), (80, 80, 80), 1)
-        cv2.rectangle(frame, (2*zone_w, 0), (w, h), (80, 80, 80), 1)
-        
-        # Encode frame to JPEG with lower quality
-        ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
-        frame_bytes = buffer.tobytes()
-        
-        # Update FPS
+            tracker.miss()
+    
+    # Decide right away on the fresh measurement (own 'control' / 'record' stages)
+    control(time.time(), landmarks, inferred=True)
+    
+    # Landmarks are already 0-1; the ROI box is scaled the same way so it draws at any size
+    h, w = frame.shape[:2]
+    return {
+        'pose_landmarks': results.pose_landmarks,   # Protobuf, for mp_drawing
+        'landmarks': landmarks,                      # (33, 4) array, for the browser overlay
+        'roi': (roi[0] / w, roi[1] / h, roi[2] / w, roi[3] / h) if roi else None
+    }
+
+# Static HUD (zones + centre marker), cached per resolution
+grid_overlay = StaticOverlay(draw_follower_grid)
+
+def annotate(frame, result):
+    """Stream stage: draw the latest inference result on the newest camera frame"""
+    h, w, c = frame.shape
+    
+    # --- Draw Visualization (only for display) ---
+    if result and result['pose_landmarks']:
+        mp_drawing.draw_landmarks(
+            frame,
+            result['pose_landmarks'],
+            POSE_CONNECTIONS,
+            mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=1, circle_radius=1),
+            mp_drawing.DrawingSpec(color=(255, 0, 0), thickness=1)
+        )
+    
+    # Draw tracking crop
+    if result and result['roi']:
+        x0, y0, x1, y1 = result['roi']
+        cv2.rectangle(frame, (int(x0 * w), int(y0 * h)), (int(x1 * w), int(y1 * h)), (255, 200, 0), 1)
+    
+    # Draw tracker estimate (filtered position the robot is acting on)
+    nose_x = loop_state['nose_x']
+    if nose_x is not None:
         with state_lock:
-            current_state['fps'] = fps
-            current_state['frame_count'] = frame_count
-        
-        # Yield frame
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+            person_y = current_state['person_y']
+        cv2.drawMarker(frame, (int(nose_x * w), person_y), (0, 200, 255), cv2.MARKER_CROSS, 10, 1)
+    
+    # --- Draw Status Information (minimal) ---
+    status_text = []
+    if loop_state['position'] is not None:
+        status_text.append(f"Pos: {loop_state['position'].upper()}")
+        status_text.append(f"Depth: {loop_state['depth'].upper()}")
+        status_text.append(f"Dist: {loop_state['depth_percent']*100:.0f}%")
+        status_text.append(f"Cmd: {loop_state['last_command']}")
+    else:
+        status_text.append("NO PERSON")
+    
+    # Draw text on frame (smaller font)
+    y_offset = 20
+    for i, text in enumerate(status_text):
+        cv2.putText(frame, text, (5, y_offset + i*15), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 0), 1)
     
-    cap.release()
+    # Draw frame info (camera rate over the last few seconds)
+    fps = metrics.fps('capture')
+    cv2.putText(frame, f"FPS: {fps:.1f}", (w-100, 20),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 255), 1)
+    
+    # Center point and left/center/right zones: rasterized once, one masked copy per frame
+    grid_overlay.apply(frame)
+    
+    return frame
+
+# --- Shared Camera Pipeline (capture -> inference -> stream) ---
+# Every pool worker gets its own core's worth of budget
+scheduler = AdaptiveScheduler(TARGET_INFERENCE_RATE, CPU_BUDGET * max(1, INFERENCE_WORKERS), camera_fps=FPS,
+                              max_skip=MAX_FRAME_SKIP)
+broadcaster = FrameBroadcaster(JPEG_QUALITY, metrics=metrics)
+camera_service = CameraService(infer, annotate, broadcaster, FRAME_WIDTH, FRAME_HEIGHT, FPS,
+                               mirror=MIRROR, source=CAMERA_SOURCE, scheduler=scheduler, on_frame=control,
+                               metrics=metrics, pool=inference_pool, on_detection=on_pool_detection,
+                               passthrough=STREAM_MODE == 'passthrough',
+                               inference_size=(INFERENCE_WIDTH, INFERENCE_HEIGHT))
+
+def generate_frames(quality=None):
+    """Stream frames from the shared camera pipeline to one client"""
+    camera_service.start()
+    return camera_service.frames(quality)
 
 @app.route('/')
 def index():
     """Serve main page"""
-    return render_template('index.html')
+    return render_template('index.html', pose_connections=sorted(POSE_CONNECTIONS))
 
 @app.route('/video_feed')
 def video_feed():
-    """Stream video frames"""
-    return Response(generate_frames(), 
+    """Stream video frames (optional ?quality=10-95)"""
+    quality = request.args.get('quality', type=int)
+    return Response(generate_frames(quality), 
                     mimetype='multipart/x-mixed-replace; boundary=frame')
 
+@app.route('/snapshot.jpg')
+def snapshot():
+    """Latest annotated frame as a single JPEG (optional ?quality=10-95)"""
+    camera_service.start()
+    frame_bytes = broadcaster.snapshot(request.args.get('quality', type=int))
+    if frame_bytes is None:
+        return jsonify({'error': 'no frame available yet'}), 503
+    return Response(frame_bytes, mimetype='image/jpeg')
+
+def overlay_state():
+    """What annotate() would draw, in 0-1 frame coordinates, for the browser to render"""
+    result = camera_service.results.peek()
+    overlay = {'landmarks': None, 'roi': None, 'marker': None}
+    if result and result['landmarks'] is not None:
+        points = result['landmarks'][:, [X, Y, VISIBILITY]].astype(np.float64)
+        points[:, :2] = points[:, :2].round(3)
+        points[:, 2] = points[:, 2].round(2)
+        overlay['landmarks'] = points.tolist()
+    if result and result['roi']:
+        overlay['roi'] = [round(v, 3) for v in result['roi']]
+    nose_x = loop_state['nose_x']
+    if nose_x is not None:
+        with state_lock:
+            person_y = current_state['person_y']
+        overlay['marker'] = [round(nose_x, 3), round(person_y / FRAME_HEIGHT, 3)]
+    return overlay
+
+def page_status():
+    """What the page renders: detection state, rates and the passthrough overlay (pushed on /events)"""
+    with state_lock:
+        status = dict(current_state)
+    # Rolling rates, not lifetime averages
+    status['fps'] = round(metrics.fps('capture'), 1)
+    status['inference_fps'] = round(metrics.fps('inference'), 1)
+    status['stream_fps'] = round(metrics.fps('stream'), 1)
+    status['frame_count'] = camera_service.stats['captured']
+    status['viewers'] = camera_service.subscribers
+    status['stream_mode'] = STREAM_MODE
+    status['mirror'] = MIRROR
+    if camera_service.passthrough:
+        status['overlay'] = overlay_state()
+    return status
+
+def build_status():
+    """Current detection status plus pipeline diagnostics (GET /status only, they change every frame)"""
+    status = page_status()
+    status['stages'] = metrics.summary()
+    status['dropped_frames'] = camera_service.stats['dropped']
+    status['jpeg'] = dict(broadcaster.stats)
+    status['scheduler'] = scheduler.status()
+    status['mqtt'] = publisher.status()
+    if inference_pool is not None:
+        status['detector'] = DETECTOR_BACKEND + ('+roi' if ROI_TRACKING else '')
+        status['inference_pool'] = inference_pool.status()
+    else:
+        status['detector'] = detector.name
+    if ROI_TRACKING and detector is not None:
+        status['tracking_mode'] = detector.mode
+        status['tracking_stats'] = dict(detector.stats)
+    status['recorder'] = recorder.status() if recorder is not None else None
+    return status
+
+status_channel = StatusChannel(page_status, max_rate=STATUS_MAX_RATE)
+
 @app.route('/status')
 def get_status():
     """Get current detection status"""
-    with state_lock:
-        return jsonify(current_state)
+    return jsonify(build_status())
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Stage latencies and loop rates in Prometheus text format"""
+    mqtt_status = publisher.status()
+    text = metrics.prometheus({
+        'viewers': camera_service.subscribers,
+        'frames_dropped': camera_service.stats['dropped'],
+        'frame_skip': scheduler.skip,
+        'mqtt_connected': mqtt_status['connected'],
+        'mqtt_commands_dropped': mqtt_status['dropped']
+    })
+    return Response(text, content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/events')
+def events():
+    """Push status deltas as Server-Sent Events"""
+    return Response(status_channel.stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/set_threshold', methods=['POST'])
 def set_threshold():
@@ -326,6 +508,7 @@ def set_speed():
         CURRENT_SPEED = max(0, min(255, int(speed)))  # Clamp to 0-255
         with state_lock:
             current_state['speed'] = CURRENT_SPEED
+        status_channel.notify()
         return jsonify({
             'status': 'updated',
             'speed': CURRENT_SPEED
@@ -333,7 +516,42 @@ def set_speed():
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+def run_headless(report_interval=5.0):
+    """
+    Control daemon: capture -> inference -> MQTT with zero visualization work
+    No web server and no stream stage, so nothing is ever drawn or JPEG-encoded
+    """
+    camera_service.start(stream=False)
+    print("🤖 Human Detection Following - headless (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(report_interval)
+            with state_lock:
+                person = current_state['person_detected']
+                command = current_state['command']
+            print(f"capture {metrics.fps('capture'):5.1f} FPS | inference {metrics.fps('inference'):5.1f} FPS | "
+                  f"person: {'YES' if person else 'NO ':3} | cmd: {command} | "
+                  f"skip: {scheduler.skip} ({scheduler.reason})")
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping")
+    finally:
+        camera_service.stop()
+        # Never leave the robot driving
+        publisher.submit('S', CURRENT_SPEED)
+        time.sleep(0.2)
+        publisher.stop()
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Human detection and following")
+    parser.add_argument('--headless', action='store_true',
+                        help="Run detection + MQTT only (no web UI, no drawing or encoding)")
+    args = parser.parse_args()
+    
+    if recorder is not None:
+        recorder.start()
+        atexit.register(recorder.close)
+        print(f"📼 Recording session {recorder.session} to {RECORD_DIR}")
+    
     # Connect to MQTT
     try:
         client.connect(MQTT_BROKER, 1883, 60)
@@ -342,6 +560,14 @@ if __name__ == '__main__':
     except Exception as e:
         print(f"❌ MQTT Connection Failed: {e}")
     
+    if args.headless:
+        run_headless()
+        sys.exit(0)
+    
+    # Start the camera pipeline now so the robot follows without a browser open
+    # (drawing + encoding only run while a stream or snapshot client is connected)
+    camera_service.start()
+    
     # Start Flask
     print("🎥 Human Detection Following - Starting on http://0.0.0.0:5051")
     app.run(host='0.0.0.0', port=5051, debug=False, threaded=True)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Detector Backend Benchmark
+Measures per-frame inference latency of each follower detector backend
+
+Usage:
+    python benchmark_detectors.py                      # Synthetic frames
+    python benchmark_detectors.py --video walk.mp4     # Recorded clip (recommended)
+    python benchmark_detectors.py --video frames/      # Directory of images
+    python benchmark_detectors.py --camera 0 --frames 300
+    python benchmark_detectors.py --video walk.mp4 --roi-size 160   # + ROI tracking
+"""
+
+import argparse
+import os
+import sys
+import time
+import cv2
+import numpy as np
+
+from detectors import BACKENDS, create_detector, RoiTracker
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from navis_common.frame_sources import open_source
+
+
+def load_frames(args):
+    """Collect the benchmark frames up front so capture cost is not measured"""
+    if args.video is not None:
+        spec = args.video
+    elif args.camera is not None:
+        spec = args.camera
+    else:
+        spec = 'synthetic'  # Noise frames with a moving bright blob
+
+    source = open_source(spec, args.width, args.height)
+    frames = []
+    while len(frames) < args.frames:
+        ret, frame = source.read()
+        if not ret:
+            break
+        # Webcams may ignore the requested size
+        frames.append(cv2.resize(frame, (args.width, args.height)))
+    source.release()
+    if not frames:
+        raise SystemExit("❌ Could not read any frames from the source")
+    return frames
+
+
+def benchmark(backend, frames, model_complexity, warmup, roi_size=None):
+    """Return per-frame latencies in milliseconds for one backend"""
+    if roi_size:
+        detector = RoiTracker(backend, roi_size=roi_size, model_complexity=model_complexity)
+    else:
+        detector = create_detector(backend, model_complexity=model_complexity)
+    rgb_frames = [cv2.cvtColor(f, cv2.COLOR_BGR2RGB) for f in frames]
+
+    for frame_rgb in rgb_frames[:warmup]:
+        detector.process(frame_rgb)
+
+    latencies = []
+    detections = 0
+    for frame_rgb in rgb_frames:
+        start = time.perf_counter()
+        results = detector.process(frame_rgb)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if results.pose_landmarks:
+            detections += 1
+
+    detector.close()
+    return np.array(latencies), detections
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark follower detector backends")
+    parser.add_argument('--video', help="Video file or image directory to use as input")
+    parser.add_argument('--camera', type=int, help="Camera index to record input from")
+    parser.add_argument('--frames', type=int, default=200, help="Frames per backend")
+    parser.add_argument('--width', type=int, default=320)
+    parser.add_argument('--height', type=int, default=240)
+    parser.add_argument('--model-complexity', type=int, default=0)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--roi-size', type=int, default=0,
+                        help="Also benchmark ROI tracking with this crop size (needs a person in the input)")
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=list(BACKENDS))
+    args = parser.parse_args()
+
+    frames = load_frames(args)
+    print(f"📊 Detector benchmark: {len(frames)} frames at {args.width}x{args.height}, "
+          f"model_complexity={args.model_complexity}")
+    print("-" * 72)
+    print(f"{'backend':<10} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'FPS':>7} {'detected':>10}")
+
+    runs = [(backend, None) for backend in args.backends]
+    if args.roi_size:
+        runs += [(backend, args.roi_size) for backend in args.backends]
+
+    for backend, roi_size in runs:
+        latencies, detections = benchmark(backend, frames, args.model_complexity, args.warmup, roi_size)
+        label = f"{backend}+roi" if roi_size else backend
+        print(f"{label:<10} {latencies.mean():>9.2f} {np.percentile(latencies, 50):>9.2f} "
+              f"{np.percentile(latencies, 95):>9.2f} {latencies.max():>9.2f} "
+              f"{1000 / latencies.mean():>7.1f} {detections:>5}/{len(frames)}")
+
+    print("-" * 72)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Landmark Analysis Microbenchmark
+The apps convert each live frame once into a (33, 4) array (to_array()) and run
+the NumPy functions of navis_common/landmarks.py on it; recorded sessions feed the
+same functions a whole (frames, 33, 4) stack. This checks both against the
+original per-app code and times them.
+
+Cases:
+    follower  - per frame: to_array() + follow_inputs() vs. the original analyze_pose() reads
+    movement  - per frame: to_array() + pose_angles() vs. the original calculate_angle /
+                calculate_head_angle code
+    both      - per frame, one conversion shared by the follower and movement maths
+    ... (batch) - the same functions over a whole stack vs. the original per frame
+    to_array  - the conversion alone
+
+Per frame the NumPy forms cost a few tens of µs more than the scalar originals
+(conversion + call overhead on 2-element arrays); that is well under 1% of one
+MediaPipe inference. Over a stack they are far cheaper.
+
+Landmark lists are synthetic MediaPipe NormalizedLandmarkLists with random
+positions and visibilities, so every branch (hidden arms, hidden nose, face
+mesh present or not) is hit.
+
+Usage:
+    python benchmark_landmarks.py
+    python benchmark_landmarks.py --frames 20000
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from navis_common.landmarks import to_array, pose_angles, follow_inputs, joint_angles, head_angles
+
+
+# --- The per-landmark code the array replaced, kept verbatim for comparison ---
+
+def legacy_follow_inputs(results):
+    if not results.pose_landmarks:
+        return None
+    landmarks = results.pose_landmarks.landmark
+    nose = landmarks[0]
+    left_shoulder = landmarks[11]
+    right_shoulder = landmarks[12]
+    if nose.visibility < 0.5:
+        return None
+    if left_shoulder.visibility > 0.5 and right_shoulder.visibility > 0.5:
+        shoulder_width_norm = abs(right_shoulder.x - left_shoulder.x)
+    else:
+        shoulder_width_norm = 0.3
+    return nose.x, nose.y, shoulder_width_norm
+
+
+def legacy_calculate_angle(point1, point2, point3):
+    a = np.array([point1.x - point2.x, point1.y - point2.y])
+    b = np.array([point3.x - point2.x, point3.y - point2.y])
+    cos_angle = np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b) + 1e-6)
+    cos_angle = np.clip(cos_angle, -1, 1)
+    angle = np.arccos(cos_angle)
+    angle_deg = np.degrees(angle)
+    angle_deg = 180 - angle_deg
+    angle_deg = np.clip(angle_deg, 0, 180)
+    return angle_deg
+
+
+def legacy_calculate_head_angle(landmarks, face_landmarks=None):
+    if face_landmarks is not None and len(face_landmarks.landmark) > 263:
+        left_eye = face_landmarks.landmark[33]
+        right_eye = face_landmarks.landmark[263]
+        eye_distance = abs(left_eye.y - right_eye.y)
+        head_angle = np.clip(eye_distance * 180, 0, 180)
+    else:
+        nose = landmarks[0]
+        left_shoulder = landmarks[11]
+        right_shoulder = landmarks[12]
+        shoulder_center_x = (left_shoulder.x + right_shoulder.x) / 2
+        shoulder_center_y = (left_shoulder.y + right_shoulder.y) / 2
+        dx = nose.x - shoulder_center_x
+        dy = nose.y - shoulder_center_y
+        head_angle = np.degrees(np.arctan2(dy, dx))
+        head_angle = np.clip(abs(head_angle) * 1.0, 0, 180)
+    return head_angle
+
+
+def legacy_pose_angles(results):
+    landmarks = results.pose_landmarks.landmark
+    left_bicep_angle = None
+    right_bicep_angle = None
+    head_angle = None
+    if landmarks[11].visibility > 0.3 and landmarks[13].visibility > 0.3 and landmarks[15].visibility > 0.3:
+        left_bicep_angle = legacy_calculate_angle(landmarks[11], landmarks[13], landmarks[15])
+    if landmarks[12].visibility > 0.3 and landmarks[14].visibility > 0.3 and landmarks[16].visibility > 0.3:
+        right_bicep_angle = legacy_calculate_angle(landmarks[12], landmarks[14], landmarks[16])
+    if landmarks[0].visibility > 0.3:
+        head_angle = legacy_calculate_head_angle(landmarks, results.face_landmarks)
+    return left_bicep_angle, right_bicep_angle, head_angle
+
+
+def shared_pose_angles(results):
+    return pose_angles(to_array(results.pose_landmarks), results.face_landmarks)
+
+
+def nan_to_none(values):
+    return tuple(None if np.isnan(value) else value for value in np.atleast_1d(values).tolist())
+
+
+def shared_follow_inputs(results):
+    landmarks = to_array(results.pose_landmarks)
+    if landmarks is None:
+        return None
+    inputs = nan_to_none(follow_inputs(landmarks))
+    return None if inputs[0] is None else inputs
+
+
+def legacy_both(results):
+    return legacy_follow_inputs(results), legacy_pose_angles(results)
+
+
+def shared_both(results):
+    landmarks = to_array(results.pose_landmarks)
+    return follow_inputs(landmarks), pose_angles(landmarks, results.face_landmarks)
+
+
+# --- Synthetic input ---
+
+class Results:
+    """Stand-in for a Holistic result"""
+
+    def __init__(self, pose_landmarks, face_landmarks=None):
+        self.pose_landmarks = pose_landmarks
+        self.face_landmarks = face_landmarks
+
+
+def synthetic_results(count, seed=0):
+    """Random pose lists (a quarter with a face mesh), visibilities spread around both thresholds"""
+    rng = np.random.default_rng(seed)
+    results = []
+    for i in range(count):
+        pose = landmark_pb2.NormalizedLandmarkList()
+        for x, y, z, visibility in rng.random((33, 4)):
+            pose.landmark.add(x=x, y=y, z=z - 0.5, visibility=visibility, presence=0.9)
+        face = None
+        if i % 4 == 0:
+            face = landmark_pb2.NormalizedLandmarkList()
+            for x, y, z in rng.random((468, 3)):
+                face.landmark.add(x=x, y=y, z=z)
+        results.append(Results(pose, face))
+    return results
+
+
+def same(expected, actual, tolerance):
+    """Recursive comparison; None must match None, numbers within tolerance"""
+    if isinstance(expected, tuple) or isinstance(actual, tuple):
+        return len(expected) == len(actual) and all(same(e, a, tolerance) for e, a in zip(expected, actual))
+    if expected is None or actual is None:
+        return expected is None and actual is None
+    return abs(float(expected) - float(actual)) <= tolerance
+
+
+def time_per_frame(analyse, results, count):
+    """Median microseconds per frame"""
+    samples = []
+    for i in range(count):
+        item = results[i % len(results)]
+        start = time.perf_counter()
+        analyse(item)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return float(np.median(samples))
+
+
+def time_batch(legacy, batched, results, stack, repeats):
+    """(legacy µs per frame, batched µs per frame)"""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for item in results:
+            legacy(item)
+    legacy_us = (time.perf_counter() - start) / (repeats * len(results)) * 1e6
+    start = time.perf_counter()
+    for _ in range(repeats):
+        batched(stack)
+    batch_us = (time.perf_counter() - start) / (repeats * len(results)) * 1e6
+    return legacy_us, batch_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark landmark analysis")
+    parser.add_argument('--frames', type=int, default=5000)
+    parser.add_argument('--inputs', type=int, default=200, help="Distinct synthetic landmark lists")
+    args = parser.parse_args()
+
+    results = synthetic_results(args.inputs)
+    # Recorded sessions carry no face mesh: the batched head angle is the shoulder fallback
+    no_face = [Results(item.pose_landmarks) for item in results]
+    stack = np.stack([to_array(item.pose_landmarks) for item in results])
+
+    # Same answers, or the comparison is meaningless (float32 array vs. float64 maths: tiny drift)
+    checks = [
+        ('follower', lambda i: legacy_follow_inputs(results[i]), lambda i: shared_follow_inputs(results[i]), 1e-6),
+        ('movement', lambda i: legacy_pose_angles(results[i]), lambda i: shared_pose_angles(results[i]), 1e-2),
+        ('biceps', lambda i: legacy_pose_angles(results[i])[:2],
+         lambda i: nan_to_none(joint_angles(stack[i:i + 1])[0]), 1e-2),
+        ('head', lambda i: legacy_pose_angles(no_face[i])[2],
+         lambda i: nan_to_none(head_angles(stack[i:i + 1]))[0], 1e-2),
+    ]
+    for label, legacy, new, tolerance in checks:
+        for i in range(len(results)):
+            if not same(legacy(i), new(i), tolerance):
+                raise SystemExit(f"❌ {label}: differs from the original code on input {i}: "
+                                 f"{legacy(i)} vs {new(i)}")
+
+    print(f"📊 Landmark analysis benchmark: {args.frames} frames per case (median µs per frame)")
+    print("-" * 60)
+    print(f"{'case':<16} {'original µs':>12} {'shared µs':>10} {'speedup':>9}")
+    for label, legacy, shared in [('follower', legacy_follow_inputs, shared_follow_inputs),
+                                  ('movement', legacy_pose_angles, shared_pose_angles),
+                                  ('both', legacy_both, shared_both)]:
+        legacy_us = time_per_frame(legacy, results, args.frames)
+        shared_us = time_per_frame(shared, results, args.frames)
+        print(f"{label:<16} {legacy_us:>12.1f} {shared_us:>10.1f} {legacy_us / shared_us:>8.1f}x")
+
+    # Whole recording at once: per-frame cost of the batched NumPy forms
+    repeats = max(1, args.frames // len(results))
+    batches = [
+        ('follower', legacy_follow_inputs, follow_inputs, results),
+        ('biceps', lambda item: legacy_pose_angles(item)[:2], joint_angles, results),
+        ('head', lambda item: legacy_pose_angles(item)[2], head_angles, no_face),
+    ]
+    for label, legacy, batched, inputs in batches:
+        legacy_us, batch_us = time_batch(legacy, batched, inputs, stack, repeats)
+        print(f"{label + ' (batch)':<16} {legacy_us:>12.1f} {batch_us:>10.2f} {legacy_us / batch_us:>8.1f}x")
+
+    convert_us = time_per_frame(lambda item: to_array(item.pose_landmarks), results, args.frames)
+    print("-" * 60)
+    print(f"to_array() alone: {convert_us:.1f} µs per frame (included in the per-frame cases)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Overlay Microbenchmark
+Per-frame OpenCV drawing of the static HUD vs. the precomputed StaticOverlay
+
+Checks that both produce the same pixels (anti-aliased text edges, OpenCV 5 only,
+may differ by rounding), then times each on random frames. The 'copy' column forces
+compositing; 'auto' is what the apps get (StaticOverlay picks copy or draw per size).
+
+Usage:
+    python benchmark_overlay.py
+    python benchmark_overlay.py --frames 2000 --sizes 320x240 640x480 1280x720
+"""
+
+import argparse
+import time
+import cv2
+import numpy as np
+
+from overlay import (StaticOverlay, draw_follower_grid, draw_viewer_zones,
+                     draw_depth_bar_frame, depth_threshold_drawer, draw_depth_fill)
+
+NEAR, FAR = 0.3, 0.7
+
+
+# --- The drawing code the overlay replaced, kept verbatim for comparison ---
+
+def legacy_follower(frame):
+    h, w = frame.shape[:2]
+    cv2.circle(frame, (w//2, h//2), 3, (0, 255, 255), -1)
+    zone_w = w // 3
+    cv2.rectangle(frame, (0, 0), (zone_w, h), (80, 80, 80), 1)
+    cv2.rectangle(frame, (zone_w, 0), (2*zone_w, h), (80, 80, 80), 1)
+    cv2.rectangle(frame, (2*zone_w, 0), (w, h), (80, 80, 80), 1)
+
+
+def legacy_viewer(frame, depth_percent):
+    h, w = frame.shape[:2]
+    zone_w = w // 3
+    cv2.rectangle(frame, (0, 0), (zone_w, h), (100, 100, 100), 2)
+    cv2.putText(frame, "LEFT", (zone_w//2 - 30, 50),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (100, 100, 100), 2)
+    cv2.rectangle(frame, (zone_w, 0), (2*zone_w, h), (100, 100, 100), 2)
+    cv2.putText(frame, "CENTER", (zone_w + zone_w//2 - 50, 50),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (100, 100, 100), 2)
+    cv2.rectangle(frame, (2*zone_w, 0), (w, h), (100, 100, 100), 2)
+    cv2.putText(frame, "RIGHT", (2*zone_w + zone_w//2 - 40, 50),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (100, 100, 100), 2)
+    cv2.circle(frame, (w//2, h//2), 5, (0, 255, 255), -1)
+
+    bar_x = w - 100
+    bar_y = 30
+    bar_h = 200
+    cv2.rectangle(frame, (bar_x, bar_y), (bar_x+50, bar_y+bar_h), (100, 100, 100), 2)
+    fill_h = int(bar_h * depth_percent)
+    cv2.rectangle(frame, (bar_x, bar_y+bar_h-fill_h), (bar_x+50, bar_y+bar_h), (0, 255, 0), -1)
+    cv2.line(frame, (bar_x, int(bar_y+bar_h*(1-NEAR))),
+            (bar_x+50, int(bar_y+bar_h*(1-NEAR))), (0, 0, 255), 2)
+    cv2.line(frame, (bar_x, int(bar_y+bar_h*(1-FAR))),
+            (bar_x+50, int(bar_y+bar_h*(1-FAR))), (255, 0, 0), 2)
+
+
+# --- Overlay versions ---
+
+def overlay_versions(calibrate):
+    """(follower, viewer) drawing functions built on StaticOverlay"""
+    follower_grid = StaticOverlay(draw_follower_grid, calibrate)
+    viewer_zones = StaticOverlay(draw_viewer_zones, calibrate)
+    viewer_bar = StaticOverlay(draw_depth_bar_frame, calibrate)
+    viewer_thresholds = StaticOverlay(depth_threshold_drawer(NEAR, FAR), calibrate)
+
+    def overlay_follower(frame):
+        follower_grid.apply(frame)
+
+    def overlay_viewer(frame, depth_percent):
+        viewer_zones.apply(frame)
+        viewer_bar.apply(frame)
+        draw_depth_fill(frame, depth_percent)
+        viewer_thresholds.apply(frame)
+
+    return overlay_follower, overlay_viewer
+
+
+def time_per_frame(draw, frames, count, *args):
+    """Median microseconds per call (frames are copied outside the timed region)"""
+    samples = []
+    for i in range(count):
+        canvas = frames[i % len(frames)].copy()
+        start = time.perf_counter()
+        draw(canvas, *args)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return float(np.median(samples))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark static overlay compositing")
+    parser.add_argument('--frames', type=int, default=500)
+    parser.add_argument('--sizes', nargs='+', default=['320x240', '640x480'])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"📊 Overlay benchmark: {args.frames} frames per case (median µs per frame)")
+    print("-" * 74)
+    print(f"{'case':<20} {'size':>9} {'opencv µs':>10} {'copy µs':>9} {'auto µs':>9} {'speedup':>8}")
+
+    for size in args.sizes:
+        w, h = (int(v) for v in size.split('x'))
+        frames = [rng.integers(0, 256, (h, w, 3), dtype=np.uint8) for _ in range(8)]
+        copy_follower, copy_viewer = overlay_versions(calibrate=False)
+        auto_follower, auto_viewer = overlay_versions(calibrate=True)
+        cases = [('follower (app.py)', legacy_follower, copy_follower, auto_follower, ())]
+        if w >= 200 and h >= 240:
+            cases.append(('viewer (viewer.py)', legacy_viewer, copy_viewer, auto_viewer, (0.55,)))
+
+        for label, legacy, copied, auto, extra in cases:
+            # Same pixels, or the comparison is meaningless
+            expected, actual = frames[0].copy(), frames[0].copy()
+            legacy(expected, *extra)
+            copied(actual, *extra)
+            error = np.abs(expected.astype(int) - actual.astype(int)).max()
+            if error > 2:
+                raise SystemExit(f"❌ {label} at {size}: overlay output differs from OpenCV drawing "
+                                 f"(max error {error})")
+            auto(frames[0].copy(), *extra)  # Calibrate outside the timed runs
+
+            legacy_us = time_per_frame(legacy, frames, args.frames, *extra)
+            copy_us = time_per_frame(copied, frames, args.frames, *extra)
+            auto_us = time_per_frame(auto, frames, args.frames, *extra)
+            print(f"{label:<20} {size:>9} {legacy_us:>10.1f} {copy_us:>9.1f} {auto_us:>9.1f} "
+                  f"{legacy_us / auto_us:>7.1f}x")
+
+    print("-" * 74)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Inference Pool Benchmark
+Single-process pose inference vs. InferencePool with 1..N worker processes
+
+Every frame is pushed through as fast as the detector(s) accept it. Throughput is
+frames per wall-clock second; 'latency' is submit -> in-order result, so it includes
+the shared-memory hand-off and waiting behind earlier frames. Speedup needs as many
+free cores as workers (a Pi 4/5 has 4).
+
+Usage:
+    python benchmark_pool.py                           # Synthetic frames, 1/2/4 workers
+    python benchmark_pool.py --video walk.mp4 --workers 2 3 4
+    python benchmark_pool.py --video walk.mp4 --roi    # Workers use ROI tracking like app.py
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from functools import partial
+import cv2
+import numpy as np
+
+from detectors import BACKENDS, pool_worker
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from navis_common.frame_sources import open_source
+from navis_common.inference_pool import InferencePool
+
+
+def load_frames(args):
+    """Read the benchmark frames up front so capture cost is not measured"""
+    source = open_source(args.video or 'synthetic', args.width, args.height)
+    frames = []
+    while len(frames) < args.frames:
+        ret, frame = source.read()
+        if not ret:
+            break
+        frames.append(cv2.resize(frame, (args.width, args.height)))
+    source.release()
+    if not frames:
+        raise SystemExit("❌ Could not read any frames from the source")
+    return frames
+
+
+def worker_init(args):
+    return partial(pool_worker, args.backend, args.roi, dict(roi_size=160),
+                   model_complexity=args.model_complexity)
+
+
+def run_single(frames, args):
+    """Baseline: the same worker function called in this process, one frame at a time"""
+    process = worker_init(args)()
+    for frame in frames[:args.warmup]:
+        process(frame)
+
+    latencies = []
+    start = time.perf_counter()
+    for frame in frames:
+        t0 = time.perf_counter()
+        process(frame)
+        latencies.append(time.perf_counter() - t0)
+    return time.perf_counter() - start, np.array(latencies) * 1000
+
+
+def run_pool(frames, workers, args):
+    """Push every frame through an InferencePool; returns (seconds, latencies ms, in order?)"""
+    delivered = []
+    done = threading.Event()
+    expected = [0]
+
+    def on_result(meta, result, latency):
+        index, submitted = meta
+        delivered.append((index, time.perf_counter() - submitted))
+        if len(delivered) >= expected[0]:
+            done.set()
+
+    pool = InferencePool(worker_init(args), max_frame_shape=frames[0].shape,
+                         workers=workers, on_result=on_result)
+    pool.start()
+    try:
+        # Warm up every worker (model load + first inference) outside the timing
+        expected[0] = args.warmup * workers
+        for i in range(expected[0]):
+            while not pool.submit(frames[i % len(frames)], (-1, time.perf_counter())):
+                pool.wait_for_slot()
+        done.wait()
+        delivered.clear()
+        done.clear()
+
+        expected[0] = len(frames)
+        start = time.perf_counter()
+        for index, frame in enumerate(frames):
+            while not pool.submit(frame, (index, time.perf_counter())):
+                pool.wait_for_slot()
+        done.wait()
+        elapsed = time.perf_counter() - start
+    finally:
+        pool.close()
+
+    order = [index for index, _ in delivered]
+    latencies = np.array([latency for _, latency in delivered]) * 1000
+    return elapsed, latencies, order == list(range(len(frames)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark multi-process pose inference")
+    parser.add_argument('--video', help="Video file or image directory to use as input")
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--width', type=int, default=320)
+    parser.add_argument('--height', type=int, default=240)
+    parser.add_argument('--backend', default='pose', choices=list(BACKENDS))
+    parser.add_argument('--model-complexity', type=int, default=0)
+    parser.add_argument('--roi', action='store_true', help="Use ROI tracking in the detector")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--warmup', type=int, default=5)
+    args = parser.parse_args()
+
+    frames = load_frames(args)
+    print(f"📊 Inference pool benchmark: {len(frames)} frames at {args.width}x{args.height}, "
+          f"backend={args.backend}{'+roi' if args.roi else ''}, {os.cpu_count()} CPUs")
+    print("-" * 66)
+    print(f"{'mode':<14} {'FPS':>7} {'speedup':>8} {'p50 ms':>9} {'p95 ms':>9} {'in order':>9}")
+
+    # Pools first: workers are forked, and must not inherit this process's MediaPipe graphs
+    rows = []
+    for workers in args.workers:
+        elapsed, latencies, in_order = run_pool(frames, workers, args)
+        rows.append((f"pool x{workers}", len(frames) / elapsed, latencies, in_order))
+    elapsed, latencies = run_single(frames, args)
+    baseline = len(frames) / elapsed
+    rows.insert(0, ("single", baseline, latencies, True))
+
+    for label, fps, latencies, in_order in rows:
+        print(f"{label:<14} {fps:>7.1f} {fps / baseline:>7.2f}x {np.percentile(latencies, 50):>9.2f} "
+              f"{np.percentile(latencies, 95):>9.2f} {'yes' if in_order else 'NO':>9}")
+    print("-" * 66)
+
+
+if __name__ == '__main__':
+    main()
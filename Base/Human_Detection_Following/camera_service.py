@@ -0,0 +1,334 @@
+"""
+Shared Camera Service
+Staged capture -> inference -> encode pipeline shared by every stream client
+
+Stages (one thread each):
+    capture   - reads + mirrors camera frames into a latest-frame slot and
+                runs the optional per-frame on_frame() hook (e.g. tracker-based control)
+    inference - always takes the newest frame (stale ones are dropped), scales
+                it down to inference_size, runs detection and the robot control decision; with an
+                InferencePool it only hands frames to the worker processes and
+                on_detection() runs the decision on each result, in frame order
+    stream    - draws the latest result on the newest frame and publishes it to a
+                FrameBroadcaster (encode-once JPEG cache), only while someone is watching;
+                not started at all in headless mode (start(stream=False))
+
+The control loop therefore runs at inference rate whether or not a browser
+is attached, and a slow client can never hold back the robot.
+
+Passthrough mode (passthrough=True) skips the stream stage: capture forwards the
+camera's own MJPEG bytes to the broadcaster and inference decodes (and mirrors)
+only the frames it takes. The browser mirrors the video and draws the overlay.
+"""
+
+import cv2
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from navis_common.frame_sources import open_source, decode_jpeg
+
+
+class LatestFrame:
+    """Single-slot mailbox: writers overwrite, readers always get the newest item"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self.seq = 0                           # Incremented on every put()
+
+    def put(self, item):
+        with self._cond:
+            self._item = item
+            self.seq += 1
+            self._cond.notify_all()
+
+    def get(self, last_seq=0, min_step=1, timeout=1.0):
+        """
+        Wait until at least min_step new items arrived after last_seq
+        Returns: (seq, item) or (last_seq, None) on timeout
+        """
+        with self._cond:
+            ready = self._cond.wait_for(lambda: self.seq - last_seq >= min_step, timeout=timeout)
+            if not ready:
+                return last_seq, None
+            return self.seq, self._item
+
+    def peek(self):
+        """Return the newest item without waiting"""
+        with self._cond:
+            return self._item
+
+    def wake(self):
+        """Wake up all waiting readers (used on shutdown)"""
+        with self._cond:
+            self._cond.notify_all()
+
+
+class CameraService:
+    """Owns the camera and runs the capture, inference and stream stages"""
+
+    def __init__(self, infer, annotate, broadcaster, width=320, height=240, fps=30,
+                 frame_skip=1, mirror=True, source=0, scheduler=None, on_frame=None,
+                 metrics=None, pool=None, on_detection=None, passthrough=False,
+                 inference_size=None):
+        self.infer = infer                    # Callback: (BGR frame, capture time) -> result
+        self.annotate = annotate              # Callback: (BGR frame, result) -> annotated frame
+        self.on_frame = on_frame              # Optional cheap per-frame callback: (capture time)
+        self.broadcaster = broadcaster        # Annotated frames go here; viewers read from it
+        self.width = width                    # Capture + display size
+        self.height = height
+        self.inference_size = inference_size  # (w, h) of the copy given to infer() (None = capture size)
+        self.fps = fps
+        self.frame_skip = frame_skip          # Fixed cadence, used when no scheduler is given
+        self.scheduler = scheduler            # Optional AdaptiveScheduler picking the cadence live
+        self.mirror = mirror
+        self.source = source                  # Camera index, video file, image directory or 'synthetic'
+        self.metrics = metrics                # Optional StageMetrics (capture/flip/drawing + loop FPS)
+        self.pool = pool                      # Optional InferencePool running detection in processes
+        self.on_detection = on_detection      # Pool callback: (BGR frame, capture time, worker output) -> result
+        if pool is not None:
+            pool.on_result = self._pool_result
+        self.passthrough = passthrough        # Forward camera JPEGs; captured holds bytes, not frames
+
+        self.captured = LatestFrame()         # Raw (mirrored) camera frames, or JPEG bytes in passthrough
+        self.results = LatestFrame()          # Latest inference result
+
+        self._lock = threading.Lock()
+        self._threads = []
+        self._running = False
+
+        # Pipeline counters
+        self.stats = {
+            'captured': 0,
+            'inferred': 0,
+            'dropped': 0,                     # Stale frames skipped beyond the cadence
+            'annotated': 0,
+            'forwarded': 0                    # Camera JPEGs streamed untouched (passthrough)
+        }
+
+    # --- Lifecycle ---
+
+    def start(self, stream=True):
+        """
+        Start the pipeline stages (no-op if already running)
+        stream=False runs headless: capture + inference only, no drawing or encoding at all
+        """
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+        inference_loop = self._inference_loop if self.pool is None else self._submit_loop
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name='capture', daemon=True),
+            threading.Thread(target=inference_loop, name='inference', daemon=True)
+        ]
+        if stream and not self.passthrough:
+            self._threads.append(threading.Thread(target=self._stream_loop, name='stream', daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Stop all stages and wake up waiting clients"""
+        with self._lock:
+            self._running = False
+        for slot in (self.captured, self.results):
+            slot.wake()
+        self.broadcaster.close()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+        self._threads = []
+
+    @property
+    def running(self):
+        return self._running
+
+    @property
+    def subscribers(self):
+        return self.broadcaster.subscribers
+
+    # --- Stages ---
+
+    def _open_camera(self):
+        # Recordings loop at their own frame rate so they behave like a live camera
+        return open_source(self.source, self.width, self.height, self.fps,
+                           loop=True, realtime=True, mjpeg=self.passthrough)
+
+    def _capture_loop(self):
+        """Read frames as fast as the camera delivers them"""
+        cap = self._open_camera()
+
+        while self._running:
+            read_start = time.perf_counter()
+            if self.passthrough:
+                ret, frame = cap.read_jpeg()
+            else:
+                ret, frame = cap.read()
+            if not ret:
+                # Camera hiccup: reopen instead of killing the pipeline
+                print("⚠️ Camera read failed, reopening...")
+                cap.release()
+                time.sleep(0.5)
+                cap = self._open_camera()
+                continue
+
+            flip_start = time.perf_counter()
+            if self.passthrough:
+                # Viewers get the camera's bytes as they are, nothing drawn or encoded
+                if self.broadcaster.wants_frames():
+                    self.broadcaster.publish_jpeg(frame)
+                    self.stats['forwarded'] += 1
+                    if self.metrics is not None:
+                        self.metrics.tick('stream')
+            elif self.mirror:
+                frame = cv2.flip(frame, 1)
+
+            timestamp = time.time()
+            if self.metrics is not None:
+                self.metrics.observe('capture', flip_start - read_start, timestamp)
+                if not self.passthrough:
+                    self.metrics.observe('flip', time.perf_counter() - flip_start, timestamp)
+                self.metrics.tick('capture', timestamp)
+            self.captured.put((frame, timestamp))
+            self.stats['captured'] += 1
+            if self.scheduler is not None:
+                self.scheduler.frame_captured(timestamp)
+            if self.on_frame is not None:
+                self.on_frame(timestamp)
+
+        cap.release()
+
+    def _inference_loop(self):
+        """Run detection + control on the newest frame, dropping stale ones"""
+        last_seq = 0
+
+        while self._running:
+            frame_skip = self.scheduler.skip if self.scheduler is not None else self.frame_skip
+            seq, item = self.captured.get(last_seq, min_step=frame_skip)
+            if item is None:
+                continue
+
+            # Everything between the last processed frame and this one is stale
+            if last_seq:
+                self.stats['dropped'] += max(0, seq - last_seq - frame_skip)
+            last_seq = seq
+
+            frame, timestamp = self._inference_frame(item)
+            if frame is None:
+                continue
+            start = time.time()
+            try:
+                result = self.infer(frame, timestamp)
+            except Exception as e:
+                print(f"Inference Error: {e}")
+                continue
+            if self.scheduler is not None:
+                self.scheduler.inference_done(time.time() - start, frame)
+
+            self.results.put(result)
+            self.stats['inferred'] += 1
+            if self.metrics is not None:
+                self.metrics.tick('inference')
+
+    def _submit_loop(self):
+        """Pool variant of the inference stage: hand the newest frame to a free worker"""
+        last_seq = 0
+
+        while self._running:
+            # Wait for a free slot first so the frame we pick is as fresh as possible
+            if not self.pool.wait_for_slot(timeout=1.0):
+                continue
+
+            frame_skip = self.scheduler.skip if self.scheduler is not None else self.frame_skip
+            seq, item = self.captured.get(last_seq, min_step=frame_skip)
+            if item is None:
+                continue
+            if last_seq:
+                self.stats['dropped'] += max(0, seq - last_seq - frame_skip)
+            last_seq = seq
+
+            item = self._inference_frame(item)
+            if item[0] is not None:
+                self.pool.submit(item[0], item)
+
+    def _inference_frame(self, item):
+        """
+        (frame, timestamp) for inference at inference_size
+        In passthrough mode only these frames are decoded, at reduced size when possible
+        """
+        frame, timestamp = item
+        if self.passthrough:
+            start = time.perf_counter()
+            frame = decode_jpeg(frame, self._jpeg_reduce())
+            if frame is not None and self.mirror:
+                frame = cv2.flip(frame, 1)
+            if self.metrics is not None:
+                self.metrics.observe('decode', time.perf_counter() - start)
+
+        if frame is not None and self.inference_size and \
+                (frame.shape[1], frame.shape[0]) != tuple(self.inference_size):
+            start = time.perf_counter()
+            frame = cv2.resize(frame, tuple(self.inference_size), interpolation=cv2.INTER_AREA)
+            if self.metrics is not None:
+                self.metrics.observe('resize', time.perf_counter() - start)
+        return frame, timestamp
+
+    def _jpeg_reduce(self):
+        """Largest JPEG decode scale (8/4/2) that still covers the inference size"""
+        if not self.inference_size:
+            return 1
+        inference_w, inference_h = self.inference_size
+        for reduce in (8, 4, 2):
+            if self.width // reduce >= inference_w and self.height // reduce >= inference_h:
+                return reduce
+        return 1
+
+    def _pool_result(self, item, detection, latency):
+        """InferencePool callback (collector thread, frame order): decide on one result"""
+        frame, timestamp = item
+        if self.metrics is not None:
+            self.metrics.observe('inference', latency)
+        try:
+            result = self.on_detection(frame, timestamp, detection)
+        except Exception as e:
+            print(f"Inference Error: {e}")
+            return
+        if self.scheduler is not None:
+            self.scheduler.inference_done(latency, frame)
+
+        self.results.put(result)
+        self.stats['inferred'] += 1
+        if self.metrics is not None:
+            self.metrics.tick('inference')
+
+    def _stream_loop(self):
+        """Annotate the newest frame for the broadcaster, only while someone is watching"""
+        last_seq = 0
+
+        while self._running:
+            if not self.broadcaster.wait_for_demand(timeout=1.0):
+                continue
+
+            seq, item = self.captured.get(last_seq)
+            if item is None:
+                continue
+            last_seq = seq
+
+            # Copy so drawing never touches the frame inference may be reading
+            draw_start = time.perf_counter()
+            frame = self.annotate(item[0].copy(), self.results.peek())
+            if self.metrics is not None:
+                self.metrics.observe('drawing', time.perf_counter() - draw_start)
+                self.metrics.tick('stream')
+
+            # JPEG encoding happens lazily in the broadcaster, once per quality level
+            self.broadcaster.publish(frame)
+            self.stats['annotated'] += 1
+
+    # --- Clients ---
+
+    def frames(self, quality=None):
+        """Yield MJPEG parts for one client from the shared encode-once cache"""
+        return self.broadcaster.stream(quality)
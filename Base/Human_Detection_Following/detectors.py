@@ -0,0 +1,196 @@
+"""
+Pose Detector Backends
+Pluggable MediaPipe backends for the follower, selected by DETECTOR_BACKEND in app.py
+
+    pose     - MediaPipe Pose only (33 body landmarks) - fastest, recommended on the Pi
+    holistic - MediaPipe Holistic (pose + face mesh + hands) - original behaviour
+
+Every backend exposes process(frame_rgb) returning an object with .pose_landmarks,
+so analyze_pose() and the drawing code work unchanged with either one.
+
+RoiTracker wraps any backend and, once a person is found, only runs inference on a
+crop around their last nose/shoulder position.
+"""
+
+import cv2
+import mediapipe as mp
+
+# Same 33-point topology for both backends
+POSE_CONNECTIONS = mp.solutions.pose.POSE_CONNECTIONS
+
+
+class PoseDetector:
+    """Pose-only backend: skips the face-mesh and hand sub-models entirely"""
+
+    name = 'pose'
+
+    def __init__(self, model_complexity=0, min_detection_confidence=0.4,
+                 min_tracking_confidence=0.4, static_image_mode=False):
+        self.model = mp.solutions.pose.Pose(
+            static_image_mode=static_image_mode,
+            model_complexity=model_complexity,
+            smooth_landmarks=True,
+            enable_segmentation=False,
+            min_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence
+        )
+
+    def process(self, frame_rgb):
+        return self.model.process(frame_rgb)
+
+    def close(self):
+        self.model.close()
+
+
+class HolisticDetector:
+    """Holistic backend: pose + face mesh + both hands (original follower model)"""
+
+    name = 'holistic'
+
+    def __init__(self, model_complexity=0, min_detection_confidence=0.4,
+                 min_tracking_confidence=0.4, static_image_mode=False):
+        self.model = mp.solutions.holistic.Holistic(
+            static_image_mode=static_image_mode,
+            model_complexity=model_complexity,
+            smooth_landmarks=True,
+            min_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence
+        )
+
+    def process(self, frame_rgb):
+        return self.model.process(frame_rgb)
+
+    def close(self):
+        self.model.close()
+
+
+BACKENDS = {
+    PoseDetector.name: PoseDetector,
+    HolisticDetector.name: HolisticDetector
+}
+
+
+def create_detector(backend='pose', **kwargs):
+    """Build a detector backend by name"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown detector backend '{backend}' (choose from: {', '.join(BACKENDS)})")
+    return BACKENDS[backend](**kwargs)
+
+
+class RoiTracker:
+    """
+    Tracking wrapper: crop inference to an expanded box around the last known person
+    
+    - search mode: full-frame inference until a confident nose is found
+    - track mode:  crop a square around nose + shoulders, resize it to roi_size,
+                   run inference and remap landmarks back to full-frame coordinates
+    - falls back to a full-frame search as soon as confidence drops
+    
+    Uses two backend instances so MediaPipe's internal tracking never sees the
+    input size jump between full frames and crops.
+    """
+
+    def __init__(self, backend='pose', expand=2.5, roi_size=160, min_confidence=0.5,
+                 min_roi_fraction=0.35, **kwargs):
+        self.search_detector = create_detector(backend, **kwargs)
+        self.track_detector = create_detector(backend, **kwargs)
+        self.name = f"{backend}+roi"
+        self.expand = expand                  # Box side = person extent * expand
+        self.roi_size = roi_size              # Crop is resized to roi_size x roi_size (None = keep)
+        self.min_confidence = min_confidence  # Nose visibility needed to stay in track mode
+        self.min_roi_fraction = min_roi_fraction
+        self.roi = None                       # (x0, y0, x1, y1) in pixels, None = search mode
+        self.last_roi = None                  # ROI used for the most recent result (for drawing)
+        self.stats = {'search': 0, 'track': 0, 'lost': 0}
+
+    @property
+    def mode(self):
+        return 'track' if self.roi is not None else 'search'
+
+    def process(self, frame_rgb):
+        h, w = frame_rgb.shape[:2]
+
+        if self.roi is not None:
+            results = self._process_roi(frame_rgb, self.roi)
+            if self._confident(results):
+                self.stats['track'] += 1
+                self.last_roi = self.roi
+                self.roi = self._roi_from_landmarks(results.pose_landmarks, w, h)
+                return results
+            # Lost the person inside the box: search the full frame right away
+            self.stats['lost'] += 1
+            self.roi = None
+
+        results = self.search_detector.process(frame_rgb)
+        self.stats['search'] += 1
+        self.last_roi = None
+        if self._confident(results):
+            self.roi = self._roi_from_landmarks(results.pose_landmarks, w, h)
+        return results
+
+    def _confident(self, results):
+        return bool(results.pose_landmarks) and \
+            results.pose_landmarks.landmark[0].visibility >= self.min_confidence
+
+    def _process_roi(self, frame_rgb, roi):
+        """Run the tracking detector on a crop and remap landmarks to the full frame"""
+        h, w = frame_rgb.shape[:2]
+        x0, y0, x1, y1 = roi
+        crop = frame_rgb[y0:y1, x0:x1]
+        crop_w, crop_h = x1 - x0, y1 - y0
+        if self.roi_size:
+            # Fixed input size keeps the tracking model's cost constant
+            crop = cv2.resize(crop, (self.roi_size, self.roi_size), interpolation=cv2.INTER_AREA)
+
+        results = self.track_detector.process(crop)
+        if results.pose_landmarks:
+            for lm in results.pose_landmarks.landmark:
+                lm.x = (x0 + lm.x * crop_w) / w
+                lm.y = (y0 + lm.y * crop_h) / h
+                lm.z = lm.z * crop_w / w
+        return results
+
+    def _roi_from_landmarks(self, pose_landmarks, w, h):
+        """Square box around nose + shoulders, expanded and clamped to the frame"""
+        landmarks = pose_landmarks.landmark
+        points = [landmarks[i] for i in (0, 11, 12) if landmarks[i].visibility > 0.3]
+        xs = [p.x * w for p in points]
+        ys = [p.y * h for p in points]
+
+        cx = (min(xs) + max(xs)) / 2
+        cy = (min(ys) + max(ys)) / 2
+        extent = max(max(xs) - min(xs), max(ys) - min(ys), 1.0)
+        side = max(extent * self.expand, min(w, h) * self.min_roi_fraction)
+        side = int(min(side, w, h))
+
+        # Shift the box down a little: the body is below the nose/shoulder line
+        cy += side * 0.15
+
+        x0 = int(min(max(cx - side / 2, 0), w - side))
+        y0 = int(min(max(cy - side / 2, 0), h - side))
+        return (x0, y0, x0 + side, y0 + side)
+
+    def reset(self):
+        """Force a full-frame search on the next frame"""
+        self.roi = None
+
+    def close(self):
+        self.search_detector.close()
+        self.track_detector.close()
+
+
+def pool_worker(backend='pose', roi_tracking=True, roi_options=None, **kwargs):
+    """
+    InferencePool worker init (runs inside each worker process)
+    Returns process(frame_bgr) -> (pose_landmarks, roi), both picklable
+    """
+    if roi_tracking:
+        detector = RoiTracker(backend, **(roi_options or {}), **kwargs)
+    else:
+        detector = create_detector(backend, **kwargs)
+
+    def process(frame_bgr):
+        results = detector.process(cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB))
+        return results.pose_landmarks, getattr(detector, 'last_roi', None)
+
+    return process
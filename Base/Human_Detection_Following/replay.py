@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Offline Replay
+Runs the follower's detection + analyze_pose + command logic over a recording,
+as fast as possible, without a camera, MQTT broker or browser
+
+Frames are stamped with simulated camera time (frame index / source fps), so the
+tracker and command sequence are the same on a Pi and on a fast dev box.
+
+Usage:
+    python replay.py walk.mp4                       # Video file
+    python replay.py frames/ --every 2              # Image directory, inference every 2nd frame
+    python replay.py synthetic:300                  # Generated frames (throughput only)
+    python replay.py walk.mp4 --csv walk.csv        # Per-frame decisions for diffing
+    python replay.py walk.mp4 --min-fps 20          # Exit 1 if slower (for CI)
+"""
+
+import argparse
+import csv
+import sys
+import time
+import cv2
+
+import app
+from detectors import BACKENDS, create_detector, RoiTracker
+from tracker import PersonTracker
+from navis_common.frame_sources import open_source
+from navis_common.landmarks import to_array, NOSE, X
+from navis_common.metrics import StageMetrics
+
+
+def build_detector(args):
+    """The live app's detector unless the command line overrides it (or it runs in a pool)"""
+    if args.backend is None and not args.no_roi and app.detector is not None:
+        return app.detector
+    backend = args.backend or app.DETECTOR_BACKEND
+    if app.ROI_TRACKING and not args.no_roi:
+        return RoiTracker(backend, expand=app.ROI_EXPAND, roi_size=app.ROI_INPUT_SIZE,
+                          **app.detector_options)
+    return create_detector(backend, **app.detector_options)
+
+
+def replay(source, detector, args):
+    """Run the pipeline over every frame; returns (rows, metrics, frames, seconds)"""
+    metrics = StageMetrics('replay', window=float('inf'), max_samples=1000000)
+    tracker = PersonTracker(max_coast=app.TRACK_MAX_COAST, max_misses=app.TRACK_MAX_MISSES)
+    fps = source.fps or app.FPS
+    rows = []
+
+    start = time.perf_counter()
+    index = 0
+    while args.frames is None or index < args.frames:
+        with metrics.time('capture'):
+            ret, frame = source.read()
+        if not ret:
+            break
+        timestamp = index / fps
+
+        if not args.no_mirror:
+            with metrics.time('flip'):
+                frame = cv2.flip(frame, 1)
+
+        detected = False
+        if index % args.every == 0:
+            with metrics.time('convert'):
+                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            with metrics.time('inference'):
+                results = detector.process(frame_rgb)
+            with metrics.time('analysis'):
+                landmarks = to_array(results.pose_landmarks)
+                position, depth, depth_percent, _ = app.analyze_pose(frame, landmarks)
+                if position is not None:
+                    detected = True
+                    tracker.update(timestamp, float(landmarks[NOSE, X]), 1.0 - depth_percent)
+                else:
+                    tracker.miss()
+
+        # Control runs on every frame from the filtered estimate, like control() in app.py
+        with metrics.time('control'):
+            estimate = tracker.estimate(timestamp)
+            if estimate is not None:
+                nose_x = estimate[0]
+                position, depth, depth_percent = app.classify_position(estimate[0], estimate[1])
+                command = app.decide_command(position, depth)
+            else:
+                nose_x = position = depth = depth_percent = None
+                command = 'S'
+
+        rows.append({
+            'frame': index,
+            'time': round(timestamp, 3),
+            'detected': int(detected),
+            'nose_x': round(nose_x, 4) if nose_x is not None else '',
+            'position': position or '',
+            'depth': depth or '',
+            'command': command
+        })
+        index += 1
+
+    return rows, metrics, index, time.perf_counter() - start
+
+
+def command_changes(rows):
+    """Run-length encode the per-frame commands: [(frame, time, command)]"""
+    changes = []
+    for row in rows:
+        if not changes or changes[-1][2] != row['command']:
+            changes.append((row['frame'], row['time'], row['command']))
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recording through the follower pipeline")
+    parser.add_argument('source', help="Video file, image directory, 'synthetic[:N]' or camera index")
+    parser.add_argument('--frames', type=int, help="Stop after this many frames")
+    parser.add_argument('--every', type=int, default=1, help="Run inference every Nth frame (frame skip)")
+    parser.add_argument('--width', type=int, default=app.INFERENCE_WIDTH, help="Inference width")
+    parser.add_argument('--height', type=int, default=app.INFERENCE_HEIGHT, help="Inference height")
+    parser.add_argument('--backend', choices=list(BACKENDS), help="Override DETECTOR_BACKEND")
+    parser.add_argument('--no-roi', action='store_true', help="Disable ROI tracking")
+    parser.add_argument('--no-mirror', action='store_true', help="Recording is already mirrored")
+    parser.add_argument('--csv', help="Write per-frame decisions to this CSV file")
+    parser.add_argument('--min-fps', type=float, help="Exit with status 1 below this throughput")
+    args = parser.parse_args()
+    args.every = max(1, args.every)
+
+    try:
+        source = open_source(args.source, args.width, args.height, app.FPS)
+    except ValueError as e:
+        raise SystemExit(f"❌ {e}")
+    detector = build_detector(args)
+
+    rows, metrics, frames, elapsed = replay(source, detector, args)
+    source.release()
+    if not frames:
+        raise SystemExit("❌ Could not read any frames from the source")
+
+    throughput = frames / elapsed if elapsed > 0 else 0
+    duration = rows[-1]['time'] + 1.0 / (source.fps or app.FPS)
+    detections = sum(row['detected'] for row in rows)
+
+    print(f"🎬 Replay: {args.source} ({frames} frames, {args.width}x{args.height}, "
+          f"detector={detector.name}, inference every {args.every})")
+    print("-" * 60)
+    print(f"Throughput: {throughput:.1f} FPS ({elapsed:.2f}s for {duration:.1f}s of video, "
+          f"{duration / elapsed:.1f}x realtime)")
+    print(f"Detections: {detections}/{-(-frames // args.every)} inferences")
+    print()
+    print(f"{'stage':<10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'count':>7}")
+    for stage, stats in metrics.summary().items():
+        print(f"{stage:<10} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} "
+              f"{stats['p99_ms']:>9.2f} {stats['count']:>7}")
+    print()
+    print("Commands:")
+    for frame_index, timestamp, command in command_changes(rows):
+        print(f"  frame {frame_index:>5}  {timestamp:>7.2f}s  {command}")
+    print("-" * 60)
+
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"💾 Per-frame decisions written to {args.csv}")
+
+    if args.min_fps is not None and throughput < args.min_fps:
+        print(f"❌ Throughput {throughput:.1f} FPS is below --min-fps {args.min_fps:g}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Person Tracker
+Constant-velocity Kalman filter over nose x and shoulder width
+
+Inference only runs on some camera frames. Between measurements the tracker
+extrapolates the person's position, so the control loop can make a decision on
+every camera frame from a filtered estimate instead of reusing stale values.
+"""
+
+import numpy as np
+from threading import Lock
+
+
+class PersonTracker:
+    """Kalman filter with state [nose_x, vel_x, shoulder_w, vel_w] (normalized units)"""
+
+    def __init__(self, process_noise=2.0, measurement_noise_x=0.02,
+                 measurement_noise_w=0.03, max_coast=0.5, max_misses=2):
+        self.process_noise = process_noise    # Acceleration variance (units/s^2)^2
+        self.max_coast = max_coast            # Seconds without a measurement before giving up
+        self.max_misses = max_misses          # Consecutive "no person" inferences before giving up
+
+        self.H = np.array([[1, 0, 0, 0],
+                           [0, 0, 1, 0]], dtype=float)
+        self.R = np.diag([measurement_noise_x ** 2, measurement_noise_w ** 2])
+
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget the person (next measurement re-initializes the filter)"""
+        self.x = None                         # Posterior state at self.t
+        self.P = None
+        self.t = None
+        self.misses = 0
+
+    @property
+    def active(self):
+        return self.x is not None
+
+    def _transition(self, dt):
+        F = np.eye(4)
+        F[0, 1] = dt
+        F[2, 3] = dt
+        # Piecewise white-acceleration noise for each (position, velocity) pair
+        block = np.array([[dt ** 4 / 4, dt ** 3 / 2],
+                          [dt ** 3 / 2, dt ** 2]]) * self.process_noise
+        Q = np.zeros((4, 4))
+        Q[0:2, 0:2] = block
+        Q[2:4, 2:4] = block
+        return F, Q
+
+    def update(self, timestamp, nose_x, shoulder_width):
+        """Fuse a measurement taken at timestamp (camera time of the inferred frame)"""
+        z = np.array([nose_x, shoulder_width], dtype=float)
+        with self._lock:
+            self.misses = 0
+            if self.x is None:
+                self.x = np.array([nose_x, 0.0, shoulder_width, 0.0])
+                self.P = np.diag([self.R[0, 0], 1.0, self.R[1, 1], 1.0])
+                self.t = timestamp
+                return
+
+            # Predict posterior forward to the measurement time
+            dt = max(timestamp - self.t, 0.0)
+            F, Q = self._transition(dt)
+            x = F @ self.x
+            P = F @ self.P @ F.T + Q
+
+            # Standard Kalman update
+            y = z - self.H @ x
+            S = self.H @ P @ self.H.T + self.R
+            K = P @ self.H.T @ np.linalg.inv(S)
+            self.x = x + K @ y
+            self.P = (np.eye(4) - K @ self.H) @ P
+            self.t = timestamp
+
+    def miss(self):
+        """Inference ran but found nobody"""
+        with self._lock:
+            self.misses += 1
+            if self.misses >= self.max_misses:
+                self.reset()
+
+    def estimate(self, timestamp):
+        """
+        Predicted (nose_x, shoulder_width, vel_x) at timestamp
+        Returns None if there is no track or it has coasted for too long
+        """
+        with self._lock:
+            if self.x is None:
+                return None
+            dt = timestamp - self.t
+            if dt > self.max_coast:
+                self.reset()
+                return None
+            dt = max(dt, 0.0)
+            nose_x = float(np.clip(self.x[0] + self.x[1] * dt, 0.0, 1.0))
+            shoulder_width = float(np.clip(self.x[2] + self.x[3] * dt, 0.0, 1.0))
+            return nose_x, shoulder_width, float(self.x[1])
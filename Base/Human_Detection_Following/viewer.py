@@ -7,6 +7,15 @@ Shows skeleton, zones, and depth visualization without web server
 import cv2
 import mediapipe as mp
 import numpy as np
+import os
+import sys
+
+# Shared NAVIS helpers live at the repo root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from navis_common.landmarks import to_array, follow_inputs
+
+from overlay import (StaticOverlay, draw_viewer_zones, draw_depth_bar_frame,
+                     depth_threshold_drawer, draw_depth_fill)
 
 # Configuration
 FRAME_WIDTH = 640
@@ -30,19 +39,16 @@ def analyze_pose(frame, results):
     """Analyze person position and depth"""
     h, w, c = frame.shape
     
-    if not results.pose_landmarks:
+    landmarks = to_array(results.pose_landmarks)
+    if landmarks is None:
         return None, None, None
     
-    landmarks = results.pose_landmarks.landmark
-    nose = landmarks[0]
-    left_shoulder = landmarks[11]
-    right_shoulder = landmarks[12]
-    
-    if nose.visibility < 0.5:
+    # Nose x + shoulder width from the landmark array (NaN if the nose is not visible)
+    nose_x_norm, _, shoulder_width_norm = follow_inputs(landmarks).tolist()
+    if np.isnan(nose_x_norm):
         return None, None, None
     
     # Position
-    nose_x_norm = nose.x
     if nose_x_norm < (0.5 - CENTER_TOLERANCE):
         position = 'LEFT'
     elif nose_x_norm > (0.5 + CENTER_TOLERANCE):
@@ -51,12 +57,6 @@ def analyze_pose(frame, results):
         position = 'CENTER'
     
     # Depth
-    if left_shoulder.visibility > 0.5 and right_shoulder.visibility > 0.5:
-        shoulder_width = abs(right_shoulder.x - left_shoulder.x)
-        shoulder_width_norm = shoulder_width
-    else:
-        shoulder_width_norm = 0.3
-    
     depth_percent = 1.0 - np.clip(shoulder_width_norm, 0, 1)
     
     if depth_percent < DEPTH_THRESHOLD_NEAR:
@@ -68,6 +68,11 @@ def analyze_pose(frame, results):
     
     return position, depth, depth_percent
 
+# Static HUD layers, rasterized once per resolution
+zones_overlay = StaticOverlay(draw_viewer_zones)
+depth_frame_overlay = StaticOverlay(draw_depth_bar_frame)
+depth_threshold_overlay = StaticOverlay(depth_threshold_drawer(DEPTH_THRESHOLD_NEAR, DEPTH_THRESHOLD_FAR))
+
 def main():
     """Main debugging viewer"""
     cap = cv2.VideoCapture(0)
@@ -105,22 +110,8 @@ def main():
                 mp_drawing.DrawingSpec(color=(255, 0, 0), thickness=2)
             )
         
-        # Draw zones
-        zone_w = w // 3
-        cv2.rectangle(frame, (0, 0), (zone_w, h), (100, 100, 100), 2)
-        cv2.putText(frame, "LEFT", (zone_w//2 - 30, 50), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (100, 100, 100), 2)
-        
-        cv2.rectangle(frame, (zone_w, 0), (2*zone_w, h), (100, 100, 100), 2)
-        cv2.putText(frame, "CENTER", (zone_w + zone_w//2 - 50, 50), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (100, 100, 100), 2)
-        
-        cv2.rectangle(frame, (2*zone_w, 0), (w, h), (100, 100, 100), 2)
-        cv2.putText(frame, "RIGHT", (2*zone_w + zone_w//2 - 40, 50), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (100, 100, 100), 2)
-        
-        # Center marker
-        cv2.circle(frame, (w//2, h//2), 5, (0, 255, 255), -1)
+        # Draw zones, labels and center marker (precomputed layer)
+        zones_overlay.apply(frame)
         
         # Analyze
         position, depth, depth_percent = analyze_pose(frame, results)
@@ -135,21 +126,10 @@ def main():
             cv2.putText(frame, f"Distance: {depth_percent*100:.1f}%", (10, y+60),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
             
-            # Draw depth bar
-            bar_x = w - 100
-            bar_y = 30
-            bar_h = 200
-            cv2.rectangle(frame, (bar_x, bar_y), (bar_x+50, bar_y+bar_h), (100, 100, 100), 2)
-            
-            # Fill percentage
-            fill_h = int(bar_h * depth_percent)
-            cv2.rectangle(frame, (bar_x, bar_y+bar_h-fill_h), (bar_x+50, bar_y+bar_h), (0, 255, 0), -1)
-            
-            # Thresholds
-            cv2.line(frame, (bar_x, int(bar_y+bar_h*(1-DEPTH_THRESHOLD_NEAR))), 
-                    (bar_x+50, int(bar_y+bar_h*(1-DEPTH_THRESHOLD_NEAR))), (0, 0, 255), 2)
-            cv2.line(frame, (bar_x, int(bar_y+bar_h*(1-DEPTH_THRESHOLD_FAR))), 
-                    (bar_x+50, int(bar_y+bar_h*(1-DEPTH_THRESHOLD_FAR))), (255, 0, 0), 2)
+            # Draw depth bar: static frame, dynamic fill, static thresholds on top
+            depth_frame_overlay.apply(frame)
+            draw_depth_fill(frame, depth_percent)
+            depth_threshold_overlay.apply(frame)
         else:
             cv2.putText(frame, "NO PERSON DETECTED", (10, 30),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
@@ -1,14 +1,29 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response
 import paho.mqtt.client as mqtt
-import json
 import os
+import sys
+
+# Shared NAVIS helpers live at the repo root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from navis_common.mqtt_publisher import CommandPublisher, STOP_COMMANDS
+from navis_common.metrics import StageMetrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
 
 app = Flask(__name__)
 
+# MQTT publish/ack latency + command rate (GET /metrics)
+metrics = StageMetrics('remote_control')
+
 # --- MQTT Setup ---
 MQTT_BROKER = "localhost"
 MQTT_TOPIC = "robot/control"
+MQTT_QOS = 1                   # Manual driving: have the broker acknowledge every command
+COMMAND_MIN_INTERVAL = 0.05    # Button mashing collapses to at most 20 commands/s
 client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+# No hysteresis here: a human pressed the button on purpose
+publisher = CommandPublisher(client, MQTT_TOPIC, qos=MQTT_QOS,
+                             min_interval=COMMAND_MIN_INTERVAL, hold_time=0.0,
+                             metrics=metrics)
+publisher.start()
 
 try:
     client.connect(MQTT_BROKER, 1883, 60)
@@ -27,10 +42,34 @@ def send_command():
     cmd = data.get('cmd')
     speed = data.get('speed', 200)
     
-    payload = json.dumps({"cmd": cmd, "speed": int(speed)})
-    client.publish(MQTT_TOPIC, payload)
+    if cmd not in ('F', 'B', 'L', 'R', 'S'):
+        return jsonify({"status": "error", "error": f"unknown command {cmd!r}"}), 400
+    
+    # A repeated press is sent again; STOP jumps the queue
+    publisher.submit(cmd, speed, force=cmd in STOP_COMMANDS, repeat=True)
+    metrics.tick('commands')
     
-    return jsonify({"status": "sent", "command": cmd, "speed": speed})
+    return jsonify({"status": "queued", "command": cmd, "speed": speed})
+
+@app.route('/status')
+def status():
+    """MQTT delivery metrics"""
+    status = publisher.status()
+    status['command_rate'] = round(metrics.fps('commands'), 1)
+    status['stages'] = metrics.summary()
+    return jsonify(status)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """MQTT latency and command rate in Prometheus text format"""
+    mqtt_status = publisher.status()
+    text = metrics.prometheus({
+        'mqtt_connected': mqtt_status['connected'],
+        'mqtt_commands_dropped': mqtt_status['dropped'],
+        'mqtt_commands_coalesced': mqtt_status['coalesced'],
+        'mqtt_disconnects': mqtt_status['disconnects']
+    })
+    return Response(text, content_type=METRICS_CONTENT_TYPE)
 
 if __name__ == '__main__':
     # Use port 5050 as 5000 was occupied
@@ -1,157 +1,313 @@
-from flask import Flask, render_template, Response, request, redirect, url_for
-import cv2
-import os
-import face_recognition
-from simple_facerec import SimpleFacerec
-import time
-
-app = Flask(__name__)
-
-UPLOAD_FOLDER = 'static'
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-
-# Optimization parameters
-FRAME_SKIP = 2  # Process every 2nd frame for speed
-FRAME_WIDTH = 640  # Reduced from 1280 for faster processing
-FRAME_HEIGHT = 480  # Reduced from 720
-JPEG_QUALITY = 60  # Reduced from default for faster encoding
-
-sfr = SimpleFacerec()
-sfr.load_encoding_images("images/")
-
-# Dynamic faces
-dynamic_encodings = []
-dynamic_names = []
-
-# Webcam and detection control
-camera = None
-detection_active = False
-frame_count = 0
-detection_results = {}  # Cache detection results
-
-def generate_frames():
-    global camera, detection_active, frame_count, detection_results
-    if camera is None:
-        camera = cv2.VideoCapture(0)
-        camera.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
-        camera.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
-        camera.set(cv2.CAP_PROP_FPS, 30)
-        camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Reduce latency
-
-    while detection_active:
-        success, frame = camera.read()
-        if not success:
-            break
-
-        frame_count += 1
-        display_frame = frame.copy()
-        
-        # Process only every N frames
-        if frame_count % FRAME_SKIP == 0:
-            # Slight brightness adjustment
-            display_frame = cv2.convertScaleAbs(frame, alpha=1.1, beta=10)
-
-            # Single detection pass - avoid duplicate detections
-            small_frame = cv2.resize(frame, (0, 0), fx=0.5, fy=0.5)
-            rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
-            
-            # Detect all faces
-            face_locations = face_recognition.face_locations(rgb_small_frame, model="hog")
-            face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations)
-
-            # Match each face
-            for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-                name = "Unknown"
-                color = (0, 0, 255)  # Red for unknown
-                
-                # First try to match against dynamic encodings (uploaded faces)
-                if dynamic_encodings:
-                    matches = face_recognition.compare_faces(dynamic_encodings, face_encoding, tolerance=0.6)
-                    face_distances = face_recognition.face_distance(dynamic_encodings, face_encoding)
-                    
-                    if len(face_distances) > 0:
-                        best_match_index = face_distances.argmin()
-                        if matches[best_match_index]:
-                            name = dynamic_names[best_match_index]
-                            color = (0, 255, 0)  # Green for recognized
-                
-                # If not matched in dynamic, try known faces from images folder
-                if name == "Unknown" and sfr.known_face_encodings:
-                    matches = face_recognition.compare_faces(sfr.known_face_encodings, face_encoding, tolerance=0.6)
-                    face_distances = face_recognition.face_distance(sfr.known_face_encodings, face_encoding)
-                    
-                    if len(face_distances) > 0:
-                        best_match_index = face_distances.argmin()
-                        if matches[best_match_index]:
-                            name = sfr.known_face_names[best_match_index]
-                            color = (0, 255, 0)  # Green for recognized
-
-                # Scale back up to original frame size
-                top *= 2
-                right *= 2
-                bottom *= 2
-                left *= 2
-
-                cv2.rectangle(display_frame, (left, top), (right, bottom), color, 2)
-                cv2.putText(display_frame, name, (left, top - 10), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
-
-        # Encode frame with optimized quality
-        ret, buffer = cv2.imencode('.jpg', display_frame, 
-                                   [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
-        frame_bytes = buffer.tobytes()
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-
-@app.route('/')
-def index():
-    # global detection_active
-    # detection_active = False
-    return render_template('index.html')
-
-@app.route('/upload', methods=['POST'])
-def upload():
-    global dynamic_encodings, dynamic_names, detection_active
-    if 'image' not in request.files or 'name' not in request.form:
-        return "Missing data", 400
-
-    file = request.files['image']
-    user_name = request.form['name'].strip()
-
-    if file.filename == '' or user_name == '':
-        return "No file or name provided", 400
-
-    filepath = os.path.join(app.config['UPLOAD_FOLDER'], 'uploaded.jpg')
-    file.save(filepath)
-
-    image = face_recognition.load_image_file(filepath)
-    encodings = face_recognition.face_encodings(image)
-
-    if len(encodings) == 0:
-        return "No face detected in uploaded image.", 400
-
-    dynamic_encodings = [encodings[0]]
-    dynamic_names = [user_name]
-    detection_active = True
-    return redirect(url_for('live'))
-
-@app.route('/live')
-def live():
-    return render_template('live.html')
-
-@app.route('/video_feed')
-def video_feed():
-    return Response(generate_frames(),
-                    mimetype='multipart/x-mixed-replace; boundary=frame')
-
-@app.route('/stop')
-def stop():
-    global detection_active, camera
-    detection_active = False
-    if camera is not None:
-        camera.release()
-        camera = None
-    return redirect(url_for('index'))
-
-if __name__ == "__main__":
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+from flask import Flask, render_template, Response, request, redirect, url_for, jsonify
+import cv2
+import atexit
+import os
+import sys
+import face_recognition
+from simple_facerec import SimpleFacerec
+from face_gallery import FaceGallery
+from face_index import create_index
+from face_tracker import FaceTracker, IOU_THRESHOLD, max_iou
+import time
+from threading import Lock, Thread
+
+# Shared NAVIS helpers live at the repo root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from navis_common.scheduler import AdaptiveScheduler
+from navis_common.inference_pool import InferencePool
+from navis_common.broadcaster import FrameBroadcaster
+from navis_common.frame_sources import open_source
+from navis_common.metrics import StageMetrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+
+app = Flask(__name__)
+
+# Per-stage latency windows + rolling FPS (GET /metrics, 'stages' in /status)
+metrics = StageMetrics('face_recognition')
+
+UPLOAD_FOLDER = 'static'
+app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+
+# Optimization parameters
+TARGET_INFERENCE_RATE = 8  # Wanted recognition passes per second (adaptive frame skip)
+CPU_BUDGET = 0.7  # Max share of one core spent in face detection + encoding
+MAX_FRAME_SKIP = 6
+FRAME_WIDTH = 640  # Capture + display size, reduced from 1280
+FRAME_HEIGHT = 480  # Reduced from 720
+INFERENCE_WIDTH = 320  # Face detection + encoding run on a copy scaled to this size
+INFERENCE_HEIGHT = 240
+CAMERA_SOURCE = os.environ.get('NAVIS_SOURCE', 0)  # Camera index, video file, image dir or 'synthetic'
+JPEG_QUALITY = 60  # Reduced from default for faster encoding
+IDLE_TIMEOUT = 5  # Release the camera after 5s without viewers
+INFERENCE_WORKERS = int(os.environ.get('NAVIS_INFERENCE_WORKERS', 0))  # >0: detection + encoding in this many processes
+ENROLMENT_WORKERS = int(os.environ.get('NAVIS_ENROLMENT_WORKERS', 0))  # Processes encoding images/ at startup (0 = one per core)
+# 'ivf' for very large galleries: ~10x faster at 100k and returning visitors are still
+# found, but recall@1 for strangers drops (~0.7 at 20k) - see face_index.py.
+# 'balltree' is exact but slower than brute force on 128-d encodings (comparison only)
+GALLERY_INDEX = os.environ.get('NAVIS_GALLERY_INDEX', 'brute')
+
+def face_worker():
+    """InferencePool worker init: inference-size BGR frame -> (face locations, encodings)"""
+    def process(small_frame, settled_boxes=()):
+        rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+        face_locations = face_recognition.face_locations(rgb_small_frame, model="hog")
+        # Faces on a settled track keep their name: no encoding (None)
+        to_encode = [i for i, location in enumerate(face_locations)
+                     if max_iou(location, settled_boxes) < IOU_THRESHOLD]
+        encodings = face_recognition.face_encodings(rgb_small_frame, [face_locations[i] for i in to_encode])
+        face_encodings = [None] * len(face_locations)
+        for i, encoding in zip(to_encode, encodings):
+            face_encodings[i] = encoding
+        return face_locations, face_encodings
+    return process
+
+# Fork the workers before anything else starts a thread
+if INFERENCE_WORKERS > 0:
+    inference_pool = InferencePool(face_worker, max_frame_shape=(INFERENCE_HEIGHT, INFERENCE_WIDTH, 3),
+                                   workers=INFERENCE_WORKERS)
+    inference_pool.start()
+    atexit.register(inference_pool.close)
+else:
+    inference_pool = None
+
+# Uploaded ('dynamic') and images-folder ('known') faces share one matrix
+gallery = FaceGallery(tolerance=0.6, index=None if GALLERY_INDEX == 'brute' else create_index(GALLERY_INDEX))
+sfr = SimpleFacerec(gallery)
+# Cached faces are loaded now; new images are encoded in the background while the app serves
+enrolment_thread = sfr.start_encoding_images("images/", workers=ENROLMENT_WORKERS or None)
+
+# Webcam and detection control
+camera = None
+detection_active = False
+frame_count = 0
+tracker = FaceTracker()  # Faces across frames: only new / due tracks are encoded
+scheduler = AdaptiveScheduler(TARGET_INFERENCE_RATE, CPU_BUDGET * max(1, INFERENCE_WORKERS), camera_fps=30,
+                              max_skip=MAX_FRAME_SKIP)
+
+# Annotated frames are encoded once and shared by every viewer
+broadcaster = FrameBroadcaster(JPEG_QUALITY, metrics=metrics)
+capture_thread = None
+capture_lock = Lock()
+
+def verify_tracks(tracks, face_encodings):
+    """Match one encoding per track (one batched lookup) and add the result to its identity votes"""
+    for track, (name, distance) in zip(tracks, gallery.identify(face_encodings)):
+        tracker.vote(track, name, distance)
+
+def track_label(track):
+    """Name + box colour of a track, from its identity votes"""
+    if track.name is None:
+        return "Unknown", (0, 0, 255)  # Red for unknown
+    return track.name, (0, 255, 0)  # Green for recognized
+
+def inference_copy(frame):
+    """Frame scaled to the inference size"""
+    return cv2.resize(frame, (INFERENCE_WIDTH, INFERENCE_HEIGHT), interpolation=cv2.INTER_AREA)
+
+def draw_face(display_frame, location, name, color):
+    """Box + label for one face (location in inference pixels)"""
+    # Scale back up to display size
+    h, w = display_frame.shape[:2]
+    sx, sy = w / INFERENCE_WIDTH, h / INFERENCE_HEIGHT
+    top, right, bottom, left = location
+    top, right, bottom, left = int(top * sy), int(right * sx), int(bottom * sy), int(left * sx)
+    cv2.rectangle(display_frame, (left, top), (right, bottom), color, 2)
+    cv2.putText(display_frame, name, (left, top - 10), 
+               cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+
+latest_faces = []  # [(location, name, color)] of the newest processed frame, drawn on every frame
+
+def on_faces(thumbnail, result, latency):
+    """InferencePool callback (frame order): track the worker's faces, match the encoded ones"""
+    global latest_faces
+    metrics.observe('inference', latency)
+    metrics.tick('inference')
+    scheduler.inference_done(latency, thumbnail)
+    if result is None:
+        return
+    face_locations, face_encodings = result
+    with metrics.time('analysis'):
+        tracks = tracker.update(face_locations)
+        encoded = [(track, encoding) for track, encoding in zip(tracks, face_encodings) if encoding is not None]
+        verify_tracks([track for track, _ in encoded], [encoding for _, encoding in encoded])
+        latest_faces = [(track.location,) + track_label(track) for track in tracks]
+
+if inference_pool is not None:
+    inference_pool.on_result = on_faces
+
+def capture_loop():
+    """Single capture + recognition loop, publishes annotated frames to the broadcaster"""
+    global camera, detection_active, frame_count, latest_faces
+    if camera is None:
+        camera = open_source(CAMERA_SOURCE, FRAME_WIDTH, FRAME_HEIGHT, 30, loop=True, realtime=True)
+
+    frames_since_submit = 0
+    last_demand = time.time()
+    latest_faces = []  # Nothing from a previous viewer session
+    while detection_active:
+        # Stop when nobody has been watching for a while (next viewer restarts it)
+        if broadcaster.wants_frames():
+            last_demand = time.time()
+        elif time.time() - last_demand > IDLE_TIMEOUT:
+            break
+
+        with metrics.time('capture'):
+            success, frame = camera.read()
+        if not success:
+            break
+
+        frame_count += 1
+        metrics.tick('capture')
+        with metrics.time('convert'):
+            # Slight brightness adjustment (every frame, so skipped ones do not flicker)
+            display_frame = cv2.convertScaleAbs(frame, alpha=1.1, beta=10)
+        
+        if inference_pool is not None:
+            # Workers detect + encode every skip-th frame; on_faces() updates latest_faces
+            scheduler.frame_captured()
+            frames_since_submit += 1
+            if frames_since_submit >= scheduler.skip:
+                thumbnail = cv2.resize(frame, (40, 30), interpolation=cv2.INTER_AREA)  # For motion
+                if inference_pool.submit(inference_copy(frame), thumbnail, args=(tracker.settled_boxes(),)):
+                    frames_since_submit = 0
+
+        # Process only when the adaptive scheduler says it is due
+        elif scheduler.should_process():
+            inference_start = time.time()
+
+            with metrics.time('convert'):
+                # Single detection pass - avoid duplicate detections
+                small_frame = inference_copy(frame)
+                rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+            
+            # Detect all faces, encode only those on new or due tracks
+            with metrics.time('inference'):
+                face_locations = face_recognition.face_locations(rgb_small_frame, model="hog")
+                tracks = tracker.update(face_locations)
+                due = tracker.due(tracks)
+                face_encodings = face_recognition.face_encodings(rgb_small_frame, [track.location for track in due])
+            metrics.tick('inference')
+
+            # Match the encoded faces at once
+            with metrics.time('analysis'):
+                verify_tracks(due, face_encodings)
+                latest_faces = [(track.location,) + track_label(track) for track in tracks]
+
+            scheduler.inference_done(time.time() - inference_start, small_frame)
+
+        # Newest matched faces on every frame, processed or skipped by the scheduler
+        with metrics.time('drawing'):
+            for location, name, color in latest_faces:
+                draw_face(display_frame, location, name, color)
+
+        # Hand off to viewers (JPEG encoding happens once, on demand)
+        broadcaster.publish(display_frame)
+
+    if camera is not None:
+        camera.release()
+        camera = None
+
+def start_capture():
+    """Start the single capture thread if it is not running"""
+    global capture_thread
+    with capture_lock:
+        if capture_thread is None or not capture_thread.is_alive():
+            capture_thread = Thread(target=capture_loop, daemon=True)
+            capture_thread.start()
+
+def generate_frames(quality=None):
+    """Stream the shared annotated frames to one client"""
+    start_capture()
+    return broadcaster.stream(quality)
+
+@app.route('/')
+def index():
+    # global detection_active
+    # detection_active = False
+    return render_template('index.html')
+
+@app.route('/upload', methods=['POST'])
+def upload():
+    global detection_active
+    if 'image' not in request.files or 'name' not in request.form:
+        return "Missing data", 400
+
+    file = request.files['image']
+    user_name = request.form['name'].strip()
+
+    if file.filename == '' or user_name == '':
+        return "No file or name provided", 400
+
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], 'uploaded.jpg')
+    file.save(filepath)
+
+    image = face_recognition.load_image_file(filepath)
+    encodings = face_recognition.face_encodings(image)
+
+    if len(encodings) == 0:
+        return "No face detected in uploaded image.", 400
+
+    # The new upload replaces the previous one
+    gallery.replace('dynamic', [encodings[0]], [user_name])
+    tracker.reset_identities()  # Faces on screen may be the new upload
+    detection_active = True
+    return redirect(url_for('live'))
+
+@app.route('/live')
+def live():
+    return render_template('live.html')
+
+@app.route('/video_feed')
+def video_feed():
+    quality = request.args.get('quality', type=int)
+    return Response(generate_frames(quality),
+                    mimetype='multipart/x-mixed-replace; boundary=frame')
+
+@app.route('/snapshot.jpg')
+def snapshot():
+    if detection_active:
+        start_capture()
+    frame_bytes = broadcaster.snapshot(request.args.get('quality', type=int))
+    if frame_bytes is None:
+        return "No frame available yet", 503
+    return Response(frame_bytes, mimetype='image/jpeg')
+
+@app.route('/status')
+def status():
+    return jsonify({
+        'detection_active': detection_active,
+        'frame_count': frame_count,
+        'fps': round(metrics.fps('capture'), 1),
+        'inference_fps': round(metrics.fps('inference'), 1),
+        'stages': metrics.summary(),
+        'known_faces': gallery.count('known'),
+        'encoding_cache': sfr.cache_stats,
+        'enrolment': dict(sfr.enrolment),
+        'viewers': broadcaster.subscribers,
+        'jpeg': dict(broadcaster.stats),
+        'scheduler': scheduler.status(),
+        'face_tracker': tracker.status(),
+        'inference_pool': inference_pool.status() if inference_pool is not None else None
+    })
+
+@app.route('/metrics')
+def metrics_endpoint():
+    text = metrics.prometheus({
+        'detection_active': detection_active,
+        'viewers': broadcaster.subscribers,
+        'frame_skip': scheduler.skip,
+        'known_faces': gallery.count('known')
+    })
+    return Response(text, content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/stop')
+def stop():
+    global detection_active
+    detection_active = False
+    # The capture thread sees the flag and releases the camera itself
+    if capture_thread is not None:
+        capture_thread.join(timeout=2.0)
+    return redirect(url_for('index'))
+
+if __name__ == "__main__":
+    # No reloader: it would run the enrolment and inference pools a second time in its child
+    app.run(host='0.0.0.0', port=5000, debug=True, use_reloader=False)
\ No newline at end of file
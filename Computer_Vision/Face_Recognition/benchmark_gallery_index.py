@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Gallery Index Benchmark
+Recall@1 and single-face query latency of the face_index indexes against exact
+brute force, at several gallery sizes.
+
+Galleries are dlib-scale random embeddings (unrelated faces ~1.4 apart). Half of
+the probes are perturbed gallery entries (a returning visitor, ~0.25 from their
+row), half are fresh vectors (a stranger). Recall@1 is the share of probes whose
+top-1 id equals the brute-force top-1; "visitors" counts only the returning ones,
+which is what decides a name in identify().
+
+Each index is also saved, loaded back and checked to answer the same, and gets
+one incremental add + remove before the queries are timed.
+The ball tree is exact unless --max-leaves caps the leaves scanned per query;
+in 128 dimensions expect it to be slower than brute force when exact.
+
+Usage:
+    python benchmark_gallery_index.py
+    python benchmark_gallery_index.py --sizes 1000,10000,100000 --queries 500
+    python benchmark_gallery_index.py --sizes 20000 --nprobe 8,16,32
+    python benchmark_gallery_index.py --sizes 20000 --max-leaves 64
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from face_index import create_index, load_index
+
+ENCODING_SIZE = 128
+
+
+def synthetic_gallery(size, queries, seed=0):
+    """(gallery, probes, visitor mask)"""
+    rng = np.random.default_rng(seed)
+    gallery = rng.normal(0, 0.09, (size, ENCODING_SIZE)).astype(np.float32)
+    visitors = rng.random(queries) < 0.5
+    probes = rng.normal(0, 0.09, (queries, ENCODING_SIZE)).astype(np.float32)
+    rows = rng.integers(0, size, queries)
+    probes[visitors] = gallery[rows[visitors]] + rng.normal(0, 0.02, (int(visitors.sum()), ENCODING_SIZE))
+    return gallery, probes, visitors
+
+
+def query_latency(index, probes):
+    """Median microseconds for one face (one call per probe, as verify_tracks() does for one new face)"""
+    samples = []
+    for probe in probes:
+        start = time.perf_counter()
+        index.search(probe[None], 1)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return float(np.median(samples))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark gallery indexes against brute force")
+    parser.add_argument('--sizes', default='1000,10000,100000', help="Comma-separated gallery sizes")
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--nprobe', default='8', help="IVF clusters scanned per query, comma-separated")
+    parser.add_argument('--max-leaves', type=int, default=None, help="Ball tree leaves per query (default: exact)")
+    args = parser.parse_args()
+
+    configs = ([('brute', {})] + [('ivf', {'nprobe': int(n)}) for n in args.nprobe.split(',')]
+               + [('balltree', {'max_leaves': args.max_leaves})])
+
+    print(f"📊 Gallery index benchmark: {args.queries} single-face queries per case")
+    print("-" * 78)
+    print(f"{'size':>7} {'index':<9} {'build s':>8} {'query µs':>9} {'speedup':>8} {'recall@1':>9} {'visitors':>9}")
+    for size in [int(s) for s in args.sizes.split(',')]:
+        gallery, probes, visitors = synthetic_gallery(size, args.queries, seed=size)
+        ids = np.arange(size)
+        brute_us = None
+        for kind, params in configs:
+            index = create_index(kind, dim=ENCODING_SIZE, **params)
+            start = time.perf_counter()
+            index.add(ids[:-10], gallery[:-10])
+            if kind == 'ivf' and not index.trained:
+                index.train()
+            build_s = time.perf_counter() - start
+
+            # Incremental: last rows arrive later, one leaves again
+            index.add(ids[-10:], gallery[-10:])
+            index.remove([ids[-1]])
+            index.add(ids[-1:], gallery[-1:])
+
+            # Save / load round trip: same size, and stored rows still find themselves
+            # (the ball tree is rebuilt on load, so approximate answers may shift elsewhere)
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, f'{kind}.npz')
+                index.save(path)
+                loaded = load_index(path)
+            sample = np.linspace(0, size - 1, 20).astype(int)
+            if len(loaded) != len(index) or not np.array_equal(loaded.search(gallery[sample], 1)[1][:, 0], sample):
+                raise SystemExit(f"❌ {kind}: loaded index answers differently")
+
+            found = index.search(probes, 1)[1][:, 0]
+            if kind == 'brute':
+                truth = found
+            correct = found == truth
+            latency = query_latency(index, probes)
+            brute_us = brute_us or latency
+            label = kind
+            if kind == 'ivf':
+                label = f"ivf/{params['nprobe']}"
+            elif kind == 'balltree' and params['max_leaves']:
+                label = f"tree/{params['max_leaves']}"
+            print(f"{size:>7} {label:<9} {build_s:>8.2f} {latency:>9.1f} {brute_us / latency:>7.1f}x "
+                  f"{correct.mean():>9.3f} {correct[visitors].mean():>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""
+Encoding Cache
+Keeps the 128-d face encoding of every gallery image on disk, so startup only runs
+the dlib encoder on images that are new or changed.
+
+Layout (default: <images folder>/.encodings/, invisible to the "*.*" image glob):
+
+    index.json          format, encoder parameters, and per image (path relative to the
+                        images folder): size, mtime_ns, sha1 of the content, matrix row
+    encodings-<n>-<pid>.npy   (rows, 128) float32, opened with np.load(mmap_mode='r')
+
+An image is a hit when its size and mtime match the index; if only the stat changed
+(copied, touched) the content hash is checked before encoding again, and a renamed or
+duplicated file reuses the row of identical content. Images without a face (row -1)
+and files that are not images (row -2) are cached too, so they are not re-read on
+every start. Different encoder parameters
+(scale, model, library versions) invalidate the whole cache.
+
+Every file is written under a temporary name and renamed into place, the matrix
+before index.json, so an interrupted save leaves the previous cache intact. Names
+carry the writer's pid, so two processes saving at once never share a file, and a
+save only deletes the matrix its own index pointed to (never another writer's).
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+FORMAT_VERSION = 1
+INDEX_FILE = 'index.json'
+NO_FACE = -1      # Matrix row of an image without a face
+UNREADABLE = -2   # ... of a file OpenCV cannot decode
+
+
+def file_hash(path):
+    """sha1 of the file content"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class EncodingCache:
+    """On-disk encodings of one images folder"""
+
+    def __init__(self, images_path, params, directory=None, dim=128):
+        self.images_path = images_path
+        self.directory = directory or os.path.join(images_path, '.encodings')
+        self.params = dict(params)  # Encoder settings the cached vectors depend on
+        self.dim = dim
+        self.stats = {'hits': 0, 'rehashed': 0, 'misses': 0, 'removed': 0}
+        self._entries = {}     # Cached: relative path -> entry
+        self._by_hash = {}     # sha1 -> cached entry (renamed / duplicated files)
+        self._matrix = np.zeros((0, dim), dtype=np.float32)
+        self._generation = 0
+        self._matrix_file = None   # Matrix the loaded index points to (removed on the next save)
+        self._seen = {}        # This run: relative path -> (entry, encoding or None)
+        self._load()
+
+    def _load(self):
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE)) as f:
+                index = json.load(f)
+            if index.get('format') != FORMAT_VERSION or index.get('params') != self.params:
+                print("🗃️ Encoder settings changed, re-encoding every image")
+                return
+            self._matrix = np.load(os.path.join(self.directory, index['matrix']), mmap_mode='r')
+            self._generation = index['generation']
+            self._matrix_file = index['matrix']
+            self._entries = index['entries']
+        except FileNotFoundError:
+            return
+        except (ValueError, KeyError, OSError) as e:
+            print(f"⚠️ Encoding cache unreadable ({e}), re-encoding every image")
+            return
+        self._by_hash = {entry['sha1']: entry for entry in self._entries.values()}
+
+    def _encoding(self, entry):
+        row = entry['row']
+        if row < 0:
+            return None if row == NO_FACE else False
+        return np.array(self._matrix[row])
+
+    def _key(self, path):
+        return os.path.relpath(path, self.images_path)
+
+    def get(self, path):
+        """
+        Cached result for an image
+        Returns: (True, encoding / None for 'no face' / False for 'not an image') on a hit,
+        (False, None) if it must be encoded
+        """
+        key = self._key(path)
+        stat = os.stat(path)
+        entry = self._entries.get(key)
+        if entry is not None and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            self.stats['hits'] += 1
+            encoding = self._encoding(entry)
+            self._seen[key] = (entry, encoding)
+            return True, encoding
+
+        # Stat differs or unknown path: same content under another stat / name?
+        sha1 = file_hash(path)
+        cached = self._by_hash.get(sha1)
+        if cached is not None:
+            self.stats['rehashed'] += 1
+            encoding = self._encoding(cached)
+            self._seen[key] = ({'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha1': sha1}, encoding)
+            return True, encoding
+
+        self.stats['misses'] += 1
+        self._seen[key] = ({'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha1': sha1}, None)
+        return False, None
+
+    def put(self, path, encoding):
+        """Store a freshly computed result (None = no face, False = not an image)"""
+        key = self._key(path)
+        entry = self._seen[key][0] if key in self._seen else None
+        if entry is None:
+            stat = os.stat(path)
+            entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha1': file_hash(path)}
+        if encoding is not None and encoding is not False:
+            encoding = np.asarray(encoding, dtype=np.float32)
+        self._seen[key] = (entry, encoding)
+
+    def forget(self, path):
+        """Drop an image whose encoding failed, so save() does not store it as 'no face'"""
+        self._seen.pop(self._key(path), None)
+
+    def save(self):
+        """Write the images seen this run (gone files drop out); no-op if nothing changed"""
+        self.stats['removed'] = len(set(self._entries) - set(self._seen))
+        changed = (self.stats['rehashed'] or self.stats['misses'] or self.stats['removed']
+                   or len(self._seen) != len(self._entries))
+        if not changed:
+            return False
+
+        rows, entries = [], {}
+        for key, (entry, encoding) in sorted(self._seen.items()):
+            if encoding is None:
+                row = NO_FACE
+            elif encoding is False:
+                row = UNREADABLE
+            else:
+                row = len(rows)
+                rows.append(encoding)
+            entries[key] = {'size': entry['size'], 'mtime_ns': entry['mtime_ns'],
+                            'sha1': entry['sha1'], 'row': row}
+        matrix = np.array(rows, dtype=np.float32).reshape(-1, self.dim)
+
+        os.makedirs(self.directory, exist_ok=True)
+        generation = self._generation + 1
+        matrix_file = f'encodings-{generation}-{os.getpid()}.npy'
+        self._write(matrix_file, lambda f: np.save(f, matrix), binary=True)
+        index = {'format': FORMAT_VERSION, 'params': self.params, 'generation': generation,
+                 'matrix': matrix_file, 'entries': entries}
+        self._write(INDEX_FILE, lambda f: json.dump(index, f))
+
+        # The matrix our old index pointed to is unreferenced now
+        if self._matrix_file and self._matrix_file != matrix_file:
+            try:
+                os.remove(os.path.join(self.directory, self._matrix_file))
+            except FileNotFoundError:
+                pass
+        self._generation, self._matrix_file = generation, matrix_file
+        self._entries, self._matrix = entries, matrix
+        self._by_hash = {entry['sha1']: entry for entry in entries.values()}
+        return True
+
+    def _write(self, name, dump, binary=False):
+        """Write a file of the cache directory through a temporary file of this process, then rename"""
+        path = os.path.join(self.directory, name)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb' if binary else 'w') as f:
+            dump(f)
+        os.replace(tmp_path, path)
+
+    def summary(self):
+        return (f"{self.stats['hits'] + self.stats['rehashed']} cached, {self.stats['misses']} encoded, "
+                f"{self.stats['removed']} removed")
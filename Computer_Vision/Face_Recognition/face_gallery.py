@@ -0,0 +1,257 @@
+"""
+Face Gallery
+Every known face encoding in one contiguous float32 matrix, with parallel label and
+source arrays, so matching all faces of a frame is one (faces x gallery) distance
+computation instead of compare_faces + face_distance per face and per list.
+
+Sources keep the app's lookup order: an uploaded face ('dynamic') wins over the
+images folder ('known') whenever both are within tolerance, exactly like the two
+separate passes did.
+
+    gallery = FaceGallery(tolerance=0.6)
+    gallery.add(encodings, names, source='known')
+    gallery.replace('dynamic', [encoding], ["Alice"])
+    gallery.identify(face_encodings)      # [(name or None, distance)] per face
+    gallery.search(face_encodings, k=5)   # top-k (distances, indices) per face
+
+Readers never lock: add() writes into spare capacity and then publishes a new
+snapshot, and removals build new arrays, so a matching thread always sees a
+consistent gallery.
+
+For very large galleries pass an index from face_index (IVF or ball tree): it is
+kept in step with add / remove / replace and answers search() and the overall
+closest row of identify(). Index lookups hold the gallery lock, since the indexes
+are updated in place.
+
+    gallery = FaceGallery(index=create_index('ivf', nprobe=8))
+"""
+
+from threading import Lock
+
+import numpy as np
+
+ENCODING_SIZE = 128  # face_recognition (dlib) embedding length
+SOURCES = ('dynamic', 'known')  # Match priority: uploaded faces first, then the images folder
+
+
+class FaceGallery:
+    """Face encodings of several sources behind one matrix"""
+
+    def __init__(self, tolerance=0.6, sources=SOURCES, dim=ENCODING_SIZE, capacity=64, index=None):
+        self.tolerance = tolerance  # Max distance for a match (higher = more lenient)
+        self.sources = tuple(sources)
+        self.dim = dim
+        self.index = index          # None = exact search over the matrix
+        self._lock = Lock()
+        self._encodings = np.zeros((capacity, dim), dtype=np.float32)
+        self._sq_norms = np.zeros(capacity, dtype=np.float32)
+        self._labels = np.zeros(capacity, dtype=np.int32)    # Index into label_names
+        self._source_ids = np.zeros(capacity, dtype=np.int8)  # Index into sources (= priority)
+        self._ids = np.zeros(capacity, dtype=np.int64)        # Stable row ids (ascending) for the index
+        self._next_id = 0
+        self.label_names = []                                 # Label id -> name
+        self._label_ids = {}
+        self._size = 0
+        self._publish()
+
+    # --- Reading ---
+
+    def _publish(self):
+        """Swap in views of the first _size rows (one reference, read atomically)"""
+        n = self._size
+        source_ids = self._source_ids[:n]
+        source_rows = [np.flatnonzero(source_ids == i) for i in range(len(self.sources))]
+        self._snapshot = (self._encodings[:n], self._sq_norms[:n], self._labels[:n], source_ids, source_rows,
+                          self._ids[:n])
+
+    def __len__(self):
+        return len(self._snapshot[0])
+
+    def encodings(self, source=None):
+        """(N, dim) float32 matrix: read-only view of all rows, or a copy of one source's"""
+        matrix, _, _, _, source_rows, _ = self._snapshot
+        if source is not None:
+            return matrix[source_rows[self.sources.index(source)]]
+        view = matrix.view()
+        view.flags.writeable = False
+        return view
+
+    def names(self, source=None):
+        """Name of every row (optionally only those of one source)"""
+        _, _, labels, source_ids, _, _ = self._snapshot
+        if source is not None:
+            labels = labels[source_ids == self.sources.index(source)]
+        return [self.label_names[label] for label in labels.tolist()]
+
+    def count(self, source):
+        return len(self._snapshot[4][self.sources.index(source)])
+
+    def _faces(self, encodings):
+        return np.asarray(encodings, dtype=np.float32).reshape(-1, self.dim)
+
+    def _squared_distances(self, snapshot, faces):
+        """(faces, gallery) squared Euclidean distances in one matrix product"""
+        gallery, sq_norms = snapshot[0], snapshot[1]
+        d2 = faces @ gallery.T
+        d2 *= -2.0
+        d2 += sq_norms
+        d2 += np.einsum('ij,ij->i', faces, faces)[:, None]
+        return np.maximum(d2, 0.0, out=d2)
+
+    def _index_search(self, faces, k):
+        """Index lookup -> (snapshot, distances, rows) of one consistent gallery state"""
+        with self._lock:
+            snapshot = self._snapshot
+            distances, ids = self.index.search(faces, k)
+        rows = np.searchsorted(snapshot[5], ids)
+        rows[ids < 0] = -1
+        return snapshot, distances, rows
+
+    def search(self, encodings, k=1):
+        """
+        k nearest gallery rows per face, closest first
+        Returns: (distances (faces, k) float32, indices (faces, k)); inf / -1 past the gallery size
+        """
+        faces = self._faces(encodings)
+        if self.index is not None:
+            _, distances, rows = self._index_search(faces, k)
+            return distances, rows
+
+        snapshot = self._snapshot
+        distances = np.full((len(faces), k), np.inf, dtype=np.float32)
+        indices = np.full((len(faces), k), -1, dtype=np.int64)
+        n = len(snapshot[0])
+        if not n or not len(faces):
+            return distances, indices
+
+        d2 = self._squared_distances(snapshot, faces)
+        kk = min(k, n)
+        if kk < n:
+            top = np.argpartition(d2, kk - 1, axis=1)[:, :kk]
+        else:
+            top = np.broadcast_to(np.arange(n), d2.shape)
+        top_d2 = np.take_along_axis(d2, top, axis=1)
+        order = np.argsort(top_d2, axis=1)
+        indices[:, :kk] = np.take_along_axis(top, order, axis=1)
+        distances[:, :kk] = np.sqrt(np.take_along_axis(top_d2, order, axis=1))
+        return distances, indices
+
+    def identify(self, encodings):
+        """
+        Name of every face: the closest row within tolerance of the highest-priority
+        source that has one (None = unknown)
+        Returns: [(name or None, distance)] per face - distance of the matched row,
+        or of the closest row for an unknown face (None for an empty gallery)
+        """
+        faces = self._faces(encodings)
+        if self.index is not None:
+            snapshot, distances, rows = self._index_search(faces, 1)
+            best, best_d2 = rows[:, 0], distances[:, 0].astype(np.float64) ** 2
+        else:
+            snapshot = self._snapshot
+        if not len(snapshot[0]) or not len(faces):
+            return [(None, None)] * len(faces)
+
+        if self.index is None:
+            d2 = self._squared_distances(snapshot, faces)
+            best = d2.argmin(axis=1)
+            best_d2 = d2[np.arange(len(faces)), best]
+        matrix, labels, source_ids, source_rows = snapshot[0], snapshot[2], snapshot[3], snapshot[4]
+        max_d2 = self.tolerance ** 2
+
+        matches = []
+        for i, (row, row_d2) in enumerate(zip(best.tolist(), best_d2.tolist())):
+            if row_d2 > max_d2:
+                # Nothing anywhere is closer than the overall best
+                matches.append((None, row_d2 ** 0.5))
+                continue
+            # A higher-priority source (e.g. the uploaded face) wins if it has any match
+            for rows in source_rows[:source_ids[row]]:
+                if len(rows):
+                    if self.index is None:
+                        rows_d2 = d2[i, rows]
+                    else:
+                        diff = matrix[rows] - faces[i]
+                        rows_d2 = np.einsum('ij,ij->i', diff, diff)
+                    j = rows_d2.argmin()
+                    if rows_d2[j] <= max_d2:
+                        row, row_d2 = rows[j], float(rows_d2[j])
+                        break
+            matches.append((self.label_names[labels[row]], row_d2 ** 0.5))
+        return matches
+
+    # --- Writing ---
+
+    def _label(self, name):
+        label = self._label_ids.get(name)
+        if label is None:
+            label = self._label_ids[name] = len(self.label_names)
+            self.label_names.append(name)
+        return label
+
+    def _grow(self, needed):
+        capacity = max(needed, 2 * len(self._encodings))
+        for attr in ('_encodings', '_sq_norms', '_labels', '_source_ids', '_ids'):
+            old = getattr(self, attr)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, attr, new)
+
+    def _append(self, encodings, names, source):
+        encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dim)
+        if len(encodings) != len(names):
+            raise ValueError(f"{len(encodings)} encodings for {len(names)} names")
+        source_id = self.sources.index(source)
+        start, end = self._size, self._size + len(encodings)
+        if end > len(self._encodings):
+            self._grow(end)
+        self._encodings[start:end] = encodings
+        self._sq_norms[start:end] = np.einsum('ij,ij->i', encodings, encodings)
+        self._labels[start:end] = [self._label(name) for name in names]
+        self._source_ids[start:end] = source_id
+        self._ids[start:end] = np.arange(self._next_id, self._next_id + len(encodings))
+        self._next_id += len(encodings)
+        if self.index is not None:
+            self.index.add(self._ids[start:end], encodings)
+        self._size = end
+
+    def _drop(self, source, names):
+        n = self._size
+        drop = np.ones(n, dtype=bool)
+        if source is not None:
+            drop &= self._source_ids[:n] == self.sources.index(source)
+        if names is not None:
+            labels = [self._label_ids[name] for name in names if name in self._label_ids]
+            drop &= np.isin(self._labels[:n], labels)
+        removed = int(drop.sum())
+        if removed:
+            if self.index is not None:
+                self.index.remove(self._ids[:n][drop])
+            # New arrays, so snapshots held by readers stay intact
+            for attr in ('_encodings', '_sq_norms', '_labels', '_source_ids', '_ids'):
+                old = getattr(self, attr)
+                new = np.zeros_like(old)
+                new[:n - removed] = old[:n][~drop]
+                setattr(self, attr, new)
+            self._size = n - removed
+        return removed
+
+    def add(self, encodings, names, source='known'):
+        """Append encodings (one row per name) to a source"""
+        with self._lock:
+            self._append(encodings, names, source)
+            self._publish()
+
+    def remove(self, source=None, names=None):
+        """Drop the rows of a source and/or with one of these names (neither: all); returns the count"""
+        with self._lock:
+            removed = self._drop(source, names)
+            self._publish()
+            return removed
+
+    def replace(self, source, encodings, names):
+        """Swap a whole source (e.g. the uploaded face) for new encodings in one step"""
+        with self._lock:
+            self._drop(source, None)
+            self._append(encodings, names, source)
+            self._publish()
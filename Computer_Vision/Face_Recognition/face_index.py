@@ -0,0 +1,503 @@
+"""
+Face Index
+Nearest-neighbour indexes over face encodings, pluggable into FaceGallery for
+galleries where a linear scan per face is too slow (e.g. a 100k-visitor log).
+
+    BruteForceIndex   exact; one matrix product per query batch
+    IVFIndex          k-means coarse quantiser (NumPy): each query scans only the
+                      nprobe closest of nlist clusters - approximate, tunable
+    BallTreeIndex     ball tree with triangle-inequality pruning; exact by default,
+                      approximate with max_leaves
+
+All three share one API, keyed by caller-chosen integer ids:
+
+    index.add(ids, vectors)
+    index.remove(ids)
+    distances, ids = index.search(queries, k)   # (queries, k), closest first; inf / -1 = none
+    index.save('gallery.npz'); index = load_index('gallery.npz')
+
+Adds and removes are incremental: IVF assigns new vectors to their nearest cluster
+(training itself on the first train_size vectors, and again whenever the index has
+grown retrain_factor times past its last training, so the clusters keep up with
+the gallery); the ball tree buffers new vectors in a brute-force tail and marks
+removals, rebuilding once either grows past a share of the tree.
+benchmark_gallery_index.py measures recall@1 and latency of each against brute force.
+
+IVF trade-off: it pays off from ~10k faces (100k: ~10x faster) and still finds
+returning visitors, whose encoding sits close to their own cluster. For a face
+near no stored one (a stranger) its top-1 is often not the true nearest (recall@1
+over all probes ~0.7 at 20k with nprobe=8). That is harmless for identify(), whose
+answer is "unknown" either way, but makes IVF unfit for "who is the closest
+stranger" queries; raise nprobe to trade speed for recall.
+
+Ball tree: in 128 dimensions the triangle inequality prunes almost nothing, so
+exact search visits most leaves and is ~20x slower than brute force at 20k
+(~16 ms against ~0.7 ms per query); max_leaves=64 is still ~4x slower and
+approximate. Kept for comparison, not as a default.
+"""
+
+import heapq
+
+import numpy as np
+
+
+def _squared_distances(queries, vectors, sq_norms=None):
+    """(queries, vectors) squared Euclidean distances via one matrix product"""
+    if sq_norms is None:
+        sq_norms = np.einsum('ij,ij->i', vectors, vectors)
+    d2 = queries @ vectors.T
+    d2 *= -2.0
+    d2 += sq_norms
+    d2 += np.einsum('ij,ij->i', queries, queries)[:, None]
+    return np.maximum(d2, 0.0, out=d2)
+
+
+def _top_k(d2, ids, k):
+    """k smallest of each row of d2 -> (distances, ids), padded with inf / -1"""
+    queries, n = d2.shape
+    distances = np.full((queries, k), np.inf, dtype=np.float32)
+    found = np.full((queries, k), -1, dtype=np.int64)
+    kk = min(k, n)
+    if not kk:
+        return distances, found
+    top = np.argpartition(d2, kk - 1, axis=1)[:, :kk] if kk < n else np.broadcast_to(np.arange(n), d2.shape)
+    top_d2 = np.take_along_axis(d2, top, axis=1)
+    order = np.argsort(top_d2, axis=1)
+    distances[:, :kk] = np.sqrt(np.take_along_axis(top_d2, order, axis=1))
+    found[:, :kk] = ids[np.take_along_axis(top, order, axis=1)]
+    return distances, found
+
+
+class _Store:
+    """Growable (ids, vectors, squared norms) arrays with O(1) append and swap-remove"""
+
+    def __init__(self, dim, capacity=16):
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.sq_norms = np.zeros(capacity, dtype=np.float32)
+        self.size = 0
+
+    def append(self, ids, vectors):
+        end = self.size + len(ids)
+        if end > len(self.ids):
+            capacity = max(end, 2 * len(self.ids))
+            for attr in ('ids', 'vectors', 'sq_norms'):
+                old = getattr(self, attr)
+                new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+                new[:self.size] = old[:self.size]
+                setattr(self, attr, new)
+        self.ids[self.size:end] = ids
+        self.vectors[self.size:end] = vectors
+        self.sq_norms[self.size:end] = np.einsum('ij,ij->i', vectors, vectors)
+        self.size = end
+
+    def remove_at(self, positions):
+        """Swap-remove rows; returns {id: new position} for the rows that moved"""
+        moved = {}
+        for position in sorted(positions, reverse=True):
+            last = self.size - 1
+            if position != last:
+                self.ids[position] = self.ids[last]
+                self.vectors[position] = self.vectors[last]
+                self.sq_norms[position] = self.sq_norms[last]
+                moved[int(self.ids[position])] = position
+            self.size = last
+        return moved
+
+    def view(self):
+        n = self.size
+        return self.ids[:n], self.vectors[:n], self.sq_norms[:n]
+
+
+class BruteForceIndex:
+    """Exact search: every query against every vector"""
+
+    kind = 'brute'
+
+    def __init__(self, dim=128):
+        self.dim = dim
+        self._store = _Store(dim)
+        self._position = {}  # id -> row
+
+    def __len__(self):
+        return self._store.size
+
+    def add(self, ids, vectors):
+        ids = np.asarray(ids, dtype=np.int64)
+        start = self._store.size
+        self._store.append(ids, np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim))
+        self._position.update(zip(ids.tolist(), range(start, start + len(ids))))
+
+    def remove(self, ids):
+        positions = [self._position.pop(i) for i in np.asarray(ids).tolist() if i in self._position]
+        self._position.update(self._store.remove_at(positions))
+        return len(positions)
+
+    def search(self, queries, k=1):
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        ids, vectors, sq_norms = self._store.view()
+        return _top_k(_squared_distances(queries, vectors, sq_norms), ids, k)
+
+    def _state(self):
+        ids, vectors, _ = self._store.view()
+        return {'ids': ids, 'vectors': vectors}
+
+    @classmethod
+    def _from_state(cls, state, params):
+        index = cls(**params)
+        index.add(state['ids'], state['vectors'])
+        return index
+
+    def _params(self):
+        return {'dim': self.dim}
+
+    def save(self, path):
+        _save(self, path)
+
+
+class IVFIndex:
+    """Inverted file index: k-means clusters, each query scans the nprobe nearest"""
+
+    kind = 'ivf'
+
+    def __init__(self, dim=128, nlist=None, nprobe=8, train_size=2000, iterations=15, seed=0,
+                 retrain_factor=4):
+        self.dim = dim
+        self.nlist = nlist            # Clusters (None: ~sqrt(n) when trained)
+        self.nprobe = nprobe          # Clusters scanned per query (recall vs. speed)
+        self.train_size = train_size  # Train automatically once this many vectors are in
+        self.iterations = iterations
+        self.seed = seed
+        self.retrain_factor = retrain_factor  # Retrain when this many times the trained size (None = never)
+        self.trained_size = 0         # Vectors in the index at the last training
+        self.centroids = None         # (nlist, dim) once trained
+        self._lists = []              # One _Store per cluster
+        self._untrained = _Store(dim)  # Everything, until training
+        self._where = {}              # id -> (list, row); list -1 = untrained store
+
+    def __len__(self):
+        return len(self._where)
+
+    @property
+    def trained(self):
+        return self.centroids is not None
+
+    def train(self, vectors=None):
+        """k-means over vectors (default: everything in the index), then reassign all"""
+        ids, current = self._all()
+        sample = current if vectors is None else np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        nlist = self.nlist or max(1, int(np.sqrt(len(sample))))
+        nlist = min(nlist, len(sample))
+        rng = np.random.default_rng(self.seed)
+        # 64 points per cluster is plenty for the centroids
+        if len(sample) > 64 * nlist:
+            sample = sample[rng.choice(len(sample), 64 * nlist, replace=False)]
+
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(self.iterations):
+            assignment = _squared_distances(sample, centroids).argmin(axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            counts = np.bincount(assignment, minlength=nlist)
+            empty = counts == 0
+            centroids[~empty] = sums[~empty] / counts[~empty, None]
+            # Re-seed empty clusters on random points
+            if empty.any():
+                centroids[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+
+        self.centroids = centroids
+        self.trained_size = max(len(ids), len(sample))
+        self._centroid_norms = np.einsum('ij,ij->i', centroids, centroids)
+        self._lists = [_Store(self.dim) for _ in range(nlist)]
+        self._untrained = _Store(self.dim)
+        self._where = {}
+        if len(ids):
+            self._assign(ids, current)
+
+    def _all(self):
+        if not self.trained:
+            ids, vectors, _ = self._untrained.view()
+            return ids.copy(), vectors.copy()
+        parts = [store.view() for store in self._lists]
+        if not parts:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, self.dim), dtype=np.float32)
+        return (np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts]))
+
+    def _assign(self, ids, vectors):
+        clusters = _squared_distances(vectors, self.centroids, self._centroid_norms).argmin(axis=1)
+        for cluster in np.unique(clusters).tolist():
+            members = clusters == cluster
+            store = self._lists[cluster]
+            start = store.size
+            store.append(ids[members], vectors[members])
+            for offset, i in enumerate(ids[members].tolist()):
+                self._where[i] = (cluster, start + offset)
+
+    def add(self, ids, vectors):
+        ids = np.asarray(ids, dtype=np.int64)
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if self.trained:
+            self._assign(ids, vectors)
+            # Clusters (and ~sqrt(n) of them) fitted to a much smaller gallery: lists grow
+            # unbalanced and recall at a fixed nprobe drops, so fit them again
+            if self.retrain_factor and len(self._where) > self.retrain_factor * self.trained_size:
+                self.train()
+            return
+        start = self._untrained.size
+        self._untrained.append(ids, vectors)
+        for offset, i in enumerate(ids.tolist()):
+            self._where[i] = (-1, start + offset)
+        if len(self._where) >= self.train_size:
+            self.train()
+
+    def remove(self, ids):
+        by_list = {}
+        for i in np.asarray(ids).tolist():
+            if i in self._where:
+                cluster, row = self._where.pop(i)
+                by_list.setdefault(cluster, []).append(row)
+        for cluster, rows in by_list.items():
+            store = self._untrained if cluster == -1 else self._lists[cluster]
+            for i, row in store.remove_at(rows).items():
+                self._where[i] = (cluster, row)
+        return sum(len(rows) for rows in by_list.values())
+
+    def search(self, queries, k=1):
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        if not self.trained:
+            ids, vectors, sq_norms = self._untrained.view()
+            return _top_k(_squared_distances(queries, vectors, sq_norms), ids, k)
+
+        nprobe = min(self.nprobe, len(self._lists))
+        probes = np.argpartition(_squared_distances(queries, self.centroids, self._centroid_norms),
+                                 nprobe - 1, axis=1)[:, :nprobe]
+        distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        found = np.full((len(queries), k), -1, dtype=np.int64)
+        for q, clusters in enumerate(probes.tolist()):
+            parts = [self._lists[c].view() for c in clusters if self._lists[c].size]
+            if not parts:
+                continue
+            ids = np.concatenate([p[0] for p in parts])
+            vectors = np.concatenate([p[1] for p in parts])
+            sq_norms = np.concatenate([p[2] for p in parts])
+            distances[q], found[q] = (a[0] for a in _top_k(
+                _squared_distances(queries[q:q + 1], vectors, sq_norms), ids, k))
+        return distances, found
+
+    def _state(self):
+        ids, vectors = self._all()
+        state = {'ids': ids, 'vectors': vectors}
+        if self.trained:
+            state['centroids'] = self.centroids
+        return state
+
+    @classmethod
+    def _from_state(cls, state, params):
+        index = cls(**params)
+        if 'centroids' in state:
+            index.centroids = np.asarray(state['centroids'], dtype=np.float32)
+            index._centroid_norms = np.einsum('ij,ij->i', index.centroids, index.centroids)
+            index._lists = [_Store(index.dim) for _ in range(len(index.centroids))]
+            index.trained_size = len(state['ids'])
+            if len(state['ids']):
+                index._assign(np.asarray(state['ids'], dtype=np.int64), np.asarray(state['vectors'], dtype=np.float32))
+        else:
+            index.train_size = max(index.train_size, len(state['ids']) + 1)  # Do not train inside add()
+            index.add(state['ids'], state['vectors'])
+            index.train_size = params.get('train_size', 2000)
+        return index
+
+    def _params(self):
+        return {'dim': self.dim, 'nlist': self.nlist, 'nprobe': self.nprobe, 'train_size': self.train_size,
+                'iterations': self.iterations, 'seed': self.seed, 'retrain_factor': self.retrain_factor}
+
+    def save(self, path):
+        _save(self, path)
+
+
+class BallTreeIndex:
+    """Ball tree: nodes are (centre, radius) balls; subtrees that cannot beat the current k-th are skipped"""
+
+    kind = 'balltree'
+
+    def __init__(self, dim=128, leaf_size=40, max_leaves=None, rebuild_ratio=0.25):
+        self.dim = dim
+        self.leaf_size = leaf_size
+        self.max_leaves = max_leaves        # Leaves scanned per query (None = exact)
+        self.rebuild_ratio = rebuild_ratio  # Rebuild when the tail / removals exceed this share
+        self._tree_ids = np.zeros(0, dtype=np.int64)
+        self._tree_vectors = np.zeros((0, dim), dtype=np.float32)
+        self._tree_sq_norms = np.zeros(0, dtype=np.float32)
+        self._removed = np.zeros(0, dtype=bool)    # Tombstones over the tree rows
+        self._tree_position = {}                   # id -> tree row
+        self._tail = BruteForceIndex(dim)          # Added since the last build
+        self._nodes = None
+
+    def __len__(self):
+        return len(self._tree_position) + len(self._tail)
+
+    def build(self):
+        """(Re)build the tree from everything live, emptying the tail and dropping tombstones"""
+        live = ~self._removed
+        tail_state = self._tail._state()
+        ids = np.concatenate([self._tree_ids[live], tail_state['ids']])
+        vectors = np.concatenate([self._tree_vectors[live], tail_state['vectors']])
+
+        n = len(ids)
+        order = np.arange(n)
+        centres, radii, starts, ends, children = [], [], [], [], []
+        stack = [(0, n, -1, 0)]  # (start, end, parent, which child)
+        while stack:
+            start, end, parent, side = stack.pop()
+            node = len(centres)
+            members = vectors[order[start:end]]
+            centre = members.mean(axis=0) if len(members) else np.zeros(self.dim, dtype=np.float32)
+            centres.append(centre)
+            radii.append(float(np.sqrt(((members - centre) ** 2).sum(axis=1).max())) if len(members) else 0.0)
+            starts.append(start)
+            ends.append(end)
+            children.append([-1, -1])
+            if parent >= 0:
+                children[parent][side] = node
+            if end - start > self.leaf_size:
+                # Split along the spread direction: two far-apart points, median of the projection
+                a = members[((members - members[0]) ** 2).sum(axis=1).argmax()]
+                b = members[((members - a) ** 2).sum(axis=1).argmax()]
+                projection = members @ (b - a)
+                half = (end - start) // 2
+                split = np.argpartition(projection, half)
+                order[start:end] = order[start:end][split]
+                stack.append((start + half, end, node, 1))
+                stack.append((start, start + half, node, 0))
+
+        self._tree_ids = ids[order]
+        self._tree_vectors = vectors[order]
+        self._tree_sq_norms = np.einsum('ij,ij->i', self._tree_vectors, self._tree_vectors)
+        self._removed = np.zeros(n, dtype=bool)
+        self._tree_position = dict(zip(self._tree_ids.tolist(), range(n)))
+        centres = np.array(centres, dtype=np.float32).reshape(-1, self.dim)
+        self._nodes = (centres, np.einsum('ij,ij->i', centres, centres), np.array(radii, dtype=np.float32),
+                       np.array(starts), np.array(ends), np.array(children, dtype=np.int64).reshape(-1, 2))
+        self._tail = BruteForceIndex(self.dim)
+
+    def _maybe_rebuild(self):
+        if (len(self._tail) > max(self.leaf_size, self.rebuild_ratio * len(self._tree_position))
+                or self._removed.sum() > self.rebuild_ratio * max(1, len(self._tree_ids))):
+            self.build()
+
+    def add(self, ids, vectors):
+        self._tail.add(ids, vectors)
+        self._maybe_rebuild()
+
+    def remove(self, ids):
+        removed = self._tail.remove(ids)
+        for i in np.asarray(ids).tolist():
+            row = self._tree_position.pop(i, None)
+            if row is not None:
+                self._removed[row] = True
+                removed += 1
+        self._maybe_rebuild()
+        return removed
+
+    def _search_one(self, query, k):
+        """Best-first descent; returns [(squared distance, id)] of the k best in the tree"""
+        centres, centre_norms, radii, starts, ends, children = self._nodes
+        best = []  # Max-heap of (-d2, id)
+        query_norm = float(query @ query)
+        heap = [(0.0, 0.0, 0)]  # (lower bound, distance to centre, node)
+        leaves = 0
+        while heap:
+            bound, _, node = heapq.heappop(heap)
+            if len(best) == k and bound >= -best[0][0]:
+                break
+            left, right = children[node]
+            if left < 0:
+                leaves += 1
+                start, end = starts[node], ends[node]
+                d2 = (self._tree_sq_norms[start:end] - 2.0 * (self._tree_vectors[start:end] @ query)
+                      + query_norm)
+                d2[self._removed[start:end]] = np.inf
+                for row in np.argsort(d2)[:k].tolist():
+                    if not np.isfinite(d2[row]):
+                        break
+                    item = (-float(max(d2[row], 0.0)), int(self._tree_ids[start + row]))
+                    if len(best) < k:
+                        heapq.heappush(best, item)
+                    elif item[0] > best[0][0]:
+                        heapq.heapreplace(best, item)
+                if self.max_leaves and leaves >= self.max_leaves:
+                    break
+                continue
+            # Nothing in a ball is closer than (distance to centre - radius); in 128-d the
+            # query sits inside most balls, so ties go to the nearer centre
+            pair = children[node]
+            centre_distances = np.sqrt(np.maximum(centre_norms[pair] - 2.0 * (centres[pair] @ query) + query_norm, 0.0))
+            gaps = np.maximum(centre_distances - radii[pair], 0.0)
+            for child, gap, centre_distance in zip(pair.tolist(), gaps.tolist(), centre_distances.tolist()):
+                heapq.heappush(heap, (gap * gap, centre_distance, child))
+        return [(-d2, i) for d2, i in best]
+
+    def search(self, queries, k=1):
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        distances, found = self._tail.search(queries, k)
+        if self._nodes is None or not len(self._tree_position):
+            return distances, found
+        for q, query in enumerate(queries):
+            candidates = self._search_one(query, k)
+            candidates += [(float(d) ** 2, int(i)) for d, i in zip(distances[q], found[q]) if i >= 0]
+            candidates.sort()
+            for j, (d2, i) in enumerate(candidates[:k]):
+                distances[q, j], found[q, j] = np.sqrt(d2), i
+        return distances, found
+
+    def _state(self):
+        live = ~self._removed
+        tail = self._tail._state()
+        return {'ids': np.concatenate([self._tree_ids[live], tail['ids']]),
+                'vectors': np.concatenate([self._tree_vectors[live], tail['vectors']])}
+
+    @classmethod
+    def _from_state(cls, state, params):
+        index = cls(**params)
+        index._tail.add(state['ids'], state['vectors'])
+        index.build()
+        return index
+
+    def _params(self):
+        return {'dim': self.dim, 'leaf_size': self.leaf_size, 'max_leaves': self.max_leaves,
+                'rebuild_ratio': self.rebuild_ratio}
+
+    def save(self, path):
+        _save(self, path)
+
+
+INDEXES = {cls.kind: cls for cls in (BruteForceIndex, IVFIndex, BallTreeIndex)}
+
+
+def create_index(kind='brute', **params):
+    """Index by name: 'brute', 'ivf' or 'balltree'"""
+    if kind not in INDEXES:
+        raise ValueError(f"Unknown index '{kind}', choose from {list(INDEXES)}")
+    return INDEXES[kind](**params)
+
+
+def _save(index, path):
+    """One .npz: kind + parameters (None flagged in params_none) + ids/vectors (+ trained state)"""
+    state = index._state()
+    params = index._params()
+    np.savez(path, kind=index.kind, params_keys=np.array(list(params)),
+             params_values=np.array([0.0 if v is None else float(v) for v in params.values()]),
+             params_none=np.array([v is None for v in params.values()]), **state)
+
+
+def load_index(path):
+    """Index saved with index.save(path)"""
+    with np.load(path) as data:
+        kind = str(data['kind'])
+        params = {}
+        for key, value, none in zip(data['params_keys'].tolist(), data['params_values'].tolist(),
+                                    data['params_none'].tolist()):
+            params[key] = None if none else int(value) if value.is_integer() else value
+        state = {key: data[key] for key in data.files
+                 if key not in ('kind', 'params_keys', 'params_values', 'params_none')}
+    return INDEXES[kind]._from_state(state, params)
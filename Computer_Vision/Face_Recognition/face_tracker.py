@@ -0,0 +1,177 @@
+"""
+Face Tracker
+Follows detected faces from frame to frame so the expensive part of recognition -
+the 128-d dlib encoding and the gallery lookup - runs only when it tells us
+something new: for a face that just appeared, and again every REVERIFY_INTERVAL
+seconds to catch a wrong or changed identity. In between, a track keeps the name
+its identity votes agree on.
+
+Association is greedy on box overlap (IoU), with a centroid-distance fallback for
+faces that moved further than their own width between two processed frames.
+Each verification votes for a name (None = unknown); older votes decay, so a
+track follows new evidence instead of being locked to its first guess.
+
+    tracks = tracker.update(face_locations)          # one Track per location
+    due = tracker.due(tracks)                         # need an encoding this frame
+    for track, (name, distance) in zip(due, gallery.identify(encodings)):
+        tracker.vote(track, name, distance)
+    track.name                                        # None until a name wins
+
+Locations are face_recognition (top, right, bottom, left) boxes. The tracker is
+shared by the capture thread, the inference callback and the upload route, so
+every method takes its lock, and votes are replaced as a whole dict (track.name
+read without the lock sees either the old or the new votes).
+"""
+
+import time
+from threading import Lock
+
+import numpy as np
+
+IOU_THRESHOLD = 0.3       # Min overlap to continue a track
+CENTROID_FACTOR = 0.75    # ... or centre moved less than this x the box width
+MAX_MISSED = 5            # Processed frames a track survives without its face
+REVERIFY_INTERVAL = 2.0   # Seconds between encodings of a settled track
+MIN_VOTES = 2             # Encodings before a new track is settled
+VOTE_DECAY = 0.7          # Weight left on older votes when a new one arrives
+
+
+def iou(a, b):
+    """Overlap of two (top, right, bottom, left) boxes, 0..1"""
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    if bottom <= top or right <= left:
+        return 0.0
+    intersection = (bottom - top) * (right - left)
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    return intersection / float(area_a + area_b - intersection)
+
+
+def max_iou(box, boxes):
+    return max((iou(box, other) for other in boxes), default=0.0)
+
+
+def centre_distance(a, b):
+    """Distance between the centres of two boxes, in pixels"""
+    return float(np.hypot((a[3] + a[1]) - (b[3] + b[1]), (a[0] + a[2]) - (b[0] + b[2]))) / 2.0
+
+
+class Track:
+    """One face followed over frames"""
+
+    def __init__(self, track_id, location):
+        self.id = track_id
+        self.location = location
+        self.missed = 0          # Processed frames since it was last detected
+        self.votes = {}          # name (None = unknown) -> decayed vote weight
+        self.verifications = 0   # Encodings matched so far
+        self.last_verified = None
+        self.last_vote = None    # Name of the latest verification
+        self.distance = None     # Gallery distance of the latest verification
+
+    @property
+    def name(self):
+        """Name with the most vote weight (None = unknown / not verified yet)"""
+        votes = self.votes  # One read: vote() / reset_identities() swap the whole dict
+        if not votes:
+            return None
+        return max(votes.items(), key=lambda item: item[1])[0]
+
+    def is_due(self, now):
+        # Contested tracks (latest vote disagrees with the winner) are checked every frame
+        return (self.verifications < MIN_VOTES or self.last_vote != self.name
+                or now - self.last_verified >= REVERIFY_INTERVAL)
+
+
+class FaceTracker:
+    """IoU / centroid association of face boxes with per-track identity votes"""
+
+    def __init__(self, iou_threshold=IOU_THRESHOLD, max_missed=MAX_MISSED):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.tracks = []
+        self.stats = {'tracks': 0, 'detections': 0, 'encoded': 0}
+        self._next_id = 0
+        self._lock = Lock()
+
+    def update(self, locations):
+        """Associate this frame's face boxes with the tracks; returns the Track of every location"""
+        with self._lock:
+            return self._update(locations)
+
+    def _update(self, locations):
+        tracks = self.tracks
+        assigned = [None] * len(locations)
+        free = set(range(len(tracks)))
+
+        # Greedy on overlap: best pairs first
+        if tracks and locations:
+            overlaps = np.array([[iou(track.location, location) for location in locations] for track in tracks])
+            for flat in np.argsort(overlaps, axis=None)[::-1].tolist():
+                t, d = divmod(flat, len(locations))
+                if overlaps[t, d] < self.iou_threshold:
+                    break
+                if t in free and assigned[d] is None:
+                    assigned[d] = tracks[t]
+                    free.discard(t)
+
+        # Fast movers: nearest free track whose centre is close enough for the box size
+        for d, location in enumerate(locations):
+            if assigned[d] is not None or not free:
+                continue
+            t = min(free, key=lambda t: centre_distance(tracks[t].location, location))
+            if centre_distance(tracks[t].location, location) <= CENTROID_FACTOR * (location[1] - location[3]):
+                assigned[d] = tracks[t]
+                free.discard(t)
+
+        for d, location in enumerate(locations):
+            if assigned[d] is None:
+                assigned[d] = Track(self._next_id, location)
+                self._next_id += 1
+                self.stats['tracks'] += 1
+            assigned[d].location = location
+            assigned[d].missed = 0
+        for t in free:
+            tracks[t].missed += 1
+
+        # One new list, so readers on other threads see a whole frame's tracks
+        self.tracks = [track for track in tracks if track.missed <= self.max_missed and track not in assigned] \
+            + assigned
+        self.stats['detections'] += len(locations)
+        return assigned
+
+    def due(self, tracks, now=None):
+        """Tracks of this frame that need an encoding (new, unsettled or due for re-verification)"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return [track for track in tracks if track.is_due(now)]
+
+    def settled_boxes(self, now=None):
+        """Boxes of visible tracks that do not need an encoding (workers can skip faces on them)"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return [track.location for track in self.tracks if not track.missed and not track.is_due(now)]
+
+    def vote(self, track, name, distance=None, now=None):
+        """Add one verification result (name None = unknown) to a track"""
+        with self._lock:
+            votes = {key: weight * VOTE_DECAY for key, weight in track.votes.items()}
+            votes[name] = votes.get(name, 0.0) + 1.0
+            track.votes = votes
+            track.verifications += 1
+            track.last_verified = time.monotonic() if now is None else now
+            track.last_vote = name
+            track.distance = distance
+            self.stats['encoded'] += 1
+
+    def reset_identities(self):
+        """Drop every track's votes (e.g. after the gallery changed), so all are verified anew"""
+        with self._lock:
+            for track in self.tracks:
+                track.votes, track.verifications, track.last_vote = {}, 0, None
+
+    def status(self):
+        with self._lock:
+            return dict(self.stats, active=sum(1 for track in self.tracks if not track.missed),
+                        skipped=self.stats['detections'] - self.stats['encoded'])
@@ -1,76 +1,223 @@
-import face_recognition
-import cv2
-import os
-import glob
-
-class SimpleFacerec:
-    def __init__(self):
-        self.known_face_encodings = []
-        self.known_face_names = []
-        self.tolerance = 0.6  # Confidence threshold for matching (higher = more lenient)
-
-    def load_encoding_images(self, images_path):
-        # Check if path exists
-        if not os.path.exists(images_path):
-            print(f"⚠️ Path '{images_path}' does not exist. No known faces loaded.")
-            return
-            
-        images_path = glob.glob(os.path.join(images_path, "*.*"))
-        print(f"📸 Found {len(images_path)} images for encoding")
-
-        for img_path in images_path:
-            img = cv2.imread(img_path)
-            if img is None:
-                continue
-                
-            rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-
-            basename = os.path.basename(img_path)
-            filename, _ = os.path.splitext(basename)
-
-            # Use smaller image for faster encoding
-            small_img = cv2.resize(rgb_img, (0, 0), fx=0.5, fy=0.5)
-            encodings = face_recognition.face_encodings(small_img, model="hog")  # Faster model
-
-            if len(encodings) > 0:
-                self.known_face_encodings.append(encodings[0])
-                self.known_face_names.append(filename)
-                print(f"✓ Encoded: {filename}")
-            else:
-                print(f"⚠️ No face found in: {filename}")
-
-    def detect_known_faces(self, frame):
-        # Resize frame for faster processing
-        small_frame = cv2.resize(frame, (0, 0), fx=0.5, fy=0.5)
-        rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
-
-        # Use HOG model (faster) instead of CNN (more accurate)
-        face_locations = face_recognition.face_locations(rgb_small_frame, model="hog")
-        face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations)
-
-        face_names = []
-        for face_encoding in face_encodings:
-            # Use tolerance threshold for matching
-            matches = face_recognition.compare_faces(
-                self.known_face_encodings, 
-                face_encoding, 
-                tolerance=self.tolerance
-            )
-            name = "Unknown"
-
-            # Calculate distances for more accurate matching
-            face_distances = face_recognition.face_distance(
-                self.known_face_encodings, 
-                face_encoding
-            )
-            if len(face_distances) > 0:
-                best_match_index = face_distances.argmin()
-                if matches[best_match_index]:
-                    name = self.known_face_names[best_match_index]
-
-            face_names.append(name)
-
-        # Scale locations back to original frame size
-        face_locations = [(top*2, right*2, bottom*2, left*2) for (top, right, bottom, left) in face_locations]
-        
+import face_recognition
+import cv2
+import os
+import glob
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from threading import Thread
+
+from face_gallery import FaceGallery
+from encoding_cache import EncodingCache
+
+ENCODING_SCALE = 0.5  # Gallery images are encoded at half size (faster)
+ENCODING_MODEL = "hog"
+
+# Everything a cached encoding depends on; a change re-encodes the whole folder
+ENCODER_PARAMS = {
+    'scale': ENCODING_SCALE,
+    'model': ENCODING_MODEL,
+    'face_recognition': getattr(face_recognition, '__version__', None),
+    'dlib': getattr(face_recognition.api.dlib, '__version__', None)
+}
+
+def encode_image(img_path):
+    """128-d encoding of the first face in an image file; None if no face, False if unreadable"""
+    img = cv2.imread(img_path)
+    if img is None:
+        return False
+
+    rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+    # Use smaller image for faster encoding
+    small_img = cv2.resize(rgb_img, (0, 0), fx=ENCODING_SCALE, fy=ENCODING_SCALE)
+    encodings = face_recognition.face_encodings(small_img, model=ENCODING_MODEL)  # Faster model
+    return encodings[0] if len(encodings) > 0 else None
+
+def _init_encoder_worker():
+    """Enrolment worker: one image per core, so no nested OpenCV threads"""
+    cv2.setNumThreads(1)
+
+def _encode_in_pool(paths, workers):
+    """Yield (path, encoding or None/False, error) as workers finish, in completion order"""
+    # Forked right here, in the caller: spawned workers would re-import the app's __main__
+    executor = ProcessPoolExecutor(max_workers=min(workers, len(paths)),
+                                   mp_context=multiprocessing.get_context('fork'),
+                                   initializer=_init_encoder_worker)
+    futures = {executor.submit(encode_image, path): path for path in paths}
+    
+    def results():
+        try:
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except Exception as e:
+                    yield futures[future], None, e
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+    return results()
+
+def _encode_inline(paths):
+    for path in paths:
+        try:
+            yield path, encode_image(path), None
+        except Exception as e:
+            yield path, None, e
+
+class SimpleFacerec:
+    def __init__(self, gallery=None):
+        # Images-folder faces go into the 'known' source of a (possibly shared) gallery
+        self.gallery = gallery if gallery is not None else FaceGallery(tolerance=0.6)
+        self.cache_stats = None  # Hit/miss counts of the last load_encoding_images()
+        self.enrolment = {'running': False, 'total': 0, 'done': 0, 'cached': 0, 'encoded': 0,
+                          'no_face': 0, 'errors': 0, 'workers': 0, 'elapsed': 0.0}
+
+    @property
+    def tolerance(self):
+        """Confidence threshold for matching (higher = more lenient)"""
+        return self.gallery.tolerance
+
+    @tolerance.setter
+    def tolerance(self, value):
+        self.gallery.tolerance = value
+
+    @property
+    def known_face_encodings(self):
+        return self.gallery.encodings('known')
+
+    @property
+    def known_face_names(self):
+        return self.gallery.names('known')
+
+    def load_encoding_images(self, images_path, use_cache=True, workers=1):
+        """Enrol every image of a folder (blocks until done); workers > 1 encodes in processes"""
+        thread = self.start_encoding_images(images_path, use_cache, workers)
+        if thread is not None:
+            thread.join()
+
+    def start_encoding_images(self, images_path, use_cache=True, workers=None, progress_interval=2.0):
+        """
+        Enrol a folder in the background: cached faces are matchable when this returns,
+        the rest stream into the gallery as workers finish them
+        workers: encoder processes (None = one per core, 1 = in the background thread)
+        Returns the collecting thread (None if there is nothing to enrol)
+        """
+        # Check if path exists
+        if not os.path.exists(images_path):
+            print(f"⚠️ Path '{images_path}' does not exist. No known faces loaded.")
+            return None
+            
+        image_paths = glob.glob(os.path.join(images_path, "*.*"))
+        print(f"📸 Found {len(image_paths)} images for encoding")
+        workers = workers or os.cpu_count() or 1
+        self.enrolment = {'running': True, 'total': len(image_paths), 'done': 0, 'cached': 0,
+                          'encoded': 0, 'no_face': 0, 'errors': 0, 'workers': 1, 'elapsed': 0.0}
+        started = time.time()
+
+        # Precomputed vectors for unchanged images (images_path/.encodings/)
+        cache = EncodingCache(images_path, ENCODER_PARAMS) if use_cache else None
+
+        encodings_found = []
+        names_found = []
+        pending = []
+        for img_path in image_paths:
+            cached = False
+            if cache is not None:
+                cached, encoding = cache.get(img_path)
+            if cached:
+                self._enrolled(img_path, encoding, True, encodings_found, names_found)
+            else:
+                pending.append(img_path)
+        self._add_known(encodings_found, names_found)
+
+        if len(pending) > 1 and workers > 1:
+            self.enrolment['workers'] = min(workers, len(pending))
+            results = _encode_in_pool(pending, workers)
+            print(f"⚙️ Encoding {len(pending)} images in {self.enrolment['workers']} processes")
+        else:
+            results = _encode_inline(pending)
+
+        def collect():
+            last_add = last_report = time.time()
+            for img_path, encoding, error in results:
+                if error is not None:
+                    self.enrolment['errors'] += 1
+                    self.enrolment['done'] += 1
+                    print(f"⚠️ Could not encode {os.path.basename(img_path)}: {error}")
+                    if cache is not None:
+                        cache.forget(img_path)  # Try again next start
+                    continue
+                if cache is not None:
+                    cache.put(img_path, encoding)
+                self._enrolled(img_path, encoding, False, encodings_found, names_found)
+
+                # Stream into the gallery in small batches (each add republishes the matrix)
+                now = time.time()
+                if now - last_add >= 0.5:
+                    self._add_known(encodings_found, names_found)
+                    last_add = now
+                if now - last_report >= progress_interval:
+                    self._report_progress(now - started)
+                    last_report = now
+            self._add_known(encodings_found, names_found)
+
+            if cache is not None:
+                cache.save()
+                self.cache_stats = dict(cache.stats)
+                print(f"🗃️ Encoding cache: {cache.summary()}")
+            self.enrolment['running'] = False
+            self.enrolment['elapsed'] = round(time.time() - started, 2)
+            print(f"✅ Enrolled {len(self.gallery.names('known'))} known faces in {self.enrolment['elapsed']:.1f}s")
+
+        thread = Thread(target=collect, daemon=True)
+        thread.start()
+        return thread
+
+    def _enrolled(self, img_path, encoding, cached, encodings_found, names_found):
+        """Count one finished image; faces are buffered for the next gallery add"""
+        filename, _ = os.path.splitext(os.path.basename(img_path))
+        self.enrolment['done'] += 1
+        if encoding is False:
+            return  # Not an image
+        if encoding is None:
+            self.enrolment['no_face'] += 1
+            print(f"⚠️ No face found in: {filename}")
+            return
+        self.enrolment['cached' if cached else 'encoded'] += 1
+        encodings_found.append(encoding)
+        names_found.append(filename)
+        if not cached:
+            print(f"✓ Encoded: {filename}")
+
+    def _add_known(self, encodings_found, names_found):
+        """One gallery append for everything buffered so far"""
+        if encodings_found:
+            self.gallery.add(encodings_found, names_found, source='known')
+            encodings_found.clear()
+            names_found.clear()
+
+    def _report_progress(self, elapsed):
+        state = self.enrolment
+        encoded = state['done'] - state['cached']
+        remaining = state['total'] - state['done']
+        rate = encoded / elapsed if elapsed > 0 else 0.0
+        eta = f", ~{remaining / rate:.0f}s left" if rate > 0 else ""
+        print(f"⏳ Enrolment {state['done']}/{state['total']} ({100 * state['done'] / max(1, state['total']):.0f}%), "
+              f"{rate:.1f} images/s{eta}")
+
+    def detect_known_faces(self, frame):
+        # Resize frame for faster processing
+        small_frame = cv2.resize(frame, (0, 0), fx=0.5, fy=0.5)
+        rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+
+        # Use HOG model (faster) instead of CNN (more accurate)
+        face_locations = face_recognition.face_locations(rgb_small_frame, model="hog")
+        face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations)
+
+        # All faces against the whole gallery in one batched distance computation
+        face_names = [name or "Unknown" for name, _ in self.gallery.identify(face_encodings)]
+
+        # Scale locations back to original frame size
+        face_locations = [(top*2, right*2, bottom*2, left*2) for (top, right, bottom, left) in face_locations]
+        
         return face_locations, face_names
\ No newline at end of file
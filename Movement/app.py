@@ -5,20 +5,56 @@ Maps movements to 0-180 degree angles
 Accessible via web browser - no display needed
 """
 
-from flask import Flask, render_template, Response, jsonify
+from flask import Flask, render_template, Response, jsonify, request
 import cv2
 import mediapipe as mp
-import numpy as np
 from collections import deque
-from threading import Lock
+from threading import Lock, Thread
 import json
+import atexit
+import os
+import sys
+import time
+
+# Shared NAVIS helpers live at the repo root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from navis_common.scheduler import AdaptiveScheduler
+from navis_common.inference_pool import InferencePool
+from navis_common.broadcaster import FrameBroadcaster
+from navis_common.status_stream import StatusChannel
+from navis_common.frame_sources import open_source
+from navis_common.landmarks import to_array, pose_angles
+from navis_common.session_recorder import SessionRecorder, INFERENCE
+from navis_common.metrics import StageMetrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
 
 app = Flask(__name__)
 
+# Per-stage latency windows + rolling FPS (GET /metrics, 'stages' in /status)
+metrics = StageMetrics('movement')
+
+# Configuration
+FRAME_WIDTH = 320              # Capture + display size
+FRAME_HEIGHT = 240
+INFERENCE_WIDTH = 320          # Holistic gets a copy scaled to this size
+INFERENCE_HEIGHT = 240
+FPS = 30
+CAMERA_SOURCE = os.environ.get('NAVIS_SOURCE', 0)  # Camera index, video file, image dir or 'synthetic'
+TARGET_INFERENCE_RATE = 15     # Wanted angle updates per second (adaptive frame skip)
+CPU_BUDGET = 0.7               # Max share of one core spent in pose inference
+MAX_FRAME_SKIP = 4
+JPEG_QUALITY = 50
+SMOOTHING_FRAMES = 5
+IDLE_TIMEOUT = 5               # Stop the camera after 5s without viewers
+STATUS_MAX_RATE = 10           # Max status pushes per second to each page (/events)
+INFERENCE_WORKERS = int(os.environ.get('NAVIS_INFERENCE_WORKERS', 0))  # >0: Holistic in this many processes
+RECORD_SESSIONS = os.environ.get('NAVIS_RECORD', '1') != '0'  # Flight recorder (navis_common/session_recorder.py)
+RECORD_DIR = os.environ.get('NAVIS_RECORD_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sessions'))
+RECORD_MAX_MB = 1024           # Oldest chunks are deleted beyond this
+
 # MediaPipe setup
 mp_holistic = mp.solutions.holistic
 mp_drawing = mp.solutions.drawing_utils
-holistic = mp_holistic.Holistic(
+holistic_options = dict(
     static_image_mode=False,
     model_complexity=1,
     smooth_landmarks=True,
@@ -26,13 +62,26 @@ holistic = mp_holistic.Holistic(
     min_tracking_confidence=0.4
 )
 
-# Configuration
-FRAME_WIDTH = 320
-FRAME_HEIGHT = 240
-FPS = 30
-FRAME_SKIP = 2
-JPEG_QUALITY = 50
-SMOOTHING_FRAMES = 5
+def holistic_worker():
+    """InferencePool worker init: BGR frame -> (pose_landmarks, face_landmarks)"""
+    model = mp_holistic.Holistic(**holistic_options)
+    
+    def process(frame):
+        results = model.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        return results.pose_landmarks, results.face_landmarks
+    
+    return process
+
+if INFERENCE_WORKERS > 0:
+    # Fork the workers before this process creates any MediaPipe graph or thread
+    inference_pool = InferencePool(holistic_worker, max_frame_shape=(INFERENCE_HEIGHT, INFERENCE_WIDTH, 3),
+                                   workers=INFERENCE_WORKERS)
+    inference_pool.start()
+    atexit.register(inference_pool.close)
+    holistic = None
+else:
+    inference_pool = None
+    holistic = mp_holistic.Holistic(**holistic_options)
 
 # State
 state_lock = Lock()
@@ -53,152 +102,187 @@ angle_history_left = deque(maxlen=SMOOTHING_FRAMES)
 angle_history_right = deque(maxlen=SMOOTHING_FRAMES)
 angle_history_head = deque(maxlen=SMOOTHING_FRAMES)
 
-def calculate_angle(point1, point2, point3):
+# Annotated frames are encoded once and shared by every viewer
+broadcaster = FrameBroadcaster(JPEG_QUALITY, metrics=metrics)
+capture_thread = None
+capture_lock = Lock()
+
+# Inference cadence (every pool worker gets its own core's worth of budget)
+scheduler = AdaptiveScheduler(TARGET_INFERENCE_RATE, CPU_BUDGET * max(1, INFERENCE_WORKERS), camera_fps=FPS,
+                              max_skip=MAX_FRAME_SKIP)
+
+def smooth_angle(new_angle, history):
+    """Smooth angle using moving average"""
+    history.append(new_angle)
+    return sum(history) / len(history)
+
+NO_DETECTION = (False, None, None, None, None)
+
+def analyze_landmarks(pose_landmarks, face_landmarks, timestamp=None):
     """
-    Calculate bicep curl angle at elbow
-    point1: shoulder
-    point2: elbow (pivot point)
-    point3: wrist
-    
-    Mapping:
-    - 0 degrees = straight arms down (fully extended)
-    - 180 degrees = bent arms (L-shape, like bicep curl)
+    Smoothed joint angles from one Holistic result (recorded with the frame's capture time)
+    Returns: (person_detected, left_bicep_angle, right_bicep_angle, head_angle, pose_landmarks)
     """
-    a = np.array([point1.x - point2.x, point1.y - point2.y])
-    b = np.array([point3.x - point2.x, point3.y - point2.y])
+    if not pose_landmarks:
+        record_detection(timestamp, None, NO_DETECTION)
+        return NO_DETECTION
     
-    cos_angle = np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b) + 1e-6)
-    cos_angle = np.clip(cos_angle, -1, 1)
-    angle = np.arccos(cos_angle)
-    angle_deg = np.degrees(angle)
+    # One (33, 4) array per frame; both biceps in one joint_angles() call + head
+    landmarks = to_array(pose_landmarks)
+    left_bicep_angle, right_bicep_angle, head_angle = pose_angles(landmarks, face_landmarks)
     
-    # Invert: straight (180 degrees) becomes 0, bent (0) becomes 180
-    angle_deg = 180 - angle_deg
-    angle_deg = np.clip(angle_deg, 0, 180)
+    if left_bicep_angle is not None:
+        left_bicep_angle = smooth_angle(left_bicep_angle, angle_history_left)
+    if right_bicep_angle is not None:
+        right_bicep_angle = smooth_angle(right_bicep_angle, angle_history_right)
+    if head_angle is not None:
+        head_angle = smooth_angle(head_angle, angle_history_head)
     
-    return angle_deg
-
-def calculate_head_angle(landmarks, face_landmarks=None):
-    """Calculate head movement angle"""
-    # If face landmarks available, use eye landmarks
-    if face_landmarks is not None and len(face_landmarks.landmark) > 263:
-        left_eye = face_landmarks.landmark[33]
-        right_eye = face_landmarks.landmark[263]
-        eye_distance = abs(left_eye.y - right_eye.y)
-        head_angle = np.clip(eye_distance * 180, 0, 180)
-    else:
-        # Fallback: Use shoulder landmarks from pose
-        nose = landmarks[0]
-        left_shoulder = landmarks[11]
-        right_shoulder = landmarks[12]
-        
-        shoulder_center_x = (left_shoulder.x + right_shoulder.x) / 2
-        shoulder_center_y = (left_shoulder.y + right_shoulder.y) / 2
-        
-        dx = nose.x - shoulder_center_x
-        dy = nose.y - shoulder_center_y
-        
-        head_angle = np.degrees(np.arctan2(dy, dx))
-        head_angle = np.clip(abs(head_angle) * 1.0, 0, 180)
-    
-    return head_angle
+    detection = (True, left_bicep_angle, right_bicep_angle, head_angle, pose_landmarks)
+    record_detection(timestamp, landmarks, detection)
+    return detection
 
-def smooth_angle(new_angle, history):
-    """Smooth angle using moving average"""
-    history.append(new_angle)
-    return sum(history) / len(history)
+# Flight recorder: started in __main__ so imports never write sessions
+recorder = SessionRecorder(RECORD_DIR, 'movement', max_bytes=RECORD_MAX_MB << 20) if RECORD_SESSIONS else None
 
-def generate_frames():
-    """Generate video frames with pose detection"""
-    global SELECTED_JOINT
+def record_detection(timestamp, landmarks, detection):
+    """One recorder entry per analysed frame: landmark array + the smoothed angles shown"""
+    if recorder is None:
+        return
+    with metrics.time('record'):
+        recorder.append(time.time() if timestamp is None else timestamp, INFERENCE, landmarks,
+                        detection[0], angles=detection[1:4])
+
+latest_detection = NO_DETECTION    # Newest analysed result, drawn on frames the scheduler skips
+
+def on_pose_result(meta, result, latency):
+    """InferencePool callback: analyse worker results in frame order (smoothing needs the order)"""
+    global latest_detection
+    thumbnail, timestamp = meta
+    metrics.observe('inference', latency)
+    metrics.tick('inference')
+    scheduler.inference_done(latency, thumbnail)
+    if result is None:
+        return
+    with metrics.time('analysis'):
+        latest_detection = analyze_landmarks(*result, timestamp=timestamp)
+
+if inference_pool is not None:
+    inference_pool.on_result = on_pose_result
+
+def inference_copy(frame):
+    """Frame scaled to the inference size (landmarks are 0-1, so they draw on the display frame as-is)"""
+    if (frame.shape[1], frame.shape[0]) == (INFERENCE_WIDTH, INFERENCE_HEIGHT):
+        return frame
+    with metrics.time('resize'):
+        return cv2.resize(frame, (INFERENCE_WIDTH, INFERENCE_HEIGHT), interpolation=cv2.INTER_AREA)
+
+def annotate(frame, detection):
+    """
+    Draw landmarks, the selected joint's angle and the person status on the display frame
+    Returns the angle shown (0 when the selected joint is not visible)
+    """
+    person_detected, left_bicep_angle, right_bicep_angle, head_angle, pose_landmarks = detection
+
+    # Draw landmarks
+    if pose_landmarks is not None:
+        mp_drawing.draw_landmarks(
+            frame,
+            pose_landmarks,
+            mp_holistic.POSE_CONNECTIONS,
+            mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=1, circle_radius=1),
+            mp_drawing.DrawingSpec(color=(255, 0, 0), thickness=1)
+        )
+
+    # Draw current angle
+    current_angle = 0
+    label = "—"
+    color = (200, 200, 200)
+
+    if SELECTED_JOINT == "left_bicep" and left_bicep_angle is not None:
+        current_angle = left_bicep_angle
+        label = "LEFT BICEP"
+        color = (100, 100, 255)
+    elif SELECTED_JOINT == "right_bicep" and right_bicep_angle is not None:
+        current_angle = right_bicep_angle
+        label = "RIGHT BICEP"
+        color = (100, 255, 255)
+    elif SELECTED_JOINT == "head" and head_angle is not None:
+        current_angle = head_angle
+        label = "HEAD"
+        color = (255, 255, 100)
+
+    cv2.putText(frame, f"{label}: {current_angle:.1f}°",
+               (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
+
+    # Draw status
+    status_text = f"Person: {'YES' if person_detected else 'NO'}"
+    status_color = (0, 255, 0) if person_detected else (0, 0, 255)
+    cv2.putText(frame, status_text, (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, status_color, 2)
+    return current_angle
+
+def capture_loop():
+    """Capture + pose detection loop, publishes annotated frames to the broadcaster"""
+    global SELECTED_JOINT, latest_detection
     
-    cap = cv2.VideoCapture(0)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
-    cap.set(cv2.CAP_PROP_FPS, FPS)
-    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    cap = open_source(CAMERA_SOURCE, FRAME_WIDTH, FRAME_HEIGHT, FPS, loop=True, realtime=True)
     
     frame_count = 0
-    frame_skip_count = 0
-    import time
-    start_time = time.time()
+    frames_since_submit = 0
+    last_demand = time.time()
+    latest_detection = NO_DETECTION  # Nothing from a previous viewer session
     
     while True:
-        ret, frame = cap.read()
+        # Stop when nobody has been watching for a while (next viewer restarts it)
+        if broadcaster.wants_frames():
+            last_demand = time.time()
+        elif time.time() - last_demand > IDLE_TIMEOUT:
+            break
+        
+        with metrics.time('capture'):
+            ret, frame = cap.read()
         if not ret:
             break
         
+        timestamp = time.time()
         frame_count += 1
-        frame_skip_count += 1
+        metrics.tick('capture', timestamp)
         
-        frame = cv2.flip(frame, 1)
+        with metrics.time('flip'):
+            frame = cv2.flip(frame, 1)
         h, w, c = frame.shape
         
-        left_bicep_angle = None
-        right_bicep_angle = None
-        head_angle = None
-        person_detected = False
-        
-        # Process detection every N frames
-        if frame_skip_count >= FRAME_SKIP:
-            frame_skip_count = 0
-            
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        if inference_pool is not None:
+            # Workers run Holistic on every skip-th frame; the loop draws the newest analysed result
+            scheduler.frame_captured()
+            frames_since_submit += 1
+            if frames_since_submit >= scheduler.skip:
+                thumbnail = cv2.resize(frame, (40, 30), interpolation=cv2.INTER_AREA)  # For motion
+                if inference_pool.submit(inference_copy(frame), (thumbnail, timestamp)):
+                    frames_since_submit = 0
+            detection = latest_detection
+        elif scheduler.should_process():
+            # Process detection when the adaptive scheduler says it is due
+            small_frame = inference_copy(frame)
+            with metrics.time('convert'):
+                frame_rgb = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+            inference_start = time.perf_counter()
             results = holistic.process(frame_rgb)
+            inference_time = time.perf_counter() - inference_start
+            metrics.observe('inference', inference_time)
+            metrics.tick('inference')
+            scheduler.inference_done(inference_time, small_frame)
             
-            if results.pose_landmarks:
-                person_detected = True
-                landmarks = results.pose_landmarks.landmark
-                
-                # Left Bicep
-                if landmarks[11].visibility > 0.3 and landmarks[13].visibility > 0.3 and landmarks[15].visibility > 0.3:
-                    left_bicep_angle = calculate_angle(landmarks[11], landmarks[13], landmarks[15])
-                    left_bicep_angle = smooth_angle(left_bicep_angle, angle_history_left)
-                
-                # Right Bicep
-                if landmarks[12].visibility > 0.3 and landmarks[14].visibility > 0.3 and landmarks[16].visibility > 0.3:
-                    right_bicep_angle = calculate_angle(landmarks[12], landmarks[14], landmarks[16])
-                    right_bicep_angle = smooth_angle(right_bicep_angle, angle_history_right)
-                
-                # Head
-                if landmarks[0].visibility > 0.3:
-                    head_angle = calculate_head_angle(landmarks, results.face_landmarks)
-                    head_angle = smooth_angle(head_angle, angle_history_head)
-                
-                # Draw landmarks
-                mp_drawing.draw_landmarks(
-                    frame,
-                    results.pose_landmarks,
-                    mp_holistic.POSE_CONNECTIONS,
-                    mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=1, circle_radius=1),
-                    mp_drawing.DrawingSpec(color=(255, 0, 0), thickness=1)
-                )
-        
-        # Draw current angle
-        current_angle = 0
-        label = "—"
-        color = (200, 200, 200)
-        
-        if SELECTED_JOINT == "left_bicep" and left_bicep_angle is not None:
-            current_angle = left_bicep_angle
-            label = "LEFT BICEP"
-            color = (100, 100, 255)
-        elif SELECTED_JOINT == "right_bicep" and right_bicep_angle is not None:
-            current_angle = right_bicep_angle
-            label = "RIGHT BICEP"
-            color = (100, 255, 255)
-        elif SELECTED_JOINT == "head" and head_angle is not None:
-            current_angle = head_angle
-            label = "HEAD"
-            color = (255, 255, 100)
+            with metrics.time('analysis'):
+                latest_detection = analyze_landmarks(results.pose_landmarks, results.face_landmarks, timestamp)
+            detection = latest_detection
+        else:
+            # Skipped frame: keep drawing the last result instead of flickering to "no person"
+            detection = latest_detection
+        person_detected, left_bicep_angle, right_bicep_angle, head_angle, pose_landmarks = detection
         
-        cv2.putText(frame, f"{label}: {current_angle:.1f}°", 
-                   (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
-        
-        # Draw status
-        status_text = f"Person: {'YES' if person_detected else 'NO'}"
-        status_color = (0, 255, 0) if person_detected else (0, 0, 255)
-        cv2.putText(frame, status_text, (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, status_color, 2)
+        with metrics.time('drawing'):
+            current_angle = annotate(frame, detection)
         
         # Update state
         with state_lock:
@@ -208,18 +292,28 @@ def generate_frames():
             current_state['head_angle'] = head_angle if head_angle else 0
             current_state['current_angle'] = current_angle
             current_state['selected_joint'] = SELECTED_JOINT
-            current_state['fps'] = frame_count / (time.time() - start_time) if time.time() - start_time > 0 else 0
+            current_state['fps'] = round(metrics.fps('capture'), 1)
             current_state['frame_count'] = frame_count
+        status_channel.notify()
         
-        # Encode frame
-        ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
-        frame_bytes = buffer.tobytes()
-        
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+        # Hand off to viewers (JPEG encoding happens once, on demand)
+        broadcaster.publish(frame)
     
     cap.release()
 
+def start_capture():
+    """Start the single capture thread if it is not running"""
+    global capture_thread
+    with capture_lock:
+        if capture_thread is None or not capture_thread.is_alive():
+            capture_thread = Thread(target=capture_loop, daemon=True)
+            capture_thread.start()
+
+def generate_frames(quality=None):
+    """Stream the shared annotated frames to one client"""
+    start_capture()
+    return broadcaster.stream(quality)
+
 @app.route('/')
 def index():
     """Serve main page"""
@@ -227,15 +321,60 @@ def index():
 
 @app.route('/video_feed')
 def video_feed():
-    """Stream video frames"""
-    return Response(generate_frames(),
+    """Stream video frames (optional ?quality=10-95)"""
+    quality = request.args.get('quality', type=int)
+    return Response(generate_frames(quality),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
 
+@app.route('/snapshot.jpg')
+def snapshot():
+    """Latest annotated frame as a single JPEG (optional ?quality=10-95)"""
+    start_capture()
+    frame_bytes = broadcaster.snapshot(request.args.get('quality', type=int))
+    if frame_bytes is None:
+        return jsonify({'error': 'no frame available yet'}), 503
+    return Response(frame_bytes, mimetype='image/jpeg')
+
+def page_status():
+    """What the page renders (pushed on /events)"""
+    with state_lock:
+        status = dict(current_state)
+    status['inference_fps'] = round(metrics.fps('inference'), 1)
+    return status
+
+def build_status():
+    """Current detection status plus pipeline diagnostics (GET /status only, they change every frame)"""
+    status = page_status()
+    status['stages'] = metrics.summary()
+    status['scheduler'] = scheduler.status()
+    if inference_pool is not None:
+        status['inference_pool'] = inference_pool.status()
+    status['viewers'] = broadcaster.subscribers
+    status['jpeg'] = dict(broadcaster.stats)
+    status['recorder'] = recorder.status() if recorder is not None else None
+    return status
+
+status_channel = StatusChannel(page_status, max_rate=STATUS_MAX_RATE)
+
 @app.route('/status')
 def get_status():
     """Get current detection status"""
-    with state_lock:
-        return jsonify(current_state)
+    return jsonify(build_status())
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Stage latencies and loop rates in Prometheus text format"""
+    text = metrics.prometheus({
+        'viewers': broadcaster.subscribers,
+        'frame_skip': scheduler.skip
+    })
+    return Response(text, content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/events')
+def events():
+    """Push status deltas as Server-Sent Events"""
+    return Response(status_channel.stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/select_joint/<joint>')
 def select_joint(joint):
@@ -245,9 +384,14 @@ def select_joint(joint):
         SELECTED_JOINT = joint
         with state_lock:
             current_state['selected_joint'] = joint
+        status_channel.notify()
         return jsonify({'status': 'ok', 'selected': joint})
     return jsonify({'status': 'error', 'message': 'Invalid joint'})
 
 if __name__ == '__main__':
+    if recorder is not None:
+        recorder.start()
+        atexit.register(recorder.close)
+        print(f"📼 Recording session {recorder.session} to {RECORD_DIR}")
     print("🎥 Movement Angle Detector - Starting on http://0.0.0.0:5052")
     app.run(host='0.0.0.0', port=5052, debug=False, threaded=True)
@@ -7,9 +7,13 @@ User can select which movement to track via GUI buttons
 
 import cv2
 import mediapipe as mp
-import numpy as np
+import os
 import sys
 from collections import deque
+
+# Shared NAVIS helpers live at the repo root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from navis_common.landmarks import to_array, pose_angles
 import serial
 import time
 
@@ -316,56 +320,6 @@ Refresh position immediately.
         self.video_thread = threading.Thread(target=self.video_loop, daemon=True)
         self.video_thread.start()
         
-    def calculate_angle(self, point1, point2, point3):
-        """
-        Calculate bicep curl angle at elbow
-        point1: shoulder
-        point2: elbow (pivot point)
-        point3: wrist
-        
-        Mapping:
-        - 0 degrees = straight arms down (fully extended)
-        - 180 degrees = bent arms (L-shape, like bicep curl)
-        """
-        a = np.array([point1.x - point2.x, point1.y - point2.y])
-        b = np.array([point3.x - point2.x, point3.y - point2.y])
-        
-        cos_angle = np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b) + 1e-6)
-        cos_angle = np.clip(cos_angle, -1, 1)
-        angle = np.arccos(cos_angle)
-        angle_deg = np.degrees(angle)
-        
-        # Invert: straight (180 degrees) becomes 0, bent (0) becomes 180
-        angle_deg = 180 - angle_deg
-        angle_deg = np.clip(angle_deg, 0, 180)
-        
-        return angle_deg
-    
-    def calculate_head_angle(self, landmarks, face_landmarks=None):
-        """Calculate head movement angle"""
-        # If face landmarks available, use eye landmarks for better accuracy
-        if face_landmarks is not None and len(face_landmarks.landmark) > 263:
-            left_eye = face_landmarks.landmark[33]
-            right_eye = face_landmarks.landmark[263]
-            eye_distance = abs(left_eye.y - right_eye.y)
-            head_angle = np.clip(eye_distance * 180, 0, 180)
-        else:
-            # Fallback: Use shoulder landmarks from pose for head estimation
-            nose = landmarks[0]
-            left_shoulder = landmarks[11]
-            right_shoulder = landmarks[12]
-            
-            shoulder_center_x = (left_shoulder.x + right_shoulder.x) / 2
-            shoulder_center_y = (left_shoulder.y + right_shoulder.y) / 2
-            
-            dx = nose.x - shoulder_center_x
-            dy = nose.y - shoulder_center_y
-            
-            head_angle = np.degrees(np.arctan2(dy, dx))
-            head_angle = np.clip(abs(head_angle) * 1.0, 0, 180)
-        
-        return head_angle
-    
     def smooth_angle(self, new_angle, history):
         """Smooth angle using moving average"""
         history.append(new_angle)
@@ -393,19 +347,14 @@ Refresh position immediately.
                 person_detected = True
                 landmarks = results.pose_landmarks.landmark
                 
-                # Left Bicep
-                if landmarks[11].visibility > 0.3 and landmarks[13].visibility > 0.3 and landmarks[15].visibility > 0.3:
-                    left_bicep_angle = self.calculate_angle(landmarks[11], landmarks[13], landmarks[15])
+                # Landmarks -> one (33, 4) array; both biceps in one joint_angles() call + head
+                left_bicep_angle, right_bicep_angle, head_angle = pose_angles(
+                    to_array(results.pose_landmarks), results.face_landmarks)
+                if left_bicep_angle is not None:
                     left_bicep_angle = self.smooth_angle(left_bicep_angle, self.angle_history_left)
-                
-                # Right Bicep
-                if landmarks[12].visibility > 0.3 and landmarks[14].visibility > 0.3 and landmarks[16].visibility > 0.3:
-                    right_bicep_angle = self.calculate_angle(landmarks[12], landmarks[14], landmarks[16])
+                if right_bicep_angle is not None:
                     right_bicep_angle = self.smooth_angle(right_bicep_angle, self.angle_history_right)
-                
-                # Head
-                if landmarks[0].visibility > 0.3:
-                    head_angle = self.calculate_head_angle(landmarks, results.face_landmarks)
+                if head_angle is not None:
                     head_angle = self.smooth_angle(head_angle, self.angle_history_head)
                 
                 # Draw landmarks
@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+"""
+NAVIS Benchmark Suite
+Times the vision hot paths of all three apps on synthetic or recorded input and
+writes the results as JSON, so two runs (before/after a change, Pi vs. dev box)
+can be compared case by case.
+
+Cases (python benchmark_suite.py list):
+    landmarks.*   to_array(), follow_inputs() / pose_angles() per frame,
+                  follow_inputs() / joint_angles() / head_angles() over a whole stack
+    follower.*    analyze_pose(), annotate() of Base/Human_Detection_Following/app.py
+    movement.*    smooth_angle(), annotate() of Movement/app.py
+    encode.*      cv2.imencode JPEG at several qualities and frame sizes
+    holistic.*    Holistic.process() per model_complexity
+    face.*        SimpleFacerec.detect_known_faces(), FaceGallery matching at 10/1k/100k identities
+
+The apps are imported as they are (recording off), so a case measures the code
+that actually runs. Cases that cannot run here (no face_recognition, model not
+downloaded, no camera-free detector) are written to the JSON as skipped with the
+reason, and compare ignores them.
+
+Inputs:
+    synthetic (default)   noise frames + random landmark arrays covering every branch
+    --video walk.mp4      recorded frames (video file or image directory); needed for
+                          realistic Holistic, face and JPEG numbers - noise has no
+                          person in it and compresses worse than a real scene
+    --session DIR[:NAME]  landmark arrays of a recorded session (navis_common/session_recorder.py)
+    --faces images/       known faces for detect_known_faces (default: empty gallery)
+
+Usage:
+    python benchmark_suite.py run                                  # -> benchmark-<time>.json
+    python benchmark_suite.py run --video walk.mp4 --session Base/Human_Detection_Following/sessions
+    python benchmark_suite.py run --only 'landmarks.*' 'encode.*' --output quick.json
+    python benchmark_suite.py compare before.json after.json       # Exit 1 on a regression
+    python benchmark_suite.py compare before.json after.json --threshold 0.25
+"""
+
+import argparse
+import fnmatch
+import importlib.util
+import json
+import os
+import platform
+import sys
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+FOLLOWER_DIR = os.path.join(ROOT, 'Base', 'Human_Detection_Following')
+MOVEMENT_DIR = os.path.join(ROOT, 'Movement')
+FACE_DIR = os.path.join(ROOT, 'Computer_Vision', 'Face_Recognition')
+
+sys.path.insert(0, ROOT)
+from navis_common.frame_sources import open_source
+from navis_common.landmarks import to_array, pose_angles, follow_inputs, joint_angles, head_angles, VISIBILITY
+from navis_common.session_recorder import open_session
+
+FORMAT_VERSION = 1
+JPEG_QUALITIES = (30, 50, 70, 90)
+HOLISTIC_COMPLEXITIES = (0, 1, 2)
+GALLERY_SIZES = (10, 1000, 100000)
+GALLERY_INDEXES = ('ivf', 'balltree')  # face_index kinds timed on the largest gallery
+ENCODING_SIZE = 128  # face_recognition (dlib) embedding length
+FACE_TOLERANCE = 0.6
+
+
+class Skip(Exception):
+    """The case cannot run in this environment; the message says why"""
+
+
+# --- Inputs ---
+
+def load_frames(spec, count, width, height):
+    """BGR frames at the apps' inference size, read up front so capture is not timed"""
+    source = open_source(spec, width, height)
+    frames = []
+    while len(frames) < count:
+        ret, frame = source.read()
+        if not ret:
+            break
+        frames.append(cv2.resize(frame, (width, height)))
+    source.release()
+    if not frames:
+        raise SystemExit(f"❌ Could not read any frames from {spec}")
+    return frames
+
+
+def synthetic_landmarks(count, seed=0):
+    """Random (33, 4) arrays, visibilities spread around every threshold the apps use"""
+    rng = np.random.default_rng(seed)
+    landmarks = rng.random((count, 33, 4), dtype=np.float32)
+    landmarks[..., 2] -= 0.5
+    return list(landmarks)
+
+
+def recorded_landmarks(spec):
+    """Landmark arrays of the detected records of a session: 'dir' (newest) or 'dir:name'"""
+    directory, _, name = spec.partition(':')
+    session = open_session(directory, name or None)
+    arrays = session.column('landmarks')[session.column('detected').astype(bool)]
+    # Estimate-only records carry no landmarks (all NaN)
+    arrays = arrays[~np.isnan(arrays[:, 0, VISIBILITY])]
+    if not len(arrays):
+        raise SystemExit(f"❌ Session {session.name} has no recorded landmarks")
+    return session.name, list(arrays)
+
+
+def to_protobuf(landmarks):
+    """NormalizedLandmarkList (what MediaPipe returns) from a landmark array"""
+    from mediapipe.framework.formats import landmark_pb2
+    message = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z, visibility in landmarks.tolist():
+        message.landmark.add(x=x, y=y, z=z, visibility=visibility, presence=visibility)
+    return message
+
+
+def cycle(items):
+    """make_args for a case that takes one item per call"""
+    return lambda i: (items[i % len(items)],)
+
+
+# --- Loading the apps ---
+
+_apps = {}
+
+
+def load_app(name, directory):
+    """Import an app's app.py under its own module name (all three are called app.py)"""
+    if name not in _apps:
+        os.environ['NAVIS_RECORD'] = '0'  # Benchmarks never write sessions
+        if directory not in sys.path:
+            sys.path.insert(0, directory)
+        spec = importlib.util.spec_from_file_location(name, os.path.join(directory, 'app.py'))
+        module = importlib.util.module_from_spec(spec)
+        try:
+            spec.loader.exec_module(module)
+            _apps[name] = module
+        except Exception as e:
+            # Remembered, so every case of that app is skipped without re-importing
+            _apps[name] = Skip(f"{name} does not import here: {type(e).__name__}: {e}")
+    if isinstance(_apps[name], Skip):
+        raise _apps[name]
+    return _apps[name]
+
+
+def face_recognition_module():
+    try:
+        import face_recognition
+    except ImportError:
+        raise Skip("face_recognition is not installed")
+    return face_recognition
+
+
+# --- Cases ---
+# Each group yields (name, setup); setup() returns (fn, make_args, items) or raises Skip.
+# make_args(i) builds the arguments of call i outside the timed region; items > 1 means
+# one call processes that many frames and results are reported per frame.
+
+def landmark_cases(inputs):
+    arrays = inputs.landmarks
+    messages = inputs.messages
+    faces = [None, None, None, inputs.face_mesh]  # A face mesh on a quarter of the frames
+    pairs = [(arrays[i], faces[i % len(faces)]) for i in range(len(arrays))]
+    stack = np.stack(arrays)
+
+    yield 'landmarks.to_array', lambda: (to_array, cycle(messages), 1)
+    yield 'landmarks.follow_inputs', lambda: (follow_inputs, lambda i: (arrays[i % len(arrays)],), 1)
+    yield 'landmarks.pose_angles', lambda: (pose_angles, lambda i: pairs[i % len(pairs)], 1)
+    yield 'landmarks.follow_inputs_batch', lambda: (follow_inputs, lambda i: (stack,), len(stack))
+    yield 'landmarks.joint_angles_batch', lambda: (joint_angles, lambda i: (stack,), len(stack))
+    yield 'landmarks.head_angles_batch', lambda: (head_angles, lambda i: (stack,), len(stack))
+
+
+def follower_cases(inputs):
+    frames, arrays, messages = inputs.frames, inputs.landmarks, inputs.messages
+
+    def analyze_pose():
+        app = load_app('follower_app', FOLLOWER_DIR)
+        return app.analyze_pose, lambda i: (frames[i % len(frames)], arrays[i % len(arrays)]), 1
+
+    def annotate():
+        app = load_app('follower_app', FOLLOWER_DIR)
+        # A person being followed: skeleton, ROI box, tracker marker and all status lines
+        app.loop_state.update(nose_x=0.45, position='center', depth='medium',
+                              depth_percent=0.5, last_command='S')
+        app.current_state['person_y'] = frames[0].shape[0] // 3
+
+        def make_args(i):
+            result = {'pose_landmarks': messages[i % len(messages)], 'landmarks': arrays[i % len(arrays)],
+                      'roi': (0.2, 0.1, 0.7, 0.9)}
+            return frames[i % len(frames)].copy(), result
+        return app.annotate, make_args, 1
+
+    yield 'follower.analyze_pose', analyze_pose
+    yield 'follower.annotate', annotate
+
+
+def movement_cases(inputs):
+    frames, messages = inputs.frames, inputs.messages
+    angles = np.random.default_rng(1).uniform(0, 180, 1000).tolist()
+
+    def smooth_angle():
+        app = load_app('movement_app', MOVEMENT_DIR)
+        history = deque(maxlen=app.SMOOTHING_FRAMES)
+        return app.smooth_angle, lambda i: (angles[i % len(angles)], history), 1
+
+    def annotate():
+        app = load_app('movement_app', MOVEMENT_DIR)
+
+        def make_args(i):
+            detection = (True, 42.0, 97.5, 12.0, messages[i % len(messages)])
+            return frames[i % len(frames)].copy(), detection
+        return app.annotate, make_args, 1
+
+    yield 'movement.smooth_angle', smooth_angle
+    yield 'movement.annotate', annotate
+
+
+def encode_cases(inputs):
+    for width, height in inputs.sizes:
+        frames = [cv2.resize(frame, (width, height)) for frame in inputs.frames]
+        for quality in JPEG_QUALITIES:
+            params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+            yield (f'encode.jpeg_q{quality}_{width}x{height}',
+                   lambda frames=frames, params=params: (cv2.imencode, lambda i: ('.jpg', frames[i % len(frames)], params), 1))
+
+
+def holistic_cases(inputs):
+    rgb_frames = [cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) for frame in inputs.frames]
+
+    def setup(complexity):
+        import mediapipe as mp
+        try:
+            model = mp.solutions.holistic.Holistic(static_image_mode=False, model_complexity=complexity,
+                                                   min_detection_confidence=0.4, min_tracking_confidence=0.4)
+        except Exception as e:
+            raise Skip(f"Holistic(model_complexity={complexity}) unavailable: {type(e).__name__}: {e}")
+        return model.process, cycle(rgb_frames), 1
+
+    for complexity in HOLISTIC_COMPLEXITIES:
+        yield f'holistic.process_c{complexity}', lambda complexity=complexity: setup(complexity)
+
+
+def face_cases(inputs):
+    frames = inputs.frames
+
+    def detect_known_faces():
+        face_recognition_module()
+        if FACE_DIR not in sys.path:
+            sys.path.insert(0, FACE_DIR)
+        from simple_facerec import SimpleFacerec
+        sfr = SimpleFacerec()
+        if inputs.faces:
+            sfr.load_encoding_images(inputs.faces)
+        return sfr.detect_known_faces, cycle(frames), 1
+
+    def gallery(size, index=None):
+        if FACE_DIR not in sys.path:
+            sys.path.insert(0, FACE_DIR)
+        from face_gallery import FaceGallery
+        from face_index import create_index
+        rng = np.random.default_rng(size)
+        # dlib-scale random embeddings (unrelated faces ~1.4 apart); probes are perturbed
+        # gallery entries (hits) or fresh vectors (misses); one uploaded face on top
+        known = rng.normal(0, 0.09, (size, ENCODING_SIZE))
+        gallery = FaceGallery(tolerance=FACE_TOLERANCE, index=index and create_index(index))
+        gallery.add(known, [f"person_{i}" for i in range(size)], source='known')
+        gallery.replace('dynamic', known[:1] + rng.normal(0, 0.02, (1, ENCODING_SIZE)), ["uploaded"])
+        probes = [known[i % size] + rng.normal(0, 0.02, ENCODING_SIZE) for i in range(50)]
+        probes += list(rng.normal(0, 0.09, (50, ENCODING_SIZE)))
+        # One face per call, as verify_tracks() does for one new face
+        return gallery.identify, lambda i: ([probes[i % len(probes)]],), 1
+
+    yield 'face.detect_known_faces', detect_known_faces
+    for size in GALLERY_SIZES:
+        yield f'face.gallery_match_{size}', lambda size=size: gallery(size)
+    # Approximate / tree indexes only pay off on the largest gallery
+    for index in GALLERY_INDEXES:
+        yield f'face.gallery_match_{index}_{GALLERY_SIZES[-1]}', lambda index=index: gallery(GALLERY_SIZES[-1], index)
+
+
+GROUPS = [landmark_cases, follower_cases, movement_cases, encode_cases, holistic_cases, face_cases]
+
+
+# --- Running ---
+
+def measure(fn, make_args, items, min_time, min_runs, max_runs, warmup):
+    """Per-call samples in microseconds (per frame when one call handles several)"""
+    for i in range(warmup):
+        fn(*make_args(i))
+    samples = []
+    deadline = time.perf_counter() + min_time
+    i = warmup
+    while len(samples) < max_runs and (len(samples) < min_runs or time.perf_counter() < deadline):
+        args = make_args(i)
+        start = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - start) * 1e6 / items)
+        i += 1
+    return np.array(samples)
+
+
+def summarize(samples, items):
+    return {
+        'median_us': round(float(np.median(samples)), 3),
+        'p95_us': round(float(np.percentile(samples, 95)), 3),
+        'mean_us': round(float(samples.mean()), 3),
+        'min_us': round(float(samples.min()), 3),
+        'runs': len(samples),
+        'items_per_run': items
+    }
+
+
+def selected(name, patterns):
+    return not patterns or any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+
+def environment():
+    """What the numbers depend on; compare warns when these differ"""
+    versions = {'python': platform.python_version(), 'numpy': np.__version__, 'opencv': cv2.__version__}
+    for module in ('mediapipe', 'face_recognition'):
+        try:
+            versions[module] = __import__(module).__version__
+        except Exception:
+            versions[module] = None
+    return {
+        'host': platform.node(),
+        'machine': platform.machine(),
+        'system': platform.platform(),
+        'cpus': os.cpu_count(),
+        'versions': versions
+    }
+
+
+def build_inputs(args):
+    inputs = argparse.Namespace(faces=args.faces, sizes=args.sizes)
+    frame_spec = args.video or f'synthetic:{args.frames}'
+    inputs.frames = load_frames(frame_spec, args.frames, args.width, args.height)
+    if args.session:
+        landmark_spec, inputs.landmarks = recorded_landmarks(args.session)
+    else:
+        landmark_spec, inputs.landmarks = 'synthetic', synthetic_landmarks(args.landmarks)
+    inputs.messages = [to_protobuf(landmarks) for landmarks in inputs.landmarks]
+    inputs.face_mesh = to_protobuf(np.random.default_rng(2).random((468, 4), dtype=np.float32))
+    inputs.description = {
+        'frames': frame_spec, 'frame_count': len(inputs.frames), 'frame_size': [args.width, args.height],
+        'landmarks': landmark_spec, 'landmark_count': len(inputs.landmarks), 'faces': args.faces
+    }
+    return inputs
+
+
+def run(args):
+    inputs = build_inputs(args)
+    results = {}
+    print(f"📊 NAVIS benchmark suite: frames={inputs.description['frames']} "
+          f"landmarks={inputs.description['landmarks']}")
+    print("-" * 72)
+    print(f"{'case':<36} {'median µs':>11} {'p95 µs':>11} {'runs':>7}")
+    for group in GROUPS:
+        for name, setup in group(inputs):
+            if not selected(name, args.only):
+                continue
+            try:
+                fn, make_args, items = setup()
+                samples = measure(fn, make_args, items, args.min_time, args.min_runs,
+                                  args.max_runs, args.warmup)
+            except Skip as e:
+                results[name] = {'skipped': str(e)}
+                print(f"{name:<36} {'skipped':>11}  {e}")
+                continue
+            results[name] = summarize(samples, items)
+            stats = results[name]
+            print(f"{name:<36} {stats['median_us']:>11.2f} {stats['p95_us']:>11.2f} {stats['runs']:>7}")
+    print("-" * 72)
+
+    report = {
+        'format': FORMAT_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': environment(),
+        'inputs': inputs.description,
+        'settings': {'min_time': args.min_time, 'min_runs': args.min_runs,
+                     'max_runs': args.max_runs, 'warmup': args.warmup},
+        'results': results
+    }
+    output = args.output or f"benchmark-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Results written to {output}")
+
+
+# --- Comparing ---
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    for key in ('machine', 'cpus', 'versions'):
+        if baseline['environment'].get(key) != current['environment'].get(key):
+            print(f"⚠️ {key} differs: {baseline['environment'].get(key)} -> {current['environment'].get(key)}")
+    if baseline['inputs'] != current['inputs']:
+        print("⚠️ Runs used different inputs; only compare numbers of the same input")
+
+    regressions = []
+    print(f"{'case':<36} {'before µs':>11} {'after µs':>11} {'change':>8}")
+    print("-" * 72)
+    for name in sorted(set(baseline['results']) | set(current['results'])):
+        before = baseline['results'].get(name, {})
+        after = current['results'].get(name, {})
+        if 'median_us' not in before or 'median_us' not in after:
+            state = 'new' if not before else 'missing' if not after else 'skipped'
+            print(f"{name:<36} {'':>11} {'':>11} {state:>8}")
+            continue
+        old, new = before['median_us'], after['median_us']
+        change = (new - old) / old if old > 0 else 0.0
+        flag = ''
+        # Both relative and absolute: sub-microsecond cases jitter by more than any threshold
+        if change > args.threshold and new - old > args.min_delta:
+            flag = '❌ regression'
+            regressions.append(name)
+        elif change < -args.threshold and old - new > args.min_delta:
+            flag = '✅ faster'
+        print(f"{name:<36} {old:>11.2f} {new:>11.2f} {change * 100:>+7.1f}% {flag}")
+    print("-" * 72)
+
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) over {args.threshold * 100:.0f}%: {', '.join(regressions)}")
+        sys.exit(1)
+    print(f"✅ No regressions over {args.threshold * 100:.0f}%")
+
+
+def parse_size(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the NAVIS vision hot paths")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="Run the cases and write a JSON report")
+    run_parser.add_argument('--video', help="Video file or image directory (default: synthetic frames)")
+    run_parser.add_argument('--session', help="Recorded session for landmarks: DIR or DIR:NAME")
+    run_parser.add_argument('--faces', help="Known-face images for detect_known_faces")
+    run_parser.add_argument('--frames', type=int, default=60, help="Frames to load")
+    run_parser.add_argument('--landmarks', type=int, default=200, help="Synthetic landmark arrays")
+    run_parser.add_argument('--width', type=int, default=320, help="Inference width")
+    run_parser.add_argument('--height', type=int, default=240, help="Inference height")
+    run_parser.add_argument('--sizes', type=parse_size, nargs='+', default=[(320, 240), (640, 480)],
+                            help="JPEG frame sizes, e.g. 320x240 640x480")
+    run_parser.add_argument('--only', nargs='+', help="Case name patterns, e.g. 'landmarks.*'")
+    run_parser.add_argument('--min-time', type=float, default=1.0, help="Seconds per case")
+    run_parser.add_argument('--min-runs', type=int, default=10)
+    run_parser.add_argument('--max-runs', type=int, default=20000)
+    run_parser.add_argument('--warmup', type=int, default=5)
+    run_parser.add_argument('--output', help="JSON file (default: benchmark-<time>.json)")
+
+    compare_parser = commands.add_parser('compare', help="Compare two JSON reports")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.10,
+                                help="Relative slowdown of the median that counts as a regression")
+    compare_parser.add_argument('--min-delta', type=float, default=1.0,
+                                help="...and by at least this many microseconds")
+
+    list_parser = commands.add_parser('list', help="List the case names")
+    list_parser.add_argument('--only', nargs='+')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run(args)
+    elif args.command == 'compare':
+        compare(args)
+    else:
+        inputs = argparse.Namespace(frames=[np.zeros((240, 320, 3), np.uint8)], landmarks=synthetic_landmarks(1),
+                                    messages=[None], face_mesh=None, faces=None, sizes=[(320, 240), (640, 480)])
+        for group in GROUPS:
+            for name, _ in group(inputs):
+                if selected(name, args.only):
+                    print(name)
+
+
+if __name__ == '__main__':
+    main()
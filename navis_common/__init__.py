@@ -0,0 +1,7 @@
+"""
+NAVIS Common
+Helpers shared by the Flask vision apps (follower, Movement, Face_Recognition)
+
+Apps live in their own folders and are started with `python app.py`, so each one
+adds the repo root to sys.path before importing from here.
+"""
@@ -0,0 +1,150 @@
+"""
+Frame Broadcaster
+Encode-once JPEG cache shared by every MJPEG viewer and the /snapshot.jpg endpoint
+
+The producer publishes raw annotated BGR frames. Each frame is JPEG-encoded at most
+once per quality level, on first request, and the same bytes are handed to every
+subscriber, so encoding cost does not grow with the number of clients.
+
+In passthrough mode the producer publishes the camera's own JPEG bytes instead
+(publish_jpeg) and nothing is ever encoded; the quality parameter is ignored.
+"""
+
+import cv2
+import threading
+import time
+
+MIN_QUALITY = 10
+MAX_QUALITY = 95
+
+
+class FrameBroadcaster:
+    """Latest-frame fan-out with a per-quality JPEG cache"""
+
+    def __init__(self, default_quality=50, snapshot_demand=2.0, metrics=None):
+        self.default_quality = default_quality
+        self.metrics = metrics                # Optional StageMetrics ('encoding' stage)
+        self.snapshot_demand = snapshot_demand  # Seconds a snapshot request keeps frames flowing
+
+        self._cond = threading.Condition()
+        self._encode_lock = threading.Lock()  # Serializes encoding so a frame is never encoded twice
+        self._frame = None
+        self._jpeg = None                     # Pre-encoded frame from publish_jpeg()
+        self._cache = {}                      # quality -> (seq, jpeg bytes)
+        self._last_snapshot_request = 0.0
+        self._closed = False
+        self.seq = 0
+        self.subscribers = 0
+        self.stats = {'published': 0, 'encoded': 0, 'cache_hits': 0, 'passthrough': 0}
+
+    def clamp_quality(self, quality):
+        if quality is None:
+            return self.default_quality
+        return max(MIN_QUALITY, min(MAX_QUALITY, int(quality)))
+
+    # --- Producer side ---
+
+    def publish(self, frame):
+        """Publish a new annotated frame (must not be modified afterwards)"""
+        with self._cond:
+            self._frame = frame
+            self._jpeg = None
+            self._cache = {}
+            self.seq += 1
+            self.stats['published'] += 1
+            self._cond.notify_all()
+
+    def publish_jpeg(self, data):
+        """Publish an already-encoded JPEG (camera MJPEG passthrough): served as-is"""
+        with self._cond:
+            self._frame = None
+            self._jpeg = data
+            self._cache = {}
+            self.seq += 1
+            self.stats['published'] += 1
+            self.stats['passthrough'] += 1
+            self._cond.notify_all()
+
+    def wants_frames(self):
+        """True while someone is streaming or recently asked for a snapshot"""
+        return self.subscribers > 0 or \
+            time.time() - self._last_snapshot_request < self.snapshot_demand
+
+    def wait_for_demand(self, timeout=1.0):
+        """Block until a viewer shows up (or timeout); returns wants_frames()"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.wants_frames() or self._closed, timeout=timeout)
+        return self.wants_frames() and not self._closed
+
+    def close(self):
+        """Wake up and end every stream"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    # --- Consumer side ---
+
+    def jpeg(self, quality=None):
+        """Return (seq, jpeg bytes) of the latest frame, encoding it only if not cached"""
+        quality = self.clamp_quality(quality)
+        with self._encode_lock:
+            with self._cond:
+                seq, frame = self.seq, self._frame
+                cached = self._cache.get(quality)
+                if self._jpeg is not None:
+                    return seq, self._jpeg
+            if frame is None:
+                return 0, None
+            if cached is not None and cached[0] == seq:
+                self.stats['cache_hits'] += 1
+                return cached
+
+            start = time.perf_counter()
+            ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            if self.metrics is not None:
+                self.metrics.observe('encoding', time.perf_counter() - start)
+            if not ret:
+                return seq, None
+            data = buffer.tobytes()
+            self.stats['encoded'] += 1
+            with self._cond:
+                if self.seq == seq:
+                    self._cache[quality] = (seq, data)
+            return seq, data
+
+    def stream(self, quality=None):
+        """Yield MJPEG parts for one client, each published frame at most once"""
+        with self._cond:
+            self.subscribers += 1
+            self._cond.notify_all()
+            last_seq = self.seq
+
+        try:
+            while not self._closed:
+                with self._cond:
+                    self._cond.wait_for(lambda: self.seq != last_seq or self._closed, timeout=1.0)
+                    if self.seq == last_seq:
+                        continue
+                    last_seq = self.seq       # Even if encoding fails: wait for the next frame, do not spin
+                seq, frame_bytes = self.jpeg(quality)
+                if frame_bytes is None:
+                    continue
+                last_seq = seq
+
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+        finally:
+            with self._cond:
+                self.subscribers -= 1
+
+    def snapshot(self, quality=None, timeout=1.0):
+        """
+        JPEG bytes of a fresh frame for /snapshot.jpg
+        Signals demand first so lazy producers render one; falls back to the last frame
+        """
+        with self._cond:
+            self._last_snapshot_request = time.time()
+            start_seq = self.seq
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: self.seq != start_seq or self._closed, timeout=timeout)
+        return self.jpeg(quality)[1]
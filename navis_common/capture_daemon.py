@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Capture Daemon
+The only process that opens the camera. Every frame goes into a shared-memory
+ring (navis_common/frame_ring.py) that the web apps attach to with
+NAVIS_SOURCE=shm:navis_camera, so several apps share one camera and one decoder.
+
+Frames are stored as captured (not mirrored); each app still mirrors and resizes
+to its own FRAME_WIDTH/FRAME_HEIGHT.
+
+Usage:
+    python navis_common/capture_daemon.py                        # Camera 0, 640x480
+    python navis_common/capture_daemon.py --width 320 --height 240
+    python navis_common/capture_daemon.py --source walk.mp4      # Replay a clip as "the camera"
+
+    NAVIS_SOURCE=shm:navis_camera python Base/Human_Detection_Following/app.py
+"""
+
+import argparse
+import os
+import signal
+import sys
+import time
+import cv2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from navis_common.frame_ring import FrameRing, DEFAULT_RING
+from navis_common.frame_sources import open_source
+
+
+def stop(signum, frame):
+    """systemd / kill send SIGTERM: leave through the same cleanup as Ctrl+C"""
+    raise KeyboardInterrupt
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Share one camera with every NAVIS app")
+    parser.add_argument('--source', default='0', help="Camera index or any frame source spec")
+    parser.add_argument('--name', default=DEFAULT_RING, help="Shared memory ring name")
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--slots', type=int, default=4, help="Ring depth in frames")
+    parser.add_argument('--report', type=float, default=10.0, help="Seconds between status lines")
+    args = parser.parse_args()
+
+    signal.signal(signal.SIGTERM, stop)
+
+    ring = FrameRing.create(args.name, args.width, args.height, slots=args.slots)
+    print(f"📷 Capture daemon: {args.source} -> shm:{args.name} "
+          f"({args.width}x{args.height}, {args.slots} slots)")
+
+    cap = None
+    written = 0
+    last_report = time.time()
+    try:
+        while True:
+            if cap is None:
+                # Recordings loop at their own rate so they behave like the camera
+                cap = open_source(args.source, args.width, args.height, args.fps,
+                                  loop=True, realtime=True)
+            ret, frame = cap.read()
+            if not ret:
+                print("⚠️ Camera read failed, reopening...")
+                cap.release()
+                cap = None
+                time.sleep(0.5)
+                continue
+
+            if frame.shape != ring.frame_shape:
+                # Webcams may ignore the requested size
+                frame = cv2.resize(frame, (args.width, args.height), interpolation=cv2.INTER_AREA)
+            ring.write(frame, time.time())
+            written += 1
+
+            now = time.time()
+            if now - last_report >= args.report:
+                print(f"frames: {ring.latest_seq} | {written / (now - last_report):.1f} FPS")
+                written = 0
+                last_report = now
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping capture daemon")
+    finally:
+        if cap is not None:
+            cap.release()
+        ring.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""
+Shared-Memory Frame Ring
+One writer (capture_daemon.py) owns the camera and writes every frame into a
+POSIX shared-memory ring; any number of apps attach by name and read the
+newest frame without opening the device or decoding anything.
+
+Layout of the shared block (all little-endian, fixed at creation):
+
+    header      8 x int64   magic, version, width, height, channels, slots, latest seq, writer pid
+    slot seqs   slots x int64    sequence number of the frame in each slot (-1 = being written)
+    slot times  slots x float64  capture timestamp (time.time()) of each slot
+    pixels      slots x height x width x channels uint8
+
+A slot is marked -1 while it is written and gets its sequence number afterwards,
+so a reader that sees the same number before and after copying knows the frame is
+whole (seqlock). The ring is deep enough that the newest slot is never rewritten
+while a reader copies it unless that reader stalls for slots-1 frame periods.
+"""
+
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+MAGIC = 0x4E415649530001          # 'NAVIS' + layout 1
+VERSION = 1
+HEADER_FIELDS = 8
+DEFAULT_RING = 'navis_camera'     # Name used by capture_daemon.py and 'shm:' sources
+
+
+def _pid_alive(pid):
+    """True if a process with this pid exists (it may belong to another user)"""
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _attach(name):
+    """Open an existing block without letting this process's resource tracker unlink it at exit"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)   # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except Exception:
+            pass
+        return shm
+
+
+class FrameRing:
+    """Writer or reader view of a shared-memory frame ring (use create() / attach())"""
+
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner                    # True in the daemon: it unlinks the block on close()
+        self.header = np.ndarray((HEADER_FIELDS,), dtype='<i8', buffer=shm.buf)
+        if self.header[0] != MAGIC or self.header[1] != VERSION:
+            raise ValueError(f"Shared memory '{shm.name}' is not a NAVIS frame ring")
+        _, _, self.width, self.height, self.channels, self.slots, _, _ = (int(v) for v in self.header)
+        self.frame_shape = (self.height, self.width, self.channels)
+
+        offset = self.header.nbytes
+        self.slot_seqs = np.ndarray((self.slots,), dtype='<i8', buffer=shm.buf, offset=offset)
+        offset += self.slot_seqs.nbytes
+        self.slot_times = np.ndarray((self.slots,), dtype='<f8', buffer=shm.buf, offset=offset)
+        offset += self.slot_times.nbytes
+        self.pixels = np.ndarray((self.slots,) + self.frame_shape, dtype=np.uint8,
+                                 buffer=shm.buf, offset=offset)
+
+    @classmethod
+    def create(cls, name=DEFAULT_RING, width=640, height=480, channels=3, slots=4):
+        """
+        Writer side: allocate the ring (replacing a stale one left by a crashed daemon)
+        Raises FileExistsError if the name belongs to a running daemon or is not a NAVIS ring
+        """
+        size = (HEADER_FIELDS + 2 * slots) * 8 + slots * width * height * channels
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            stale = _attach(name)
+            try:
+                header = np.ndarray((HEADER_FIELDS,), dtype='<i8', buffer=stale.buf).copy() \
+                    if stale.size >= HEADER_FIELDS * 8 else None
+            finally:
+                stale.close()
+            if header is None or header[0] != MAGIC:
+                raise FileExistsError(f"Shared memory '{name}' exists and is not a NAVIS frame ring")
+            if _pid_alive(int(header[7])):
+                raise FileExistsError(f"Frame ring '{name}' is in use by a running writer (pid {int(header[7])})")
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+
+        header = np.ndarray((HEADER_FIELDS,), dtype='<i8', buffer=shm.buf)
+        header[:] = (MAGIC, VERSION, width, height, channels, slots, 0, os.getpid())
+        ring = cls(shm, owner=True)
+        ring.slot_seqs[:] = 0
+        ring.slot_times[:] = 0.0
+        return ring
+
+    @classmethod
+    def attach(cls, name=DEFAULT_RING):
+        """Reader side: open an existing ring (FileNotFoundError if no daemon created it)"""
+        return cls(_attach(name), owner=False)
+
+    # --- Writer ---
+
+    def write(self, frame, timestamp=None):
+        """Store one frame in the next slot; returns its sequence number"""
+        if frame.shape != self.frame_shape:
+            raise ValueError(f"Frame {frame.shape} does not match ring {self.frame_shape}")
+        seq = int(self.header[6]) + 1
+        slot = seq % self.slots
+        self.slot_seqs[slot] = -1             # Readers skip the slot while it is torn
+        self.pixels[slot] = frame
+        self.slot_times[slot] = time.time() if timestamp is None else timestamp
+        self.slot_seqs[slot] = seq
+        self.header[6] = seq                  # Publish last
+        return seq
+
+    # --- Reader ---
+
+    @property
+    def latest_seq(self):
+        return int(self.header[6])
+
+    @property
+    def writer_pid(self):
+        return int(self.header[7])
+
+    def read(self, last_seq=0, copy=True):
+        """
+        Newest frame if it is newer than last_seq: (seq, timestamp, frame), else None
+        copy=False returns a read-only view into the ring (valid until the writer
+        laps it; check with still_valid(seq) after use)
+        """
+        for _ in range(3):
+            seq = self.latest_seq
+            if seq <= last_seq:
+                return None
+            slot = seq % self.slots
+            if self.slot_seqs[slot] != seq:
+                continue                      # Writer moved on between the two reads
+            timestamp = float(self.slot_times[slot])
+            if copy:
+                frame = self.pixels[slot].copy()
+            else:
+                frame = self.pixels[slot].view()
+                frame.flags.writeable = False
+            if self.slot_seqs[slot] == seq:
+                return seq, timestamp, frame
+        return None
+
+    def still_valid(self, seq):
+        """True while the slot holding seq has not been overwritten"""
+        return self.slot_seqs[seq % self.slots] == seq
+
+    def close(self):
+        # Views into the buffer must go before the mapping can be closed
+        self.header = self.slot_seqs = self.slot_times = self.pixels = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
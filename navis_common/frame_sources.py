@@ -0,0 +1,335 @@
+"""
+Frame Sources
+Webcam, video file, image directory and synthetic frames behind one read() API
+
+Every source behaves like cv2.VideoCapture (read / isOpened / release / set), so
+the existing capture loops take any of them unchanged. That lets the apps,
+benchmarks and replay.py run on a dev box or in CI without a camera.
+
+    open_source(0)                   # Webcam 0
+    open_source('walk.mp4')          # Video file
+    open_source('frames/')           # Directory of .jpg/.png, sorted by name
+    open_source('synthetic')         # Generated frames (synthetic:300 = 300 frames)
+    open_source('shm:navis_camera')  # Frame ring written by capture_daemon.py (shared camera)
+"""
+
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+from navis_common.frame_ring import FrameRing, DEFAULT_RING
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+class FrameSource:
+    """Base class: subclasses implement _read() returning a BGR frame or None"""
+
+    def __init__(self, width=None, height=None, fps=30.0, loop=False, realtime=False):
+        self.width = width                    # Resize output to this size (None = native)
+        self.height = height
+        self.fps = fps                        # Nominal rate (used for pacing and timestamps)
+        self.loop = loop                      # Restart at the end instead of returning False
+        self.realtime = realtime              # Sleep to deliver frames at fps (like a camera)
+        self.frame_index = 0
+        self._next_time = None
+
+    def _read(self):
+        raise NotImplementedError
+
+    def _rewind(self):
+        """Go back to the first frame; return False if the source cannot loop"""
+        return False
+
+    def read(self):
+        """Same contract as cv2.VideoCapture.read(): (ok, frame)"""
+        frame = self._read()
+        if frame is None and self.loop and self._rewind():
+            frame = self._read()
+        if frame is None:
+            return False, None
+
+        if self.width and self.height and frame.shape[:2] != (self.height, self.width):
+            frame = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_AREA)
+
+        if self.realtime and self.fps:
+            now = time.time()
+            if self._next_time is None or now - self._next_time > 1.0:
+                self._next_time = now           # First frame or we fell far behind: resync
+            elif self._next_time > now:
+                time.sleep(self._next_time - now)
+            self._next_time += 1.0 / self.fps
+
+        self.frame_index += 1
+        return True, frame
+
+    def read_jpeg(self, quality=80):
+        """
+        (ok, JPEG bytes) for passthrough streaming. Only a camera in MJPEG mode
+        hands over its own bytes; other sources encode here (for testing)
+        """
+        ret, frame = self.read()
+        if not ret:
+            return False, None
+        ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        return ret, buffer.tobytes() if ret else None
+
+    def isOpened(self):
+        return True
+
+    def set(self, prop, value):
+        """Capture properties only apply to cameras; accepted and ignored here"""
+        return False
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        return 0
+
+    def release(self):
+        pass
+
+    @property
+    def name(self):
+        return self.__class__.__name__
+
+
+class WebcamSource(FrameSource):
+    """
+    Live camera (the old hard-wired cv2.VideoCapture(0))
+    mjpeg=True asks V4L2 for MJPG and turns off OpenCV's decoding, so read_jpeg()
+    returns the camera's own JPEG bytes and read() decodes only when called
+    """
+
+    def __init__(self, device=0, width=320, height=240, fps=30, mjpeg=False):
+        # The camera paces itself and the driver does the resizing
+        super().__init__(None, None, fps)
+        self.device = device
+        self.cap = cv2.VideoCapture(device)
+        if mjpeg:
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self.cap.set(cv2.CAP_PROP_FPS, fps)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Reduce buffer for lower latency
+
+        # Raw mode only helps if the camera really negotiated MJPG
+        fourcc = int(self.cap.get(cv2.CAP_PROP_FOURCC))
+        self.passthrough = mjpeg and fourcc == cv2.VideoWriter_fourcc(*'MJPG') and \
+            self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+        if mjpeg and not self.passthrough:
+            print("⚠️ Camera does not deliver raw MJPEG; frames will be re-encoded")
+
+    def _read(self):
+        ret, frame = self.cap.read()
+        if not ret:
+            return None
+        if self.passthrough and frame.ndim < 3:
+            return decode_jpeg(frame)
+        return frame
+
+    def read_jpeg(self, quality=80):
+        if not self.passthrough:
+            return super().read_jpeg(quality)
+        ret, data = self.cap.read()
+        if not ret or data is None:
+            return False, None
+        if data.ndim == 3:
+            # Driver switched back to decoded frames mid-stream
+            self.passthrough = False
+            ret, buffer = cv2.imencode('.jpg', data, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            return ret, buffer.tobytes() if ret else None
+        self.frame_index += 1
+        return True, data.tobytes()
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def set(self, prop, value):
+        return self.cap.set(prop, value)
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def release(self):
+        self.cap.release()
+
+
+class VideoFileSource(FrameSource):
+    """Recorded clip; fps comes from the file"""
+
+    def __init__(self, path, width=None, height=None, loop=False, realtime=False):
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        super().__init__(width, height, fps, loop, realtime)
+
+    def _read(self):
+        ret, frame = self.cap.read()
+        return frame if ret else None
+
+    def _rewind(self):
+        return self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+
+class ImageDirectorySource(FrameSource):
+    """Directory of still images played back in file-name order"""
+
+    def __init__(self, path, width=None, height=None, fps=30.0, loop=False, realtime=False):
+        super().__init__(width, height, fps, loop, realtime)
+        self.path = path
+        self.files = sorted(f for f in glob.glob(os.path.join(path, '*'))
+                            if f.lower().endswith(IMAGE_EXTENSIONS))
+        self._position = 0
+
+    def _read(self):
+        while self._position < len(self.files):
+            frame = cv2.imread(self.files[self._position])
+            self._position += 1
+            if frame is not None:
+                return frame
+        return None
+
+    def _rewind(self):
+        self._position = 0
+        return bool(self.files)
+
+    def isOpened(self):
+        return bool(self.files)
+
+
+class SyntheticSource(FrameSource):
+    """Deterministic noise frames with a moving bright blob (no person: pipeline cost only)"""
+
+    def __init__(self, width=320, height=240, fps=30.0, frames=None, loop=False,
+                 realtime=False, seed=0):
+        super().__init__(width, height, fps, loop, realtime)
+        self.frames = frames                  # None = endless
+        self.seed = seed
+        self._rewind()
+
+    def _rewind(self):
+        self._rng = np.random.default_rng(self.seed)
+        self._position = 0
+        return True
+
+    def _read(self):
+        if self.frames is not None and self._position >= self.frames:
+            return None
+        frame = self._rng.integers(0, 60, (self.height, self.width, 3), dtype=np.uint8)
+        cx = int((self._position % 60) / 60 * self.width)
+        cv2.circle(frame, (cx, self.height // 2), self.height // 5, (200, 200, 200), -1)
+        self._position += 1
+        return frame
+
+
+class SharedRingSource(FrameSource):
+    """
+    Attach to the shared-memory ring of capture_daemon.py instead of opening the camera
+    read() waits for the daemon's next frame (the camera paces it, like a webcam)
+
+    Frames are taken as a view into the ring and leave it in exactly one copy:
+    the resize when width/height differ from the ring, else an explicit copy
+    (callers keep frames beyond the few slots the daemon leaves untouched)
+    """
+
+    def __init__(self, name, width=None, height=None, timeout=2.0, poll_interval=0.002):
+        super().__init__(width, height)
+        self.ring_name = name
+        self.timeout = timeout                # No new frame for this long = daemon gone
+        self.poll_interval = poll_interval    # Shared memory has no wake-up, so poll
+        self.last_seq = 0
+        self.last_timestamp = None            # Daemon's capture time of the last frame
+        self.frames_missed = 0                # Frames the daemon wrote that we never read
+        try:
+            self.ring = FrameRing.attach(name)
+        except (FileNotFoundError, ValueError) as e:
+            print(f"⚠️ Frame ring '{name}' not available ({e}); is capture_daemon.py running?")
+            self.ring = None
+        if self.ring is not None:
+            # Start with the newest frame (an empty ring has latest_seq 0)
+            self.last_seq = max(0, self.ring.latest_seq - 1)
+
+    def _read(self):
+        if self.ring is None:
+            return None
+        deadline = time.time() + self.timeout
+        while True:
+            item = self.ring.read(self.last_seq, copy=False)
+            if item is not None:
+                break
+            if time.time() > deadline:
+                return None
+            time.sleep(self.poll_interval)
+        seq, self.last_timestamp, frame = item
+        if self.last_seq:
+            self.frames_missed += max(0, seq - self.last_seq - 1)
+        self.last_seq = seq
+        return frame
+
+    def read(self):
+        ok, frame = super().read()
+        while ok:
+            if not frame.flags.writeable:
+                frame = frame.copy()          # Not resized: still the read-only ring view
+            if self.ring.still_valid(self.last_seq):
+                break
+            # The daemon lapped the slot while we copied it: take the next frame
+            ok, frame = super().read()
+        return ok, frame
+
+    def isOpened(self):
+        return self.ring is not None
+
+    def release(self):
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+    @property
+    def name(self):
+        return f"SharedRingSource({self.ring_name})"
+
+
+JPEG_REDUCE_FLAGS = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2,
+                     4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+
+
+def decode_jpeg(data, reduce=1):
+    """
+    JPEG bytes (or a raw 1xN MJPEG buffer from the camera) -> BGR frame, None if corrupt
+    reduce=2/4/8 decodes straight to 1/2, 1/4 or 1/8 size (much cheaper than decode + resize)
+    """
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = np.frombuffer(data, dtype=np.uint8)
+    return cv2.imdecode(data.reshape(-1), JPEG_REDUCE_FLAGS[reduce])
+
+
+def open_source(spec=0, width=320, height=240, fps=30, loop=False, realtime=False, mjpeg=False):
+    """
+    Build a FrameSource from a spec: camera index (int or digits), 'synthetic[:N]',
+    'shm:<ring name>', an image directory or a video file path. Everything except a
+    camera is resized to width x height. mjpeg=True puts a camera in raw MJPEG mode.
+    """
+    if isinstance(spec, int) or (isinstance(spec, str) and spec.isdigit()):
+        return WebcamSource(int(spec), width, height, fps, mjpeg=mjpeg)
+    if spec == 'synthetic' or spec.startswith('synthetic:'):
+        count = spec.partition(':')[2]
+        return SyntheticSource(width, height, fps, frames=int(count) if count else None,
+                               loop=loop, realtime=realtime)
+    if spec.startswith('shm:'):
+        return SharedRingSource(spec[4:] or DEFAULT_RING, width, height)
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, width, height, fps, loop=loop, realtime=realtime)
+    if not os.path.exists(spec):
+        raise ValueError(f"Unknown frame source '{spec}' (not a camera index, directory or file)")
+    return VideoFileSource(spec, width, height, loop=loop, realtime=realtime)
@@ -0,0 +1,318 @@
+"""
+Inference Pool
+Runs a detector in worker processes so inference uses more than one core
+
+Frames are handed over through multiprocessing.shared_memory slots: the parent
+copies the frame into a free slot once and sends only (seq, slot, shape) to a
+worker, which wraps the slot in a numpy array without copying. Results (small,
+picklable landmarks) come back on the worker's pipe and are delivered to
+on_result() in submission order, so tracking and smoothing see frames in sequence.
+
+Each worker has its own pipe, so the parent knows which frames every worker
+holds. A worker that dies (or sits on one frame longer than task_timeout) is
+replaced: its frames are skipped in the delivery order and their slots freed.
+After max_restarts replacements a lost worker is not replaced any more; once
+none is left the pool is broken and submit() runs the detector in the calling
+thread instead (the serial path), so the app keeps working.
+
+Workers are forked, so create and start the pool before the app builds its own
+detectors or starts threads. A worker is described by an importable
+init(*args) function that returns process(frame, *submit_args) -> picklable result.
+"""
+
+import multiprocessing as mp
+import threading
+import time
+import traceback
+from multiprocessing import connection, shared_memory
+
+import numpy as np
+
+_LOST = object()  # Placeholder in the delivery order for a frame a dead worker took with it
+
+
+def _worker_main(shm_name, slot_bytes, init, init_args, conn):
+    """Worker process: build the detector once, then serve frames from shared memory"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        process = init(*init_args)
+        conn.send(None)                   # Ready: the parent starts timing our frames now
+        while True:
+            task = conn.recv()
+            if task is None:
+                break
+            seq, slot, shape, dtype, args = task
+            frame = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=slot * slot_bytes)
+            start = time.perf_counter()
+            try:
+                result, error = process(frame, *args), None
+            except Exception:
+                result, error = None, traceback.format_exc(limit=3)
+            del frame                     # Drop the view before the slot is reused
+            conn.send((seq, result, time.perf_counter() - start, error))
+    except (KeyboardInterrupt, EOFError, BrokenPipeError):
+        pass                              # Parent gone
+    finally:
+        shm.close()
+
+
+class _Worker:
+    """One worker process, its pipe and the frames it holds"""
+
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.tasks = {}                   # seq -> dispatch time, oldest first
+        self.ready = False                # Detector built (init can take seconds)
+        self.last_progress = 0.0          # Ready or last result (time.monotonic)
+
+    def overdue(self, now, timeout):
+        """Stuck on its current frame for longer than timeout"""
+        if not self.ready or not self.tasks or not timeout:
+            return False
+        started = max(self.last_progress, next(iter(self.tasks.values())))
+        return now - started > timeout
+
+
+class InferencePool:
+    """Process pool with shared-memory frame slots and in-order result delivery"""
+
+    def __init__(self, init, init_args=(), max_frame_shape=(480, 640, 3), workers=2,
+                 slots=None, on_result=None, context='fork', task_timeout=10.0, max_restarts=3):
+        self.init = init                      # Importable: init(*init_args) -> process(frame)
+        self.init_args = tuple(init_args)
+        self.workers = workers
+        self.slots = slots or workers * 2     # Frames in flight (2 per worker keeps them busy)
+        self.slot_bytes = int(np.prod(max_frame_shape))  # uint8 frames up to this size
+        self.on_result = on_result            # Callback(meta, result, latency) in submit order
+        self.task_timeout = task_timeout      # Seconds on one frame before a worker counts as hung
+        self.max_restarts = max_restarts      # Replacement workers before giving up on lost ones
+
+        self._ctx = mp.get_context(context)
+        self._shm = None
+        self._workers = []
+        self._collector = None
+        self._local = None                    # In-process detector once the pool is broken
+
+        self._cond = threading.Condition()
+        self._free = list(range(self.slots))
+        self._slot = {}                       # seq -> shared memory slot, while in flight
+        self._meta = {}                       # seq -> meta passed to submit()
+        self._ready = {}                      # seq -> (result, latency) waiting for earlier seqs
+        self._next_seq = 0                    # Next sequence number to hand out
+        self._next_deliver = 0                # Next sequence number owed to on_result
+        self._running = False
+        self.broken = False                   # No worker left: submit() runs in-process
+
+        self.stats = {'submitted': 0, 'completed': 0, 'errors': 0, 'busy': 0, 'lost': 0, 'restarts': 0}
+
+    # --- Lifecycle ---
+
+    def start(self):
+        if self._running:
+            return
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slot_bytes * self.slots)
+        self._workers = [self._spawn(i) for i in range(self.workers)]
+        self._running = True
+        self._collector = threading.Thread(target=self._collect, name='inference-collect', daemon=True)
+        self._collector.start()
+
+    def _spawn(self, index):
+        parent_conn, child_conn = self._ctx.Pipe()
+        proc = self._ctx.Process(
+            target=_worker_main, name=f'inference-{index}', daemon=True,
+            args=(self._shm.name, self.slot_bytes, self.init, self.init_args, child_conn))
+        proc.start()
+        child_conn.close()                    # The worker's end lives in the worker
+        return _Worker(proc, parent_conn)
+
+    def close(self):
+        """Stop workers and free the shared memory"""
+        if not self._running:
+            return
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._collector.join(timeout=2.0)     # Wakes within its poll interval
+        for worker in self._workers:
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+        for worker in self._workers:
+            worker.process.join(timeout=2.0)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        self._workers = []
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+
+    @property
+    def running(self):
+        return self._running
+
+    @property
+    def in_flight(self):
+        return self.slots - len(self._free)
+
+    # --- Parent side ---
+
+    def wait_for_slot(self, timeout=1.0):
+        """Block until a slot is free (or timeout); returns True if one is"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._free or self.broken or not self._running,
+                                       timeout=timeout) and self._running
+
+    def submit(self, frame, meta=None, args=()):
+        """
+        Copy frame into a free slot and send it to the least busy worker
+        (args: small picklable extras passed on as process(frame, *args))
+        Returns False (frame not taken) if every slot is in flight
+        Broken pool: processes the frame right here and delivers it before returning
+        """
+        if frame.nbytes > self.slot_bytes or frame.dtype != np.uint8:
+            raise ValueError(f"Frame {frame.shape} {frame.dtype} does not fit a "
+                             f"{self.slot_bytes}-byte uint8 slot")
+        with self._cond:
+            if self._running and self.broken:
+                return self._process_locally(frame, meta, args)
+            if not self._running or not self._free:
+                self.stats['busy'] += 1
+                return False
+            slot = self._free.pop()
+            seq = self._next_seq
+            self._next_seq += 1
+            self._meta[seq] = meta
+            self._slot[seq] = slot
+
+        # The only copy: into shared memory (no pickling of pixels)
+        view = np.ndarray(frame.shape, dtype=np.uint8, buffer=self._shm.buf,
+                          offset=slot * self.slot_bytes)
+        view[...] = frame
+        del view
+
+        with self._cond:
+            if not self._workers:             # The pool broke while we copied
+                self._free.append(self._slot.pop(seq))
+                self._ready[seq] = _LOST
+                return True
+            worker = min(self._workers, key=lambda w: len(w.tasks))
+            worker.tasks[seq] = time.monotonic()
+            try:
+                worker.conn.send((seq, slot, frame.shape, frame.dtype.str, tuple(args)))
+            except OSError:
+                pass                          # Dead already: the collector skips seq with its other frames
+        self.stats['submitted'] += 1
+        return True
+
+    def _process_locally(self, frame, meta, args):
+        """Serial fallback (caller holds the lock, so frames stay in order)"""
+        if self._local is None:
+            print("⚠️ Inference pool has no workers left, running inference in-process")
+            self._local = self.init(*self.init_args)
+        start = time.perf_counter()
+        try:
+            result = self._local(frame, *args)
+        except Exception:
+            print(f"Inference error: {traceback.format_exc(limit=3)}")
+            self.stats['errors'] += 1
+            return True
+        self._deliver_one(meta, result, time.perf_counter() - start)
+        return True
+
+    # --- Collector thread ---
+
+    def _collect(self):
+        """Gather worker results, replace dead workers and deliver in submit order"""
+        while self._running:
+            workers = list(self._workers)
+            waitables = [w.conn for w in workers] + [w.process.sentinel for w in workers]
+            readable = connection.wait(waitables, timeout=0.25) if waitables else []
+
+            failed = []
+            for worker in workers:
+                if worker.conn in readable and not self._receive(worker):
+                    failed.append(worker)
+            now = time.monotonic()
+            for worker in workers:
+                if worker not in failed and (not worker.process.is_alive() or
+                                             worker.overdue(now, self.task_timeout)):
+                    failed.append(worker)
+            for worker in failed:
+                self._replace(worker)
+            self._deliver()
+
+    def _receive(self, worker):
+        """Read everything the worker has sent; False once its pipe is closed (worker gone)"""
+        try:
+            while worker.conn.poll():
+                message = worker.conn.recv()
+                worker.last_progress = time.monotonic()
+                if message is None:
+                    worker.ready = True
+                    continue
+                seq, result, latency, error = message
+                if error is not None:
+                    print(f"Inference worker error: {error}")
+                    self.stats['errors'] += 1
+                with self._cond:
+                    worker.tasks.pop(seq, None)
+                    self._free.append(self._slot.pop(seq))
+                    self._ready[seq] = (result, latency)
+                    self._cond.notify_all()
+        except (EOFError, OSError):
+            return False
+        return True
+
+    def _replace(self, worker):
+        """Skip the frames a dead or hung worker held, then start another one (or give up on it)"""
+        with self._cond:
+            if not self._running or worker not in self._workers:
+                return
+            if worker.process.is_alive():
+                worker.process.terminate()    # Hung
+            for seq in worker.tasks:
+                self._free.append(self._slot.pop(seq))
+                self._ready[seq] = _LOST
+            self.stats['lost'] += len(worker.tasks)
+            index = self._workers.index(worker)
+            if self.stats['restarts'] < self.max_restarts:
+                self.stats['restarts'] += 1
+                self._workers[index] = self._spawn(index)
+                action = "restarted"
+            else:
+                del self._workers[index]
+                action = f"not replaced ({len(self._workers)} left)"
+                if not self._workers:
+                    self.broken = True
+            self._cond.notify_all()
+        worker.process.join(timeout=1.0)      # For its exit code
+        print(f"⚠️ Inference worker {worker.process.name} stopped "
+              f"(exit code {worker.process.exitcode}), {len(worker.tasks)} frame(s) skipped, {action}")
+
+    def _deliver(self):
+        """Deliver everything that is now contiguous"""
+        while True:
+            with self._cond:
+                if self._next_deliver not in self._ready:
+                    break
+                seq = self._next_deliver
+                ready = self._ready.pop(seq)
+                meta = self._meta.pop(seq)
+                self._next_deliver += 1
+            if ready is not _LOST:
+                self._deliver_one(meta, *ready)
+
+    def _deliver_one(self, meta, result, latency):
+        self.stats['completed'] += 1
+        if self.on_result is not None:
+            try:
+                self.on_result(meta, result, latency)
+            except Exception as e:
+                print(f"Inference result handler error: {e}")
+
+    def status(self):
+        """Pool counters for /status"""
+        return dict(self.stats, workers=len(self._workers), slots=self.slots, in_flight=self.in_flight,
+                    broken=self.broken)
@@ -0,0 +1,128 @@
+"""
+Pose Landmarks
+One landmark array per frame, shared by the follower and the Movement apps
+
+to_array() turns results.pose_landmarks into a contiguous (33, 4) float32 array
+[x, y, z, visibility], once per frame. Everything else is NumPy on that array and
+takes a single frame (33, 4) or a whole recorded session (frames, 33, 4) alike:
+
+    follow_inputs()  - nose position + shoulder width for the follower
+    joint_angles()   - any (a, pivot, b) triplets, e.g. both biceps
+    head_angles()    - nose vs. shoulder-centre head angle
+    pose_angles()    - left/right bicep + head angle of one frame for the Movement apps
+
+The formulas are those of the old per-app calculate_angle() / calculate_head_angle()
+/ analyze_pose(); benchmark_landmarks.py checks them against that code and times both.
+"""
+
+import itertools
+import operator
+
+import numpy as np
+
+NUM_POSE_LANDMARKS = 33
+
+# Landmark indices (MediaPipe Pose / Holistic)
+NOSE = 0
+LEFT_SHOULDER = 11
+RIGHT_SHOULDER = 12
+LEFT_ELBOW = 13
+RIGHT_ELBOW = 14
+LEFT_WRIST = 15
+RIGHT_WRIST = 16
+
+# Columns
+X, Y, Z, VISIBILITY = 0, 1, 2, 3
+
+# (shoulder, elbow, wrist) per arm
+BICEP_JOINTS = np.array([[LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST],
+                         [RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST]])
+
+# Rows follow_inputs() reads: nose, left shoulder, right shoulder
+FOLLOW_POINTS = np.array([NOSE, LEFT_SHOULDER, RIGHT_SHOULDER])
+
+# Face mesh eye corners used for head tilt when Holistic found a face
+FACE_LEFT_EYE = 33
+FACE_RIGHT_EYE = 263
+
+_fields = operator.attrgetter('x', 'y', 'z', 'visibility')
+
+
+def to_array(pose_landmarks):
+    """
+    (N, 4) float32 array [x, y, z, visibility] from a NormalizedLandmarkList
+    Returns None when there is no detection
+    """
+    if not pose_landmarks:
+        return None
+    landmarks = pose_landmarks.landmark
+    # One C-level getter per landmark, floats streamed straight into the array
+    values = np.fromiter(itertools.chain.from_iterable(map(_fields, landmarks)),
+                         dtype=np.float32, count=4 * len(landmarks))
+    return values.reshape(-1, 4)
+
+
+def follow_inputs(landmarks, min_nose_visibility=0.5, min_shoulder_visibility=0.5,
+                  default_shoulder_width=0.3):
+    """
+    Inputs of the follower's position/depth decision
+    landmarks: (33, 4) or (frames, 33, 4) -> (3,) or (frames, 3) [nose_x, nose_y, shoulder_width]
+    NaN rows where the nose is not visible; shoulder width falls back to
+    default_shoulder_width when a shoulder is hidden
+    """
+    points = landmarks[..., FOLLOW_POINTS, :]
+    shoulders_visible = (points[..., 1:, VISIBILITY] > min_shoulder_visibility).all(axis=-1)
+    width = np.where(shoulders_visible, np.abs(points[..., 2, X] - points[..., 1, X]), default_shoulder_width)
+    inputs = np.concatenate([points[..., 0, :2], width[..., None]], axis=-1)
+    return np.where((points[..., 0, VISIBILITY] >= min_nose_visibility)[..., None], inputs, np.nan)
+
+
+def joint_angles(landmarks, joints=BICEP_JOINTS, min_visibility=0.3):
+    """
+    Angle at the pivot of every (a, pivot, b) row of joints
+    landmarks: (33, 4) or (frames, 33, 4) -> (joints,) or (frames, joints)
+
+    Mapping (as the old calculate_angle()):
+    - 0 degrees = straight arm (fully extended)
+    - 180 degrees = bent arm (L-shape, like bicep curl)
+    NaN where any of the three points is not visible
+    """
+    points = landmarks[..., joints, :]                      # (..., joints, 3, 4)
+    vectors = points[..., ::2, :2] - points[..., 1:2, :2]   # pivot -> a, pivot -> b
+    lengths = np.hypot(vectors[..., X], vectors[..., Y])
+    dot = vectors[..., 0, X] * vectors[..., 1, X] + vectors[..., 0, Y] * vectors[..., 1, Y]
+    cos_angle = np.clip(dot / (lengths[..., 0] * lengths[..., 1] + 1e-6), -1, 1)
+    # Invert: straight (180 degrees) becomes 0, bent (0) becomes 180
+    angles = 180 - np.degrees(np.arccos(cos_angle))
+    return np.where((points[..., VISIBILITY] > min_visibility).all(axis=-1), angles, np.nan)
+
+
+def head_angles(landmarks, min_visibility=0.3):
+    """
+    Head angle from the nose vs. the shoulder centre (fallback of the old calculate_head_angle())
+    landmarks: (33, 4) or (frames, 33, 4) -> () or (frames,); NaN where the nose is not visible
+    """
+    centre = (landmarks[..., LEFT_SHOULDER, :2] + landmarks[..., RIGHT_SHOULDER, :2]) / 2
+    offset = landmarks[..., NOSE, :2] - centre
+    angles = np.abs(np.degrees(np.arctan2(offset[..., Y], offset[..., X])))
+    return np.where(landmarks[..., NOSE, VISIBILITY] > min_visibility, angles, np.nan)
+
+
+def pose_angles(landmarks, face_landmarks=None, min_visibility=0.3):
+    """
+    Left bicep, right bicep and head angle of one frame for the Movement apps
+    landmarks: (33, 4) array of to_array(); face_landmarks: Holistic face mesh or None
+    (with a face mesh the head angle comes from the eye corners, as before)
+    Returns: (left, right, head), each None when its landmarks are not visible
+    """
+    left, right = (None if np.isnan(angle) else angle
+                   for angle in joint_angles(landmarks, BICEP_JOINTS, min_visibility).tolist())
+
+    head = None
+    if landmarks[NOSE, VISIBILITY] > min_visibility:
+        if face_landmarks is not None and len(face_landmarks.landmark) > FACE_RIGHT_EYE:
+            eye_distance = abs(face_landmarks.landmark[FACE_LEFT_EYE].y - face_landmarks.landmark[FACE_RIGHT_EYE].y)
+            head = min(eye_distance * 180, 180.0)
+        else:
+            head = float(head_angles(landmarks, min_visibility))
+    return left, right, head
@@ -0,0 +1,177 @@
+"""
+Stage Metrics
+Per-stage latency windows and rolling FPS for every NAVIS app
+
+The old current_state['fps'] was frame_count / uptime, a lifetime average that
+hides any slowdown after the first minute. Here every stage (capture, flip,
+convert, inference, analysis, drawing, encoding, mqtt) records its duration into:
+
+    - a rolling window (last `window` seconds) -> p50 / p95 / p99 for /status
+    - cumulative histogram buckets             -> Prometheus text at /metrics
+
+Loops call tick() once per iteration to get a rolling rate (FPS) instead of a lifetime one.
+Pure Python on purpose: Remote_Control has no numpy.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Prometheus text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; covers ~1 ms encodes up to 1 s hiccups on a hot Pi
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(q * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+class _Stage:
+    """Samples of one stage: rolling window + lifetime histogram"""
+
+    def __init__(self, buckets, max_samples):
+        self.samples = deque(maxlen=max_samples)  # (timestamp, seconds)
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+
+
+class StageMetrics:
+    """Thread-safe registry of stage timings and loop rates for one app"""
+
+    def __init__(self, app_name, window=30.0, fps_window=5.0, max_samples=2048,
+                 buckets=DEFAULT_BUCKETS):
+        self.app_name = app_name
+        self.window = window                  # Seconds of samples behind the quantiles
+        self.fps_window = fps_window          # Seconds of ticks behind the rolling FPS
+        self.max_samples = max_samples        # Cap per stage so memory stays bounded
+        self.buckets = tuple(buckets)
+
+        self._lock = threading.Lock()
+        self._stages = {}                     # stage -> _Stage (insertion order = pipeline order)
+        self._ticks = {}                      # loop -> deque of timestamps
+
+    # --- Recording ---
+
+    def observe(self, stage, seconds, timestamp=None):
+        """Record one duration (seconds) for stage"""
+        now = time.time() if timestamp is None else timestamp
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                entry = self._stages[stage] = _Stage(self.buckets, self.max_samples)
+            entry.samples.append((now, seconds))
+            entry.count += 1
+            entry.total += seconds
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    entry.bucket_counts[i] += 1
+                    break
+
+    @contextmanager
+    def time(self, stage):
+        """with metrics.time('inference'): ..."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def tick(self, loop, timestamp=None):
+        """Count one iteration of loop (for rolling FPS)"""
+        now = time.time() if timestamp is None else timestamp
+        with self._lock:
+            ticks = self._ticks.get(loop)
+            if ticks is None:
+                ticks = self._ticks[loop] = deque(maxlen=self.max_samples)
+            ticks.append(now)
+
+    # --- Reading ---
+
+    def fps(self, loop):
+        """Iterations per second over the last fps_window seconds (decays to 0 when stalled)"""
+        now = time.time()
+        with self._lock:
+            ticks = self._ticks.get(loop)
+            if not ticks:
+                return 0.0
+            while ticks and ticks[0] < now - self.fps_window:
+                ticks.popleft()
+            if len(ticks) < 2:
+                return 0.0
+            return (len(ticks) - 1) / max(now - ticks[0], 1e-6)
+
+    def rates(self):
+        """Rolling FPS of every loop, rounded for /status"""
+        return {loop: round(self.fps(loop), 1) for loop in list(self._ticks)}
+
+    def _window_values(self, entry, now):
+        while entry.samples and entry.samples[0][0] < now - self.window:
+            entry.samples.popleft()
+        return sorted(seconds for _, seconds in entry.samples)
+
+    def summary(self):
+        """{stage: {p50_ms, p95_ms, p99_ms, count}} over the rolling window, for /status"""
+        now = time.time()
+        result = {}
+        with self._lock:
+            for stage, entry in self._stages.items():
+                values = self._window_values(entry, now)
+                result[stage] = {f"p{int(q * 100)}_ms": round(_percentile(values, q) * 1000, 2)
+                                 for q in QUANTILES}
+                result[stage]['count'] = len(values)
+        return result
+
+    def prometheus(self, gauges=None):
+        """
+        Prometheus text exposition of all stages and loops
+        gauges: optional {name: value} of app-specific values (e.g. viewers, frame_skip)
+        """
+        now = time.time()
+        app = self.app_name
+        lines = [
+            '# HELP navis_stage_seconds Time spent per pipeline stage',
+            '# TYPE navis_stage_seconds histogram'
+        ]
+        window_lines = [
+            f'# HELP navis_stage_window_seconds Per-stage quantiles over the last {self.window:g}s',
+            '# TYPE navis_stage_window_seconds gauge'
+        ]
+        with self._lock:
+            for stage, entry in self._stages.items():
+                labels = f'app="{app}",stage="{stage}"'
+                cumulative = 0
+                for bound, count in zip(self.buckets, entry.bucket_counts):
+                    cumulative += count
+                    lines.append(f'navis_stage_seconds_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+                lines.append(f'navis_stage_seconds_bucket{{{labels},le="+Inf"}} {entry.count}')
+                lines.append(f'navis_stage_seconds_sum{{{labels}}} {entry.total:.6f}')
+                lines.append(f'navis_stage_seconds_count{{{labels}}} {entry.count}')
+
+                values = self._window_values(entry, now)
+                for q in QUANTILES:
+                    window_lines.append(f'navis_stage_window_seconds{{{labels},quantile="{q:g}"}} '
+                                        f'{_percentile(values, q):.6f}')
+        lines.extend(window_lines)
+
+        lines.append('# HELP navis_fps Loop iterations per second (rolling)')
+        lines.append('# TYPE navis_fps gauge')
+        for loop, rate in self.rates().items():
+            lines.append(f'navis_fps{{app="{app}",loop="{loop}"}} {rate}')
+
+        for name, value in (gauges or {}).items():
+            if isinstance(value, bool):
+                value = int(value)
+            lines.append(f'# TYPE navis_{name} gauge')
+            lines.append(f'navis_{name}{{app="{app}"}} {value}')
+
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,226 @@
+"""
+MQTT Command Publisher
+One background thread owns all robot commands, instead of client.publish() inline
+in the frame loop / request handler
+
+    - Coalescing:   a single pending slot; a newer command replaces one not yet sent
+    - Rate limit:   at least min_interval seconds between two publishes
+    - Hysteresis:   a new command must be requested for hold_time seconds before it
+                    replaces the current one (stop commands skip this and the rate limit)
+    - Repeat:       submit(..., repeat=True) sends a command again even if it is the
+                    current one (a human pressing the same button twice), still
+                    coalesced and rate limited
+    - Forced:       submit(..., force=True) skips all of the above and goes out ahead of
+                    the pending command, in order (a manual STOP); a short queue, with
+                    repeats collapsed
+    - Metrics:      publish/ack latency, coalesced/suppressed/dropped counts, disconnects
+"""
+
+import json
+import threading
+import time
+from collections import deque
+
+import paho.mqtt.client as mqtt
+
+STOP_COMMANDS = ('S',)
+MAX_FORCED = 8  # Forced commands waiting at most; older ones are dropped
+
+
+class CommandPublisher:
+    """Coalescing, rate-limited {"cmd", "speed"} publisher for one MQTT topic"""
+
+    def __init__(self, client, topic, qos=0, min_interval=0.1, hold_time=0.0,
+                 urgent=STOP_COMMANDS, on_sent=None, metrics=None):
+        self.client = client
+        self.topic = topic
+        self.qos = qos                        # 0 = fire and forget, 1/2 = broker acknowledged
+        self.min_interval = min_interval      # Seconds between two publishes
+        self.hold_time = hold_time            # Seconds a new command must persist (hysteresis)
+        self.urgent = tuple(urgent)           # Commands sent immediately (safety stop)
+        self.on_sent = on_sent                # Callback(cmd, speed) after a successful publish
+        self.metrics = metrics                # Optional StageMetrics ('mqtt' stage)
+
+        self._cond = threading.Condition(threading.RLock())  # Re-entrant: paho may call back inside publish()
+        self._pending = None                  # (cmd, speed, submitted_at, urgent) waiting to be sent
+        self._forced = deque(maxlen=MAX_FORCED)  # Forced commands, sent in order before _pending
+        self._desired = None                  # Last (cmd, speed) accepted for sending
+        self._candidate = None                # (cmd, speed, since) still inside hold_time
+        self._last_publish = 0.0
+        self._inflight = {}                   # mid -> submitted_at (QoS > 0 acks)
+        self._thread = None
+        self._running = False
+
+        self.connected = False
+        self.last_sent = None
+        self.stats = {
+            'submitted': 0, 'published': 0, 'acked': 0,
+            'coalesced': 0, 'suppressed': 0, 'dropped': 0,
+            'disconnects': 0
+        }
+        self._latency_ms = None               # Submit -> publish (QoS 0) or -> broker ack (QoS > 0)
+        self._latency_max_ms = 0.0
+
+        client.on_connect = self._on_connect
+        client.on_disconnect = self._on_disconnect
+        client.on_publish = self._on_publish
+
+    # --- MQTT callbacks (paho network thread) ---
+
+    def _on_connect(self, client, userdata, flags, reason_code, properties=None):
+        self.connected = not reason_code.is_failure if hasattr(reason_code, 'is_failure') \
+            else reason_code == 0
+
+    def _on_disconnect(self, client, userdata, flags, reason_code, properties=None):
+        with self._cond:
+            if self.connected:
+                self.stats['disconnects'] += 1
+            self.connected = False
+            # Messages in flight will never be acked on this session
+            self._inflight.clear()
+
+    def _on_publish(self, client, userdata, mid, reason_code=None, properties=None):
+        with self._cond:
+            submitted_at = self._inflight.pop(mid, None)
+            if submitted_at is None:
+                return
+            self.stats['acked'] += 1
+            self._record_latency(time.time() - submitted_at)
+
+    def _record_latency(self, seconds):
+        ms = seconds * 1000
+        self._latency_ms = ms if self._latency_ms is None else self._latency_ms + 0.2 * (ms - self._latency_ms)
+        self._latency_max_ms = max(self._latency_max_ms, ms)
+        if self.metrics is not None:
+            self.metrics.observe('mqtt', seconds)
+
+    # --- Producer side ---
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._running = True
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+
+    def submit(self, cmd, speed, force=False, repeat=False):
+        """
+        Ask for cmd at speed; safe to call on every frame
+        repeat=True: queue it even if it is the current command (still coalesced/rate limited)
+        force=True: send this exact command now, ahead of the pending one
+        (no dedup, hysteresis, rate limit or coalescing)
+        Returns True if the command was queued (or is already the current one)
+        """
+        now = time.time()
+        command = (cmd, int(speed))
+        with self._cond:
+            self.stats['submitted'] += 1
+
+            if force:
+                # Supersedes whatever the automatic path had waiting
+                if self._pending is not None:
+                    self.stats['coalesced'] += 1
+                    self._pending = None
+                self._candidate = None
+                self._desired = command
+                if self._forced and self._forced[-1][:2] == command:
+                    self.stats['coalesced'] += 1  # Same as the last one still waiting
+                else:
+                    if len(self._forced) == MAX_FORCED:
+                        self.stats['coalesced'] += 1  # The oldest falls out
+                    self._forced.append((cmd, command[1], now, True))
+                self._cond.notify_all()
+                return True
+
+            if command == self._desired and not repeat:
+                # Flapped back before the new command settled
+                if self._candidate is not None:
+                    self.stats['suppressed'] += 1
+                    self._candidate = None
+                return True
+
+            urgent = cmd in self.urgent
+            if not urgent and self.hold_time > 0:
+                if self._candidate is None or self._candidate[:2] != command:
+                    if self._candidate is not None:
+                        self.stats['suppressed'] += 1
+                    self._candidate = (cmd, command[1], now)
+                    return False
+                if now - self._candidate[2] < self.hold_time:
+                    return False
+
+            self._candidate = None
+            self._desired = command
+            if self._pending is not None:
+                self.stats['coalesced'] += 1
+            self._pending = (cmd, command[1], now, urgent)
+            self._cond.notify_all()
+            return True
+
+    # --- Worker ---
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or self._forced or not self._running)
+                if not self._running:
+                    return
+                if self._forced:
+                    cmd, speed, submitted_at, _ = self._forced.popleft()
+                else:
+                    # Rate limit (urgent commands go out right away)
+                    wait = self._last_publish + self.min_interval - time.time()
+                    if wait > 0 and not self._pending[3]:
+                        self._cond.wait(timeout=wait)
+                        continue
+                    cmd, speed, submitted_at, _ = self._pending
+                    self._pending = None
+
+            self._publish(cmd, speed, submitted_at)
+
+    def _publish(self, cmd, speed, submitted_at):
+        payload = json.dumps({"cmd": cmd, "speed": speed})
+        # Hold the lock across publish() so a fast ack cannot arrive before its mid is recorded
+        with self._cond:
+            try:
+                info = self.client.publish(self.topic, payload, qos=self.qos)
+            except Exception as e:
+                print(f"MQTT Error: {e}")
+                info = None
+
+            self._last_publish = time.time()
+            if info is None or info.rc != mqtt.MQTT_ERR_SUCCESS:
+                # Not connected or queue full: the robot never sees this command
+                self.stats['dropped'] += 1
+                if self._desired == (cmd, speed):
+                    self._desired = None      # Let the next submit retry it
+                return
+            self.stats['published'] += 1
+            self.last_sent = cmd
+            if self.qos > 0:
+                self._inflight[info.mid] = submitted_at
+            else:
+                self._record_latency(self._last_publish - submitted_at)
+
+        if self.on_sent is not None:
+            self.on_sent(cmd, speed)
+
+    def status(self):
+        """Delivery metrics for /status"""
+        with self._cond:
+            status = dict(self.stats)
+            status['connected'] = self.connected
+            status['qos'] = self.qos
+            status['last_sent'] = self.last_sent
+            status['pending'] = self._forced[0][0] if self._forced \
+                else self._pending[0] if self._pending is not None else None
+            status['in_flight'] = len(self._inflight)
+            status['latency_ms'] = round(self._latency_ms, 1) if self._latency_ms is not None else 0
+            status['latency_max_ms'] = round(self._latency_max_ms, 1)
+        return status
@@ -0,0 +1,119 @@
+"""
+Adaptive Frame-Skip Scheduler
+Replaces the fixed FRAME_SKIP constant with a cadence picked from live measurements
+
+Every update it looks at:
+    - recent inference latency  -> caps the inference rate to stay inside the CPU budget
+    - frame-to-frame motion     -> runs inference more often while the subject moves
+    - measured camera FPS       -> converts the wanted inference rate into a frame skip
+
+On a hot Pi inference gets slower, the CPU cap kicks in and the skip grows, so the
+app degrades gracefully instead of falling behind the camera.
+"""
+
+import time
+import cv2
+import numpy as np
+
+
+class AdaptiveScheduler:
+    """Decides which camera frames get inference"""
+
+    def __init__(self, target_rate=10.0, cpu_budget=0.6, camera_fps=30.0,
+                 min_skip=1, max_skip=6, motion_reference=4.0, smoothing=0.2):
+        self.target_rate = target_rate        # Wanted inference (control) updates per second
+        self.cpu_budget = cpu_budget          # Max fraction of one core spent in inference
+        self.min_skip = min_skip
+        self.max_skip = max_skip
+        self.motion_reference = motion_reference  # Mean pixel change/frame treated as "normal" motion
+        self.smoothing = smoothing            # EMA weight for new measurements
+
+        self.camera_fps = camera_fps          # Updated from real frame timestamps
+        self.latency = None                   # Seconds per inference (EMA)
+        self.motion = None                    # Mean abs pixel change per frame (EMA)
+        self.skip = min_skip
+        self.reason = 'startup'
+
+        self._frames_since_inference = 0
+        self._last_frame_time = None
+        self._last_thumb = None
+
+    def _ema(self, old, new):
+        return new if old is None else old + self.smoothing * (new - old)
+
+    # --- Inputs ---
+
+    def frame_captured(self, timestamp=None):
+        """Call once per camera frame; tracks the real camera rate"""
+        now = time.time() if timestamp is None else timestamp
+        if self._last_frame_time is not None:
+            interval = now - self._last_frame_time
+            if interval > 0:
+                self.camera_fps = self._ema(self.camera_fps, 1.0 / interval)
+        self._last_frame_time = now
+        self._frames_since_inference += 1
+
+    def should_process(self, timestamp=None):
+        """Counter-style helper for single-threaded loops: records the frame, returns True when due"""
+        self.frame_captured(timestamp)
+        return self._frames_since_inference >= self.skip
+
+    def inference_done(self, latency, frame=None):
+        """Record one inference (latency in seconds) and pick the next cadence"""
+        self.latency = self._ema(self.latency, latency)
+        if frame is not None:
+            self._update_motion(frame, max(self._frames_since_inference, 1))
+        self._frames_since_inference = 0
+        self._update_skip()
+
+    def _update_motion(self, frame, frames_elapsed):
+        """Cheap motion estimate: mean abs difference of tiny grayscale thumbnails"""
+        small = cv2.resize(frame, (40, 30), interpolation=cv2.INTER_AREA)
+        thumb = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        if self._last_thumb is not None:
+            diff = float(np.mean(cv2.absdiff(thumb, self._last_thumb))) / frames_elapsed
+            self.motion = self._ema(self.motion, diff)
+        self._last_thumb = thumb
+
+    # --- Decision ---
+
+    def _update_skip(self):
+        # Motion scales the wanted rate between 0.5x (static scene) and 2x (fast movement)
+        motion_factor = 1.0
+        if self.motion is not None and self.motion_reference > 0:
+            motion_factor = float(np.clip(self.motion / self.motion_reference, 0.5, 2.0))
+        wanted_rate = self.target_rate * motion_factor
+
+        # CPU budget: latency * rate must stay below cpu_budget
+        cpu_rate = self.cpu_budget / self.latency if self.latency else wanted_rate
+        rate = min(wanted_rate, cpu_rate, self.camera_fps)
+        if rate == cpu_rate and cpu_rate < wanted_rate:
+            self.reason = 'cpu_budget'
+        elif motion_factor > 1.0:
+            self.reason = 'motion'
+        elif motion_factor < 1.0:
+            self.reason = 'static'
+        else:
+            self.reason = 'target_rate'
+
+        ideal = int(np.clip(round(self.camera_fps / max(rate, 1e-3)), self.min_skip, self.max_skip))
+
+        # Move one step at a time so the cadence does not oscillate
+        if ideal > self.skip:
+            self.skip += 1
+        elif ideal < self.skip:
+            self.skip -= 1
+
+    def status(self):
+        """Scheduler decisions for /status"""
+        latency_ms = self.latency * 1000 if self.latency is not None else 0
+        inference_rate = self.camera_fps / self.skip if self.skip else 0
+        return {
+            'frame_skip': self.skip,
+            'reason': self.reason,
+            'camera_fps': round(self.camera_fps, 1),
+            'inference_rate': round(inference_rate, 1),
+            'inference_ms': round(latency_ms, 1),
+            'cpu_load': round(latency_ms / 1000 * inference_rate, 2),
+            'motion': round(self.motion, 2) if self.motion is not None else 0
+        }
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Session Recorder
+Always-on flight recorder: one fixed-size binary record per control step
+(timestamp, landmark array, position/depth/angles, MQTT command), so a field run
+can be replayed and inspected afterwards.
+
+Files (one session = one app run, split into chunks):
+
+    <directory>/<app>-<YYYYmmdd-HHMMSS>-<chunk:04d>.navrec
+
+    header   4096 bytes: HEADER_DTYPE (magic, sizes, capacity, record count) + JSON
+             metadata (app, session, record dtype) - page-sized so records stay aligned
+    records  capacity x RECORD_DTYPE, preallocated when the chunk is created
+
+The writer maps the chunk and appends in place; the record count in the header is
+bumped after each record, so a reader (or a crash) only ever sees whole records.
+A background thread msyncs every flush_interval seconds. Full chunks rotate to a
+new file, and the oldest chunks in the directory are deleted whenever the total
+goes over max_bytes.
+
+Reading: open_session() maps every chunk with np.memmap, so a multi-hour session
+opens instantly and only the pages you touch are read from disk.
+
+    python navis_common/session_recorder.py Base/Human_Detection_Following/sessions
+    python navis_common/session_recorder.py <dir> --session follower-20261017-141500
+"""
+
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+MAGIC = b'NAVISREC'
+VERSION = 1
+HEADER_SIZE = 4096
+EXTENSION = '.navrec'
+SPARE_AT = 0.75                           # Prepare the next chunk once the current one is this full
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('version', '<u4'),
+    ('header_size', '<u4'),
+    ('record_size', '<u4'),
+    ('meta_size', '<u4'),                 # Bytes of JSON metadata right after this struct
+    ('capacity', '<u8'),
+    ('count', '<u8'),                     # Whole records written so far (published last)
+    ('created', '<f8')
+])
+
+# Record kinds
+INFERENCE = 1                             # A detection ran on this frame
+ESTIMATE = 2                              # Control step on a tracker prediction only
+
+POSITIONS = ('left', 'center', 'right')   # Stored as index, -1 = none
+DEPTHS = ('near', 'medium', 'far')
+
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<f8'),                 # time.time() of the frame / control step
+    ('kind', 'u1'),                       # INFERENCE or ESTIMATE
+    ('detected', 'u1'),                   # 1 = person in view
+    ('position', 'i1'),                   # Index into POSITIONS
+    ('depth', 'i1'),                      # Index into DEPTHS
+    ('command', 'S1'),                    # Command decided on this step (b'' = none)
+    ('sent', 'S1'),                       # Last command the MQTT publisher actually sent
+    ('depth_percent', '<f4'),
+    ('nose_x', '<f4'),
+    ('angles', '<f4', (3,)),              # Left bicep, right bicep, head (NaN = not visible)
+    ('landmarks', '<f4', (33, 4)),        # Pose landmark array (NaN = no detection / no inference)
+])
+
+NO_LANDMARKS = np.full((33, 4), np.nan, dtype=np.float32)
+NO_ANGLES = np.full(3, np.nan, dtype=np.float32)
+
+
+def _command_byte(command):
+    return command.encode('ascii')[:1] if command else b''
+
+
+class _Chunk:
+    """One preallocated, memory-mapped chunk file"""
+
+    def __init__(self, path, header, records, meta):
+        self.path = path
+        self.header = header                  # np.memmap of HEADER_DTYPE, shape (1,)
+        self.records = records                # np.memmap of the record dtype, shape (capacity,)
+        self.meta = meta
+        self.count = int(header['count'][0])
+        self.capacity = int(header['capacity'][0])
+
+    @classmethod
+    def create(cls, path, capacity, meta, dtype=RECORD_DTYPE):
+        meta = dict(meta, dtype=dtype.descr)
+        meta_bytes = json.dumps(meta).encode()
+        if HEADER_DTYPE.itemsize + len(meta_bytes) > HEADER_SIZE:
+            raise ValueError("Session metadata does not fit in the chunk header")
+
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header[0] = (MAGIC, VERSION, HEADER_SIZE, dtype.itemsize, len(meta_bytes),
+                     capacity, 0, time.time())
+        size = HEADER_SIZE + capacity * dtype.itemsize
+        with open(path, 'wb') as f:
+            f.write(header.tobytes() + meta_bytes)
+            # Reserve the blocks now so appends never hit a full disk mid-chunk
+            try:
+                os.posix_fallocate(f.fileno(), 0, size)
+            except (AttributeError, OSError):
+                f.truncate(size)
+
+        return cls(path,
+                   np.memmap(path, dtype=HEADER_DTYPE, mode='r+', shape=(1,)),
+                   np.memmap(path, dtype=dtype, mode='r+', offset=HEADER_SIZE, shape=(capacity,)),
+                   meta)
+
+    @classmethod
+    def open(cls, path):
+        """Read-only view of the records written so far"""
+        header = np.memmap(path, dtype=HEADER_DTYPE, mode='r', shape=(1,))
+        if header['magic'][0] != MAGIC or header['version'][0] != VERSION:
+            raise ValueError(f"{path} is not a NAVIS session chunk")
+        start = HEADER_DTYPE.itemsize
+        with open(path, 'rb') as f:
+            f.seek(start)
+            meta = json.loads(f.read(int(header['meta_size'][0])))
+        dtype = np.dtype([tuple(tuple(v) if isinstance(v, list) else v for v in field)
+                          for field in meta['dtype']])
+        count = int(header['count'][0])
+        if count:
+            records = np.memmap(path, dtype=dtype, mode='r',
+                                offset=int(header['header_size'][0]), shape=(count,))
+        else:
+            records = np.zeros(0, dtype=dtype)
+        return cls(path, header, records, meta)
+
+    def flush(self):
+        self.records.flush()
+        self.header.flush()
+
+
+class SessionRecorder:
+    """Appends fixed-size records for one app session (thread-safe)"""
+
+    def __init__(self, directory, app_name, chunk_records=18000, max_bytes=1 << 30,
+                 flush_interval=2.0):
+        self.directory = directory
+        self.app_name = app_name
+        self.chunk_records = chunk_records    # Records per chunk (18000 = 10 min at 30 steps/s)
+        self.max_bytes = max_bytes            # Disk budget for every chunk in directory
+        self.flush_interval = flush_interval  # Seconds between msyncs
+        self.session = f"{app_name}-{time.strftime('%Y%m%d-%H%M%S')}"
+
+        self._lock = threading.Lock()
+        self._chunk = None
+        self._spare = None                    # Next chunk, created ahead by the flush thread
+        self._retired = []                    # Full chunks waiting for their last flush
+        self._chunk_index = 0
+        self._closed = False
+        self._wake = threading.Event()
+        self._flusher = None
+        self.stats = {'records': 0, 'chunks': 0, 'deleted_chunks': 0, 'errors': 0}
+
+    # --- Lifecycle ---
+
+    def start(self):
+        """Create the first chunk and start the flush thread"""
+        os.makedirs(self.directory, exist_ok=True)
+        self._chunk = self._new_chunk()
+        self._enforce_budget()
+        self._flusher = threading.Thread(target=self._flush_loop, name='recorder-flush', daemon=True)
+        self._flusher.start()
+        return self
+
+    def close(self):
+        """Flush and stop; the session stays readable as it is"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            chunk, self._chunk = self._chunk, None
+        self._wake.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=2.0)
+        for old in self._retired + [chunk]:
+            if old is not None:
+                old.flush()
+        self._retired = []
+        if self._spare is not None:
+            # Prepared but never used: not part of the session
+            os.remove(self._spare.path)
+            self._spare = None
+
+    # --- Writing ---
+
+    def append(self, timestamp, kind=INFERENCE, landmarks=None, detected=False, position=None,
+               depth=None, depth_percent=None, nose_x=None, angles=None, command=None, sent=None):
+        """Store one control step; never raises (a recorder problem must not stop the robot)"""
+        with self._lock:
+            if self._closed or self._chunk is None:
+                return
+            try:
+                if self._chunk.count >= self._chunk.capacity:
+                    self._rotate()
+                chunk = self._chunk
+                # One structured assignment (field by field costs ~5x more)
+                chunk.records[chunk.count] = (
+                    timestamp, kind, detected,
+                    POSITIONS.index(position) if position in POSITIONS else -1,
+                    DEPTHS.index(depth) if depth in DEPTHS else -1,
+                    _command_byte(command), _command_byte(sent),
+                    np.nan if depth_percent is None else depth_percent,
+                    np.nan if nose_x is None else nose_x,
+                    NO_ANGLES if angles is None else [np.nan if angle is None else angle for angle in angles],
+                    NO_LANDMARKS if landmarks is None else landmarks
+                )
+                # Publish the record only once it is complete
+                chunk.count += 1
+                chunk.header['count'] = chunk.count
+                self.stats['records'] += 1
+            except Exception as e:
+                self.stats['errors'] += 1
+                if self.stats['errors'] == 1:
+                    print(f"⚠️ Session recorder error: {e}")
+
+    def _rotate(self):
+        """Switch to the next chunk (lock held); the flush thread normally has it ready"""
+        self._retired.append(self._chunk)
+        if self._spare is not None:
+            self._chunk, self._spare = self._spare, None
+        else:
+            self._chunk = self._new_chunk()
+        self._wake.set()
+
+    def _new_chunk(self, index=None):
+        """Create chunk number index (default: take the next number)"""
+        if index is None:
+            index = self._chunk_index
+            self._chunk_index += 1
+        path = os.path.join(self.directory, f"{self.session}-{index:04d}{EXTENSION}")
+        chunk = _Chunk.create(path, self.chunk_records,
+                              {'app': self.app_name, 'session': self.session, 'chunk': index})
+        self.stats['chunks'] += 1
+        return chunk
+
+    def _enforce_budget(self):
+        """Delete the oldest chunks of any session until the directory fits max_bytes"""
+        in_use = {chunk.path for chunk in (self._chunk, self._spare) if chunk is not None}
+        chunks = sorted(glob.glob(os.path.join(self.directory, '*' + EXTENSION)), key=os.path.getmtime)
+        total = sum(os.path.getsize(path) for path in chunks)
+        for path in chunks:
+            if total <= self.max_bytes:
+                break
+            if path in in_use:
+                continue
+            total -= os.path.getsize(path)
+            os.remove(path)
+            self.stats['deleted_chunks'] += 1
+
+    def _flush_loop(self):
+        """msync every flush_interval; prepares the next chunk off the frame path"""
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                spare_index = None
+                with self._lock:
+                    chunk = self._chunk              # Rotation may swap it; the old mapping stays valid
+                    retired, self._retired = self._retired, []
+                    if self._spare is None and chunk is not None and \
+                            chunk.count >= chunk.capacity * SPARE_AT:
+                        spare_index = self._chunk_index
+                        self._chunk_index += 1
+                for old in retired:
+                    old.flush()
+                if chunk is not None:
+                    chunk.flush()
+                if spare_index is not None:
+                    # File creation + preallocation happen here, so append() only swaps mappings
+                    spare = self._new_chunk(spare_index)
+                    with self._lock:
+                        self._spare = spare
+                if retired or spare_index is not None:
+                    self._enforce_budget()
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"⚠️ Session recorder flush error: {e}")
+
+    def status(self):
+        chunk = self._chunk
+        return {
+            'session': self.session,
+            'directory': self.directory,
+            'chunk_records': chunk.count if chunk is not None else 0,
+            **self.stats
+        }
+
+
+# --- Reading ---
+
+def _created(path):
+    return float(np.fromfile(path, dtype=HEADER_DTYPE, count=1)['created'][0])
+
+
+def list_sessions(directory):
+    """{session name: [chunk paths in order]}, oldest session first"""
+    sessions = {}
+    for path in sorted(glob.glob(os.path.join(directory, '*' + EXTENSION))):
+        name = os.path.basename(path)[:-len(EXTENSION)].rsplit('-', 1)[0]
+        sessions.setdefault(name, []).append(path)
+    # Several apps can share a directory: order by when each session started
+    return dict(sorted(sessions.items(), key=lambda item: _created(item[1][0])))
+
+
+class Session:
+    """Read-only, memory-mapped view of one recorded session"""
+
+    def __init__(self, paths):
+        self.chunks = [_Chunk.open(path).records for path in paths]
+        self.name = os.path.basename(paths[0])[:-len(EXTENSION)].rsplit('-', 1)[0] if paths else None
+        self._offsets = np.cumsum([0] + [len(records) for records in self.chunks])
+
+    def __len__(self):
+        return int(self._offsets[-1])
+
+    def __getitem__(self, index):
+        """One record (np.void) or, for a slice, a copy of just that range"""
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            parts = []
+            for i, records in enumerate(self.chunks):
+                lo, hi = max(start, self._offsets[i]), min(stop, self._offsets[i + 1])
+                if lo < hi:
+                    parts.append(records[lo - self._offsets[i]:hi - self._offsets[i]])
+            joined = np.concatenate(parts) if parts else np.zeros(0, dtype=RECORD_DTYPE)
+            return joined[::step]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        chunk = int(np.searchsorted(self._offsets, index, side='right')) - 1
+        return self.chunks[chunk][index - self._offsets[chunk]]
+
+    def column(self, name):
+        """One field for the whole session (reads only that field's bytes)"""
+        if not self.chunks:
+            return np.zeros(0, dtype=RECORD_DTYPE[name])
+        return np.concatenate([records[name] for records in self.chunks])
+
+    def between(self, start, end):
+        """Records with start <= timestamp < end (timestamps grow within a session)"""
+        timestamps = self.column('timestamp')
+        lo, hi = np.searchsorted(timestamps, [start, end])
+        return self[int(lo):int(hi)]
+
+    @property
+    def duration(self):
+        if not len(self):
+            return 0.0
+        return float(self[-1]['timestamp'] - self[0]['timestamp'])
+
+
+def open_session(directory, session=None):
+    """Open a session by name, or the newest one in directory"""
+    sessions = list_sessions(directory)
+    if not sessions:
+        raise FileNotFoundError(f"No recorded sessions in {directory}")
+    if session is None:
+        session = list(sessions)[-1]
+    return Session(sessions[session])
+
+
+def summarize(session):
+    """Counts a field engineer looks at first"""
+    kinds = session.column('kind')
+    commands = session.column('command')
+    names, counts = np.unique(commands[commands != b''], return_counts=True)
+    return {
+        'records': len(session),
+        'duration_s': round(session.duration, 1),
+        'inferences': int((kinds == INFERENCE).sum()),
+        'detected_ratio': round(float(session.column('detected').mean()), 3) if len(session) else 0.0,
+        'commands': {name.decode(): int(count) for name, count in zip(names, counts)}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List or summarize recorded NAVIS sessions")
+    parser.add_argument('directory')
+    parser.add_argument('--session', help="Session name (default: list all)")
+    args = parser.parse_args()
+
+    if args.session:
+        print(json.dumps(summarize(open_session(args.directory, args.session)), indent=2))
+        return
+    for name, paths in list_sessions(args.directory).items():
+        session = Session(paths)
+        size_mb = sum(os.path.getsize(path) for path in paths) / 1e6
+        print(f"{name:<36} {len(paths):>3} chunks {len(session):>9} records "
+              f"{session.duration / 60:>7.1f} min {size_mb:>8.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
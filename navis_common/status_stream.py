@@ -0,0 +1,117 @@
+"""
+Status Stream
+Server-Sent Events channel that pushes status deltas instead of 1 Hz /status polling
+
+Producers call notify() after changing their state. Each connected page gets the
+full state once, then only the keys whose values changed, at most max_rate times
+per second (changes in between are coalesced into the next event).
+
+The state is built once per tick and shared by every client, so get_state()
+runs at most max_rate times per second however many pages are open. Keep it to
+what the pages render: a nested dict that changes on every frame goes out whole
+in every event (slow diagnostics belong on a polled endpoint such as /status).
+"""
+
+import json
+import threading
+import time
+
+_MISSING = object()
+
+
+class StatusChannel:
+    """Push channel for one app's status dict"""
+
+    def __init__(self, get_state, max_rate=10.0, precision=2, keepalive=15.0):
+        self.get_state = get_state            # Callable returning the current status dict
+        self.max_rate = max_rate              # Max events per second per client
+        self.precision = precision            # Floats are rounded before diffing (None = exact)
+        self.keepalive = keepalive            # Seconds between keepalive comments when idle
+
+        self._cond = threading.Condition()
+        self._version = 0
+        self._closed = False
+        self.subscribers = 0
+
+        # Shared snapshot: one get_state() per tick for all clients
+        self._snapshot_lock = threading.Lock()
+        self._snapshot = {}
+        self._snapshot_version = -1
+        self._snapshot_time = 0.0
+
+    def notify(self):
+        """Signal that the state may have changed (cheap, safe to call every frame)"""
+        with self._cond:
+            self._version += 1
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _round(self, value):
+        """Round floats, also inside nested dicts / lists"""
+        if isinstance(value, float):
+            return round(value, self.precision)
+        if isinstance(value, dict):
+            return {k: self._round(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self._round(v) for v in value]
+        return value
+
+    def _shared_snapshot(self, seen):
+        """(state, version) at least as new as version seen, built at most once per tick"""
+        with self._snapshot_lock:
+            if self._snapshot_version < seen:
+                # Other clients wait on the lock and get the same build
+                wait = self._snapshot_time + self._min_interval - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                with self._cond:
+                    version = self._version
+                state = self.get_state()
+                self._snapshot = state if self.precision is None else self._round(state)
+                self._snapshot_version = version
+                self._snapshot_time = time.monotonic()
+            return self._snapshot, self._snapshot_version
+
+    @property
+    def _min_interval(self):
+        return 1.0 / self.max_rate if self.max_rate else 0.0
+
+    def stream(self):
+        """SSE generator for one client: full state first, then deltas"""
+        min_interval = self._min_interval
+        last_sent = {}
+        seen = -1
+
+        with self._cond:
+            self.subscribers += 1
+        try:
+            # Reconnect quickly if the connection drops
+            yield 'retry: 2000\n\n'
+
+            while not self._closed:
+                with self._cond:
+                    changed = self._cond.wait_for(lambda: self._version != seen or self._closed,
+                                                  timeout=self.keepalive)
+                    wanted = self._version
+                if self._closed:
+                    break
+                if not changed:
+                    yield ': keepalive\n\n'
+                    continue
+
+                state, seen = self._shared_snapshot(wanted)
+                delta = {k: v for k, v in state.items() if last_sent.get(k, _MISSING) != v}
+                if delta:
+                    last_sent.update(delta)
+                    yield f"data: {json.dumps(delta)}\n\n"
+
+                    # Rate limit: anything that changes meanwhile goes out in the next event
+                    if min_interval:
+                        time.sleep(min_interval)
+        finally:
+            with self._cond:
+                self.subscribers -= 1